@@ -1,4 +1,4 @@
-# -*- coding:utf-8 -*-
+# coding: utf-8
 #
 # Copyright 2012 NAMD-EMAP-FGV
 #
@@ -17,7 +17,14 @@
 # You should have received a copy of the GNU General Public License
 # along with PyPLN.  If not, see <http://www.gnu.org/licenses/>.
 
-import pkg_resources
+'''Benchmarks for `pypln.api`
 
+`benchmarks.server` is a stand-in for PyPLN's REST API that runs locally, so
+the client can be measured without depending on a real server (and on the
+time it takes to process documents). Run all the scenarios with:
 
-pkg_resources.declare_namespace(__name__)
+    python -m benchmarks
+
+(see `python -m benchmarks --help` for the options). JSON decoders can also
+be compared without any HTTP with `python -m benchmarks.json_decoding`.
+'''
@@ -0,0 +1,94 @@
+# coding: utf-8
+#
+# Copyright 2012 NAMD-EMAP-FGV
+#
+# This file is part of PyPLN. You can get more information at: http://pypln.org/.
+#
+# PyPLN is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyPLN is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyPLN.  If not, see <http://www.gnu.org/licenses/>.
+
+'''Run the benchmark scenarios and report throughput and latencies'''
+
+import argparse
+
+from benchmarks.scenarios import SCENARIOS, percentile, run_scenario
+from benchmarks.server import StandInServer
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+            description=__doc__)
+    parser.add_argument('scenarios', nargs='*', metavar='scenario',
+                        help='scenarios to run (all of them by default): '
+                             '{}'.format(', '.join(SCENARIOS)))
+    parser.add_argument('--latency', type=float, default=0.005,
+                        help='seconds the server takes to answer each '
+                             'request (default: %(default)s)')
+    parser.add_argument('--page-size', type=int, default=100,
+                        help='documents in each page of the listing '
+                             '(default: %(default)s)')
+    parser.add_argument('--documents', type=int, default=5000,
+                        help='documents in the listing (default: '
+                             '%(default)s)')
+    parser.add_argument('--tokens', type=int, default=10000,
+                        help='tokens in each document (default: '
+                             '%(default)s)')
+    parser.add_argument('--wordcloud-size', type=int, default=64 * 1024,
+                        help='size of each wordcloud image in bytes '
+                             '(default: %(default)s)')
+    parser.add_argument('--upload-size', type=int, default=256 * 1024,
+                        help='size of each uploaded document in bytes '
+                             '(default: %(default)s)')
+    parser.add_argument('--uploads', type=int, default=200,
+                        help='documents uploaded (default: %(default)s)')
+    parser.add_argument('--fan-out', type=int, default=500,
+                        help='documents whose tokens are fetched (default: '
+                             '%(default)s)')
+    parser.add_argument('--wordclouds', type=int, default=200,
+                        help='wordclouds downloaded (default: %(default)s)')
+    parser.add_argument('--workers', type=int, default=8,
+                        help='concurrent requests (default: %(default)s)')
+    parser.add_argument('--json-decoder', default=None,
+                        help='JSON decoder used by the client (see '
+                             '`pypln.api.get_json_decoder`)')
+    options = parser.parse_args(args)
+    for name in options.scenarios:
+        if name not in SCENARIOS:
+            parser.error('unknown scenario: {}'.format(name))
+    return options
+
+
+def report(result):
+    milliseconds = lambda percent: 1000 * percentile(result.durations,
+                                                     percent)
+    return '{:<12} {:>6} {:>10.1f} {:>9.1f} {:>9.1f} {:>9.1f}'.format(
+            result.name, result.operations,
+            result.operations / result.elapsed, milliseconds(50),
+            milliseconds(90), milliseconds(99))
+
+
+def main(args=None):
+    options = parse_args(args)
+    server = StandInServer(latency=options.latency,
+                           page_size=options.page_size,
+                           documents=options.documents, tokens=options.tokens,
+                           wordcloud_size=options.wordcloud_size)
+    with server:
+        print('{:<12} {:>6} {:>10} {:>9} {:>9} {:>9}'.format('scenario',
+              'ops', 'ops/s', 'p50 (ms)', 'p90 (ms)', 'p99 (ms)'))
+        for name in options.scenarios or SCENARIOS:
+            print(report(run_scenario(name, server, options)))
+
+
+if __name__ == '__main__':
+    main()
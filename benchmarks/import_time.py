@@ -0,0 +1,62 @@
+# coding: utf-8
+#
+# Copyright 2012 NAMD-EMAP-FGV
+#
+# This file is part of PyPLN. You can get more information at: http://pypln.org/.
+#
+# PyPLN is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyPLN is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyPLN.  If not, see <http://www.gnu.org/licenses/>.
+
+'''Measure how long `import pypln.api` takes in a new interpreter
+
+Short-lived programs pay this on every run. Run with:
+
+    python -m benchmarks.import_time
+'''
+
+import subprocess
+import sys
+
+
+CODE = '''
+import sys, time
+start = time.time()
+import {module}
+print(time.time() - start)
+print(','.join(sorted(sys.modules)))
+'''
+
+
+def measure(module='pypln.api', repeat=5):
+    '''Return the shortest time (in seconds) it took to import `module` in
+    `repeat` new interpreters and the modules loaded by the last one'''
+    best = None
+    for index in range(repeat):
+        output = subprocess.check_output([sys.executable, '-c',
+                                          CODE.format(module=module)])
+        elapsed, modules = output.decode('ascii').strip().split('\n')
+        if best is None or float(elapsed) < best:
+            best = float(elapsed)
+    return best, modules.split(',')
+
+
+def main():
+    elapsed, modules = measure()
+    print('import pypln.api: {:.1f} ms, {} modules loaded'.format(
+        elapsed * 1000, len(modules)))
+    for module in ('requests', 'pkg_resources'):
+        print('  {} imported: {}'.format(module, module in modules))
+
+
+if __name__ == '__main__':
+    main()
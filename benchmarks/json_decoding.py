@@ -0,0 +1,93 @@
+# coding: utf-8
+#
+# Copyright 2012 NAMD-EMAP-FGV
+#
+# This file is part of PyPLN. You can get more information at: http://pypln.org/.
+#
+# PyPLN is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyPLN is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyPLN.  If not, see <http://www.gnu.org/licenses/>.
+
+'''Compare `response.json()` with the decoders from `get_json_decoder`
+
+Payloads mimic the ones used in `tests/`: a listing page of documents and
+big `tokens` and `freqdist` properties. Run with:
+
+    python -m benchmarks.json_decoding
+'''
+
+import collections
+import json
+import random
+import timeit
+
+import requests
+
+from pypln.api import JSON_DECODERS, get_json_decoder
+
+
+WORDS = ('Python is a widely used general-purpose high-level programming '
+         'language its design philosophy emphasizes code readability and '
+         'its syntax allows programmers to express concepts in fewer lines '
+         'of code than would be possible in languages such as C++ or Java '
+         'linguagem de programação açaí coração').split()
+
+
+def payloads():
+    random.seed(42)
+    document = {'owner': 'user',
+                'corpus': 'http://pypln.example.com/corpora/42/',
+                'size': 42,
+                'properties': 'http://pypln.example.com/documents/123/properties/',
+                'url': 'http://pypln.example.com/documents/123/',
+                'blob': '/test_1.txt',
+                'uploaded_at': '2013-10-25T17:00:00.000Z'}
+    listing = {'count': 100000, 'next': None, 'previous': None,
+               'results': [document] * 100}
+    vocabulary = ['{}{}'.format(random.choice(WORDS), i)
+                  for i in range(20000)]
+    tokens = [random.choice(vocabulary) for i in range(500000)]
+    freqdist = collections.Counter(tokens).most_common()
+    return [('listing page', listing), ('tokens', {'value': tokens}),
+            ('freqdist', {'value': freqdist})]
+
+
+def response_with(content):
+    response = requests.Response()
+    response._content = content
+    response.status_code = 200
+    response.headers['Content-Type'] = 'application/json'
+    return response
+
+
+def main(repeat=5):
+    decoders = [('json', json.loads)]
+    for name in JSON_DECODERS:
+        loads = get_json_decoder(name)
+        if loads is not json.loads:
+            decoders.append((name, loads))
+
+    for payload_name, payload in payloads():
+        content = json.dumps(payload).encode('utf-8')
+        response = response_with(content)
+        baseline = min(timeit.repeat(response.json, number=1, repeat=repeat))
+        print('{} ({:.1f} KiB)'.format(payload_name, len(content) / 1024.0))
+        print('  {:<16} {:8.2f} ms'.format('response.json()', baseline * 1000))
+        for name, loads in decoders:
+            elapsed = min(timeit.repeat(lambda: loads(content), number=1,
+                                        repeat=repeat))
+            print('  {:<16} {:8.2f} ms ({:.1f}x)'.format(name, elapsed * 1000,
+                                                          baseline / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+# coding: utf-8
+#
+# Copyright 2012 NAMD-EMAP-FGV
+#
+# This file is part of PyPLN. You can get more information at: http://pypln.org/.
+#
+# PyPLN is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyPLN is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyPLN.  If not, see <http://www.gnu.org/licenses/>.
+
+'''Benchmark scenarios, run against a `benchmarks.server.StandInServer`
+
+Each scenario uses the public API the same way an application would, but
+with the method doing each operation (such as `Corpus.add_document`)
+replaced in the instance by one that also measures how long it takes.
+'''
+
+import collections
+import shutil
+import tempfile
+import time
+
+from pypln.api import PyPLN, sessions
+
+
+Result = collections.namedtuple('Result', ['name', 'operations', 'elapsed',
+                                           'durations'])
+
+
+def percentile(durations, percent):
+    '''Return the `percent` percentile of `durations` (nearest rank)'''
+    ordered = sorted(durations)
+    if not ordered:
+        return float('nan')
+    rank = max(0, int(round(percent / 100.0 * len(ordered))) - 1)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def timed(obj, name, durations):
+    '''Replace method `name` of `obj` by one that appends the duration of
+    each call to `durations`'''
+    method = getattr(obj, name)
+
+    def wrapper(*args, **kwargs):
+        start = time.time()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            durations.append(time.time() - start)
+    setattr(obj, name, wrapper)
+
+
+def _run(name, function):
+    durations = []
+    start = time.time()
+    operations = function(durations)
+    return Result(name, operations, time.time() - start, durations)
+
+
+def upload(pypln, server, options):
+    '''Upload `options.uploads` documents of `options.upload_size` bytes'''
+    corpus = pypln.corpora()[0]
+    content = b'x' * options.upload_size
+    documents = [('document_{}.txt'.format(number), content)
+                 for number in range(options.uploads)]
+
+    def run(durations):
+        timed(corpus, 'add_document', durations)
+        result, errors = corpus.add_documents(documents,
+                                              workers=options.workers,
+                                              stream=True)
+        assert not errors, errors
+        return len(result)
+    return _run('upload', run)
+
+
+def pagination(pypln, server, options):
+    '''List every document, downloading up to `options.workers` pages at
+    the same time'''
+    def run(durations):
+        timed(pypln, '_get_page', durations)
+        documents = pypln.documents(full=True, parallel=options.workers)
+        assert len(documents) == server.documents
+        return len(durations)
+    return _run('pagination', run)
+
+
+def fan_out(pypln, server, options):
+    '''Get the `tokens` property of `options.fan_out` documents'''
+    corpus = pypln.corpora()[0]
+    documents = pypln.documents(full=True, parallel=options.workers,
+                                compact=True)[:options.fan_out]
+
+    def run(durations):
+        timed_documents = [_TimedProperty(document, durations)
+                           for document in documents]
+        errors = [exc for document, value, exc in corpus.fetch_property(
+            'tokens', timed_documents, workers=options.workers)
+            if exc is not None]
+        assert not errors, errors
+        return len(documents)
+    return _run('fan-out', run)
+
+
+class _TimedProperty(object):
+    '''Document wrapper measuring `get_property` (`DocumentRecord` objects
+    have no `__dict__`, so `timed` can't be used)'''
+
+    def __init__(self, document, durations):
+        self.document = document
+        self.durations = durations
+
+    def get_property(self, prop):
+        start = time.time()
+        try:
+            return self.document.get_property(prop)
+        finally:
+            self.durations.append(time.time() - start)
+
+
+def wordclouds(pypln, server, options):
+    '''Save the wordclouds of `options.wordclouds` documents'''
+    corpus = pypln.corpora()[0]
+    documents = pypln.documents(full=True, parallel=options.workers)
+    documents = documents[:options.wordclouds]
+    directory = tempfile.mkdtemp()
+
+    def run(durations):
+        for document in documents:
+            timed(document, 'download_wordcloud', durations)
+        filenames, errors = corpus.export_wordclouds(directory, documents,
+                                                     workers=options.workers)
+        assert not errors, errors
+        with open(filenames[0], 'rb') as fp:
+            assert fp.read() == server.wordcloud
+        return len(filenames)
+    try:
+        return _run('wordcloud', run)
+    finally:
+        shutil.rmtree(directory)
+
+
+SCENARIOS = collections.OrderedDict([
+    ('upload', upload),
+    ('pagination', pagination),
+    ('fan-out', fan_out),
+    ('wordcloud', wordclouds),
+])
+
+
+def run_scenario(name, server, options):
+    '''Run scenario `name` with a new `PyPLN` object connected to
+    `server`'''
+    # Don't reuse connections (or settings) from other scenarios
+    sessions.clear()
+    pypln = PyPLN(server.url, ('user', 'password'),
+                  json_decoder=options.json_decoder)
+    return SCENARIOS[name](pypln, server, options)
@@ -0,0 +1,221 @@
+# coding: utf-8
+#
+# Copyright 2012 NAMD-EMAP-FGV
+#
+# This file is part of PyPLN. You can get more information at: http://pypln.org/.
+#
+# PyPLN is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyPLN is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyPLN.  If not, see <http://www.gnu.org/licenses/>.
+
+'''A local HTTP server imitating PyPLN's REST API
+
+Only what `pypln.api` uses is implemented: listing and creating corpora and
+documents, listing the properties of a document and getting each property.
+Documents are generated on demand from their ids, so listing `documents`
+documents does not need them in memory, and every property of every
+document has the same (precomputed) content.
+'''
+
+import base64
+import json
+import random
+import re
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, urlsplit
+
+
+WORDS = ('Python is a widely used general-purpose high-level programming '
+         'language its design philosophy emphasizes code readability '
+         'linguagem de programação açaí coração').split()
+
+PROPERTIES = ('text', 'tokens', 'freqdist', 'language', 'wordcloud')
+
+DOCUMENT_URL = re.compile(r'^/documents/(\d+)/$')
+PROPERTIES_URL = re.compile(r'^/documents/(\d+)/properties/$')
+PROPERTY_URL = re.compile(r'^/documents/(\d+)/properties/(\w+)/?$')
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    # Benchmarks open many connections at the same time
+    request_queue_size = 128
+
+
+class StandInServer(object):
+    '''PyPLN's REST API, served from a background thread
+
+    `latency` is how many seconds each request takes, `page_size` the
+    number of resources in each page of a listing, `documents` the number of
+    documents in the listing (and in the only corpus), `tokens` the number of
+    tokens in the `tokens`, `text` and `freqdist` properties and
+    `wordcloud_size` the size (in bytes) of the wordcloud images::
+
+        with StandInServer(latency=0.01) as server:
+            pypln = PyPLN(server.url, ('user', 'password'))
+    '''
+
+    def __init__(self, latency=0.0, page_size=100, documents=1000,
+                 tokens=1000, wordcloud_size=64 * 1024, host='127.0.0.1',
+                 port=0):
+        self.latency = latency
+        self.page_size = page_size
+        self.documents = documents
+        self.uploads = 0
+        self._lock = threading.Lock()
+
+        rng = random.Random(42)
+        tokens = [rng.choice(WORDS) for index in range(tokens)]
+        freqdist = {}
+        for token in tokens:
+            freqdist[token] = freqdist.get(token, 0) + 1
+        wordcloud = bytearray(rng.getrandbits(8)
+                              for index in range(wordcloud_size))
+        values = {'text': ' '.join(tokens), 'tokens': tokens,
+                  'freqdist': sorted(freqdist.items()), 'language': 'en',
+                  'wordcloud': base64.b64encode(bytes(wordcloud))
+                                     .decode('ascii')}
+        self.wordcloud = bytes(wordcloud)
+        self._properties = dict((prop, self._encode({'value': value}))
+                                for prop, value in values.items())
+
+        self._server = _ThreadingHTTPServer((host, port), self._handler())
+        self.url = 'http://{}:{}'.format(*self._server.server_address[:2])
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    @staticmethod
+    def _encode(data):
+        return json.dumps(data).encode('utf-8')
+
+    def corpus(self):
+        return {'url': self.url + '/corpora/1/', 'name': 'benchmark',
+                'description': 'Stand-in corpus', 'owner': 'user',
+                'created_at': '2013-10-25T17:00:00.000Z',
+                'documents': [self.url + '/documents/{}/'.format(number)
+                              for number in range(1, self.documents + 1)]}
+
+    def document(self, number):
+        url = self.url + '/documents/{}/'.format(number)
+        return {'url': url, 'properties': url + 'properties/',
+                'corpus': self.url + '/corpora/1/', 'owner': 'user',
+                'size': 1024, 'blob': '/document_{}.txt'.format(number),
+                'uploaded_at': time.strftime('%Y-%m-%dT%H:%M:%S.000Z',
+                    time.gmtime(1382720400 + number))}
+
+    def listing(self, page, total, resource):
+        start = (page - 1) * self.page_size
+        end = min(start + self.page_size, total)
+        next_url = None
+        if end < total:
+            next_url = '{}{}?page={}'.format(self.url, resource, page + 1)
+        if resource == '/corpora/':
+            results = [self.corpus()]
+        else:
+            results = [self.document(number)
+                       for number in range(start + 1, end + 1)]
+        return {'count': total, 'next': next_url, 'previous': None,
+                'results': results}
+
+    def respond(self, method, path, query):
+        '''Return the status and body (bytes) of the response to a
+        request'''
+        if method == 'POST':
+            if path == '/corpora/':
+                return 201, self._encode(self.corpus())
+            elif path == '/documents/':
+                with self._lock:
+                    self.uploads += 1
+                    number = self.documents + self.uploads
+                return 201, self._encode(self.document(number))
+            return 404, b'{}'
+
+        page = int(query.get('page', ['1'])[0])
+        if path == '/corpora/':
+            return 200, self._encode(self.listing(page, 1, path))
+        elif path == '/corpora/1/':
+            return 200, self._encode(self.corpus())
+        elif path == '/documents/':
+            return 200, self._encode(self.listing(page, self.documents, path))
+
+        match = DOCUMENT_URL.match(path)
+        if match:
+            return 200, self._encode(self.document(int(match.group(1))))
+        match = PROPERTIES_URL.match(path)
+        if match:
+            return 200, self._encode({'properties': [
+                self.url + path + prop + '/' for prop in PROPERTIES]})
+        match = PROPERTY_URL.match(path)
+        if match and match.group(2) in self._properties:
+            return 200, self._properties[match.group(2)]
+        return 404, b'{"detail": "Not found"}'
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _read_body(self):
+                if self.headers.get('Transfer-Encoding') == 'chunked':
+                    while True:
+                        size = int(self.rfile.readline().split(b';')[0], 16)
+                        self.rfile.read(size + 2)
+                        if size == 0:
+                            return
+                length = int(self.headers.get('Content-Length') or 0)
+                while length > 0:
+                    length -= len(self.rfile.read(min(length, 64 * 1024)))
+
+            def _respond(self, method):
+                self._read_body()
+                if server.latency:
+                    time.sleep(server.latency)
+                parts = urlsplit(self.path)
+                status, body = server.respond(method, parts.path,
+                                              parse_qs(parts.query))
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                self._respond('GET')
+
+            def do_POST(self):
+                self._respond('POST')
+
+        return Handler
@@ -0,0 +1,1406 @@
+# coding: utf-8
+#
+# Copyright 2012 NAMD-EMAP-FGV
+#
+# This file is part of PyPLN. You can get more information at: http://pypln.org/.
+#
+# PyPLN is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyPLN is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyPLN.  If not, see <http://www.gnu.org/licenses/>.
+
+'''Implements a Python-layer to access PyPLN's API through HTTP'''
+
+import base64
+import collections
+import collections.abc
+import functools
+import heapq
+import json
+import os
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, \
+        as_completed, wait
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, \
+        urlunsplit
+
+from pypln.api.dedup import DuplicateDocumentError
+from pypln.api.export import FORMATS
+from pypln.api.jsonstream import iter_items, iter_string
+from pypln.api.files import AtomicFile, write_atomically
+from pypln.api.mirror import MirrorManifest
+from pypln.api.table import DocumentTable
+from pypln.api.upload import MultipartEncoder
+
+__version__ = '0.2.0'
+
+CORPUS_URL = '{}/corpora/{}'
+
+# Used to tell cache misses from cached `None` values
+_missing = object()
+
+def get_session_with_credentials(credentials):
+    # `requests` takes a long time to import, so it's only imported when
+    # the first session is created
+    import requests
+
+    session = requests.Session()
+    session.headers.update({'User-Agent':
+        'pypln.api/{} {}'.format(__version__, session.headers['User-Agent'])})
+    if isinstance(credentials, tuple):
+        session.auth = credentials
+    elif isinstance(credentials, str):
+        session.headers.update(
+            {'Authorization': 'Token {}'.format(credentials)})
+    else:
+        raise TypeError("`credentials` must be a tuple (for HTTP Basic authentication) or a string (for Token authentication).")
+
+    # Objects sharing this session may use these caches and JSON decoder
+    # (see `PyPLN`)
+    session.property_cache = None
+    session.memory_cache = None
+    session.json_loads = None
+    return session
+
+
+# Faster JSON decoders that may be installed, in order of preference
+JSON_DECODERS = ('orjson', 'ujson')
+
+def get_json_decoder(decoder='auto'):
+    '''Return a function that decodes JSON from bytes
+
+    `decoder` may be the name of a module with a `loads` function that
+    accepts bytes (such as `'orjson'` or `'ujson'`), `'auto'` (to use the
+    fastest one installed, see `JSON_DECODERS`), `'json'` or a function. If
+    the module is not installed, the standard library's `json.loads` is
+    used.'''
+    if callable(decoder):
+        return decoder
+    names = JSON_DECODERS if decoder == 'auto' else (decoder, )
+    for name in names:
+        try:
+            return __import__(name).loads
+        except ImportError:
+            pass
+    return json.loads
+
+
+def _decode_json(session, response):
+    '''Decode the JSON body of `response` with the decoder configured for
+    `session` (or `response.json()` if there's none)'''
+    loads = getattr(session, 'json_loads', None)
+    if loads is None:
+        return response.json()
+    return loads(response.content)
+
+
+class SessionPool(object):
+    '''Registry of sessions shared by everything talking to the same host
+    with the same credentials
+
+    `PyPLN`, `Corpus.from_url` and `Document.from_url` get their sessions
+    from `sessions` (an instance of this class), so they reuse the same
+    connections instead of opening new ones for each object. Each session
+    keeps up to `pool_maxsize` connections to its host (waiting for a free
+    one when all of them are in use if `pool_block` is `True`), and bulk
+    operations (such as `Corpus.add_documents`) use at most `pool_maxsize`
+    threads. If `keep_alive` is `False`, connections are closed after each
+    request. If `metrics` (a `pypln.api.metrics.Metrics`) is given, every
+    request made with these sessions is recorded in it.
+
+    Clients with their own caches, JSON decoder or metrics get a session of
+    their own, which shares only the connections (see `get`).
+    '''
+
+    def __init__(self, pool_maxsize=10, pool_block=False, keep_alive=True,
+                 metrics=None):
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self.configure(pool_maxsize, pool_block, keep_alive, metrics)
+
+    def configure(self, pool_maxsize=10, pool_block=False, keep_alive=True,
+                  metrics=None):
+        '''Change the options used for new sessions
+
+        Sessions that already exist are not changed (use `clear` to close
+        them).'''
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        self.metrics = metrics
+
+    def get(self, url, credentials, property_cache=None, memory_cache=None,
+            json_loads=None, metrics=None):
+        '''Return the session used to access `url` with `credentials`
+
+        Without any other argument, the same session is returned for every
+        URL in the same host with the same credentials. Otherwise a new
+        session is returned, which uses `property_cache`, `memory_cache`,
+        `json_loads` and `metrics` (see `PyPLN`) but shares the connections
+        of that session, so these options only apply to its user.'''
+        if not isinstance(credentials, (tuple, str)):
+            # Let `get_session_with_credentials` raise the right error
+            get_session_with_credentials(credentials)
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc, credentials)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = self._sessions[key] = self._create(credentials)
+        if property_cache is None and memory_cache is None and \
+                json_loads is None and metrics is None:
+            return session
+
+        client_session = get_session_with_credentials(credentials)
+        client_session.headers = session.headers.copy()
+        client_session.adapters = session.adapters
+        client_session.pool_maxsize = session.pool_maxsize
+        client_session.property_cache = property_cache
+        client_session.memory_cache = memory_cache
+        client_session.json_loads = json_loads
+        client_session.pool_metrics = session.pool_metrics
+        for session_metrics in (session.pool_metrics, metrics):
+            if session_metrics is not None:
+                session_metrics.install(client_session)
+        return client_session
+
+    def _create(self, credentials):
+        from requests.adapters import HTTPAdapter
+
+        session = get_session_with_credentials(credentials)
+        for prefix in ('http://', 'https://'):
+            session.mount(prefix, HTTPAdapter(
+                pool_maxsize=self.pool_maxsize, pool_block=self.pool_block))
+        if not self.keep_alive:
+            session.headers['Connection'] = 'close'
+        # Used by bulk operations to limit how many threads use the session
+        session.pool_maxsize = self.pool_maxsize
+        session.pool_metrics = self.metrics
+        if self.metrics is not None:
+            self.metrics.install(session)
+        return session
+
+    def clear(self):
+        '''Close and forget all the sessions'''
+        with self._lock:
+            sessions, self._sessions = self._sessions, {}
+        for session in sessions.values():
+            session.close()
+
+
+sessions = SessionPool()
+
+
+def _pool_workers(session, workers):
+    '''Return how many of `workers` threads should use `session` at a time
+
+    Sessions from `SessionPool` keep up to `pool_maxsize` connections per
+    host (see `SessionPool.configure`). Using more threads than that would
+    make `requests` discard and reopen connections (or wait for a free one,
+    if `pool_block` is `True`), so `workers` is capped at that number.'''
+    return min(workers, getattr(session, 'pool_maxsize', workers))
+
+
+def _run_concurrently(function, items, workers, ordered=True):
+    '''Call `function` for each one of `items` using `workers` threads
+
+    Yields `(item, result, exception)` tuples (one of `result` and `exception`
+    will be `None`). If `ordered` is `True` the tuples are yielded in the same
+    order as `items`, otherwise they are yielded as soon as they complete. At
+    most `2 * workers` items are in flight at any time, so `items` can be a
+    (possibly very long) generator.'''
+    def call(item):
+        try:
+            return item, function(item), None
+        except Exception as exc:
+            return item, None, exc
+
+    max_in_flight = 2 * workers
+    items = iter(items)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = collections.deque()
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < max_in_flight:
+                try:
+                    item = next(items)
+                except StopIteration:
+                    exhausted = True
+                else:
+                    pending.append(executor.submit(call, item))
+            if not pending:
+                break
+            if ordered:
+                yield pending.popleft().result()
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+                    yield future.result()
+
+
+def _page_urls(next_url, count, page_size):
+    '''Return the URLs of all the pages of a listing starting at `next_url`
+
+    `count` is the total number of resources in the listing and `page_size`
+    the number of resources in each page. Both page number (`?page=N`) and
+    limit/offset (`?limit=N&offset=M`) pagination are supported; `None` is
+    returned if the URLs can't be derived from `next_url`.'''
+    parts = urlsplit(next_url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    params = dict(query)
+    if page_size <= 0:
+        return None
+    if 'page' in params and params['page'].isdigit():
+        key = 'page'
+        last_page = (count + page_size - 1) // page_size
+        values = range(int(params['page']), last_page + 1)
+    elif 'offset' in params and params['offset'].isdigit():
+        key = 'offset'
+        values = range(int(params['offset']), count, page_size)
+    else:
+        return None
+
+    urls = []
+    for value in values:
+        new_query = [(name, str(value) if name == key else old_value)
+                     for name, old_value in query]
+        urls.append(urlunsplit((parts.scheme, parts.netloc, parts.path,
+                                urlencode(new_query), parts.fragment)))
+    return urls
+
+
+def _decode_property(content, loads=None, transform=None):
+    '''Decode the response `content` for a property and return its value,
+    transformed by `transform` (run in other processes by
+    `Corpus.fetch_property`)'''
+    value = (loads or json.loads)(content)['value']
+    return value if transform is None else transform(value)
+
+
+def decode_wordcloud(value):
+    '''Return the PNG image (bytes) of a `wordcloud` property value
+
+    Can be used as the `transform` of `Corpus.fetch_property`.'''
+    return base64.b64decode(value)
+
+
+def _credentials_key(session):
+    '''Return a string identifying the credentials used by `session`'''
+    if session.auth is not None:
+        return 'basic:{}:{}'.format(*session.auth)
+    return session.headers.get('Authorization', '')
+
+
+def _document_id(url):
+    '''Return the last part of the path of `url` (the id of a document)'''
+    return urlsplit(url).path.rstrip('/').split('/')[-1]
+
+
+def _prefetch(iterable, depth):
+    '''Iterate over `iterable` in a background thread
+
+    Up to `depth` items are produced ahead of the consumer, so the time spent
+    producing the next items (e.g. downloading the next pages of a listing)
+    overlaps with the time spent processing the current one. Exceptions
+    raised by `iterable` are re-raised in the consumer.'''
+    items = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    end = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+        except Exception as exc:
+            put((end, exc))
+        else:
+            put((end, None))
+
+    producer = threading.Thread(target=produce)
+    producer.daemon = True
+    producer.start()
+    try:
+        while True:
+            item, exc = items.get()
+            if item is end:
+                if exc is not None:
+                    raise exc
+                return
+            yield item
+    finally:
+        stop.set()
+
+
+class BaseDocument(object):
+    '''Behaviour shared by `Document` and `DocumentRecord`'''
+    __slots__ = ()
+
+    def __repr__(self):
+        return '<{}: {} ({})>'.format(type(self).__name__, self.blob,
+                                      self.url)
+
+    def __eq__(self, other):
+        # The URL is supposed to be unique, so it should be enough to compare
+        # two documents
+        return (self.url == other.url) and \
+                (self.size == other.size) and \
+                (self.uploaded_at == other.uploaded_at) and \
+                (self.owner == other.owner) and \
+                (self.corpus == other.corpus)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        # Equal documents have the same URL
+        return hash(self.url)
+
+    @classmethod
+    def from_url(cls, url, credentials, metrics=None):
+        '''Retrieve the document at `url` (recording the requests made with
+        its session in `metrics`, if given)'''
+        return cls.from_session(url, sessions.get(url, credentials,
+                                                  metrics=metrics))
+
+    @classmethod
+    def from_session(cls, url, session):
+        '''Retrieve the document at `url` using an existing `session`'''
+        result = session.get(url)
+        if result.status_code == 200:
+            return cls(session=session, **_decode_json(session, result))
+        else:
+            raise RuntimeError("Getting document details failed with status "
+                               "{}. The response was: '{}'".format(result.status_code,
+                                result.text))
+
+    def get_property(self, prop):
+        url = urljoin(self.properties_url, prop)
+        memory_cache = getattr(self.session, 'memory_cache', None)
+        if memory_cache is not None:
+            value = memory_cache.get(url, _missing)
+            if value is _missing:
+                value = self._fetch_property(prop, url)
+                memory_cache.set(url, value)
+            return value
+        return self._fetch_property(prop, url)
+
+    def _fetch_property(self, prop, url):
+        cache = getattr(self.session, 'property_cache', None)
+        if cache is not None:
+            loads = getattr(self.session, 'json_loads', None) or json.loads
+            return loads(self._get_cached_property(cache, prop, url))['value']
+
+        response = self.session.get(url)
+        if response.status_code == 200:
+            return _decode_json(self.session, response)['value']
+        else:
+            raise RuntimeError("Getting property {} failed with status "
+                               "{}. The response was: '{}'".format(prop,
+                                   response.status_code, response.text))
+
+    def _fetch_raw_property(self, prop):
+        '''Return the content (bytes) of the response for `prop`, using the
+        session's property cache if there's one'''
+        url = urljoin(self.properties_url, prop)
+        cache = getattr(self.session, 'property_cache', None)
+        if cache is not None:
+            return self._get_cached_property(cache, prop, url)
+
+        response = self.session.get(url)
+        if response.status_code == 200:
+            return response.content
+        else:
+            raise RuntimeError("Getting property {} failed with status "
+                               "{}. The response was: '{}'".format(prop,
+                                   response.status_code, response.text))
+
+    def _get_cached_property(self, cache, prop, url):
+        '''Return the raw content of `prop`, using `cache` (a
+        `pypln.api.cache.PropertyCache`) and revalidating it if needed'''
+        credentials = _credentials_key(self.session)
+        entry = cache.get(url, credentials)
+        headers = {}
+        if entry is not None:
+            if cache.is_fresh(entry):
+                return entry.body
+            if entry.etag is not None:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified is not None:
+                headers['If-Modified-Since'] = entry.last_modified
+
+        response = self.session.get(url, headers=headers)
+        if response.status_code == 304 and entry is not None:
+            # Store it again so the entry is fresh for `max_age` seconds
+            cache.set(url, entry.body, entry.etag, entry.last_modified,
+                      credentials)
+            return entry.body
+        elif response.status_code == 200:
+            cache.set(url, response.content, response.headers.get('ETag'),
+                      response.headers.get('Last-Modified'), credentials)
+            return response.content
+        else:
+            raise RuntimeError("Getting property {} failed with status "
+                               "{}. The response was: '{}'".format(prop,
+                                   response.status_code, response.text))
+
+    def iter_property(self, prop, chunk_size=64 * 1024):
+        '''
+        Iterate over the items of a (list) property as they are downloaded
+
+        The response is parsed incrementally (see
+        `pypln.api.jsonstream.iter_items`), so the memory used does not
+        depend on the size of the property. If the property is not a list,
+        its value is yielded once. Caches are not used.
+        '''
+        url = urljoin(self.properties_url, prop)
+        response = self.session.get(url, stream=True)
+        if response.status_code != 200:
+            raise RuntimeError("Getting property {} failed with status "
+                               "{}. The response was: '{}'".format(prop,
+                                   response.status_code, response.text))
+
+        def items():
+            try:
+                for item in iter_items(response.iter_content(chunk_size)):
+                    yield item
+            finally:
+                response.close()
+        return items()
+
+    def get_properties(self, props, workers=None):
+        '''
+        Get more than one property of this document at the same time
+
+        Returns a dict mapping each property that was successfully retrieved
+        to its value and a list of tuples with properties that failed and the
+        exceptions raised. Up to `workers` properties (all of them, by
+        default) are retrieved at the same time.
+        '''
+        props = list(props)
+        workers = workers or len(props) or 1
+        workers = _pool_workers(self.session, workers)
+        values, errors = {}, []
+        for prop, value, exc in _run_concurrently(self.get_property, props,
+                                                  workers):
+            if exc is None:
+                values[prop] = value
+            else:
+                errors.append((prop, exc))
+        return values, errors
+
+    def download_wordcloud(self, filename, chunk_size=64 * 1024):
+        '''
+        Save the wordcloud image of this document as `filename`
+
+        The base64-encoded image is decoded while it's downloaded, so it's
+        never entirely kept in memory. The image is written to a temporary
+        file which is renamed to `filename` only when it's complete.
+        '''
+        url = urljoin(self.properties_url, 'wordcloud')
+        response = self.session.get(url, stream=True)
+        if response.status_code != 200:
+            raise RuntimeError("Getting property wordcloud failed with status "
+                               "{}. The response was: '{}'".format(
+                                   response.status_code, response.text))
+
+        try:
+            with AtomicFile(filename) as fp:
+                encoded = ''
+                for piece in iter_string(response.iter_content(chunk_size)):
+                    # base64 is decoded in groups of 4 characters (and may be
+                    # split in lines)
+                    encoded += ''.join(piece.split())
+                    usable = len(encoded) - len(encoded) % 4
+                    fp.write(base64.b64decode(encoded[:usable]))
+                    encoded = encoded[usable:]
+                fp.write(base64.b64decode(encoded))
+        finally:
+            response.close()
+
+    def invalidate_cache(self):
+        '''Forget the properties of this document kept in the session's
+        memory cache, if there's one'''
+        memory_cache = getattr(self.session, 'memory_cache', None)
+        if memory_cache is not None:
+            memory_cache.invalidate_prefix(self.properties_url)
+
+    @property
+    def properties(self):
+        memory_cache = getattr(self.session, 'memory_cache', None)
+        if memory_cache is None:
+            return self._fetch_properties()
+        properties = memory_cache.get(self.properties_url, _missing)
+        if properties is _missing:
+            properties = self._fetch_properties()
+            memory_cache.set(self.properties_url, properties)
+        return properties
+
+    def _fetch_properties(self):
+        response = self.session.get(self.properties_url)
+        if response.status_code == 200:
+            # There should be a better way to do this.
+            properties = [prop.split(self.properties_url)[1].replace('/', '')
+                    for prop in _decode_json(self.session,
+                                             response)['properties']]
+
+            return properties
+        else:
+            raise RuntimeError("Getting document properties failed with status "
+                               "{}. The response was: '{}'".format(response.status_code,
+                                response.text))
+
+
+class Document(BaseDocument):
+    '''Class that represents a Document in PyPLN'''
+    def __init__(self, session, *args, **kwargs):
+
+        self.session = session
+        for key, value in kwargs.items():
+            # The `properties' attr should be the content of the resource under
+            # /properties/, not it's url. So we save the url here and retrieve
+            # the list of available properties when the user accesses it.
+            if key == 'properties':
+                key = 'properties_url'
+            setattr(self, key, value)
+
+
+class DocumentRecord(BaseDocument):
+    '''Compact representation of a Document in PyPLN
+
+    It has the same methods as `Document` but, instead of storing every key
+    returned by the API in a per-instance `__dict__`, it only keeps the
+    attributes in `__slots__`, which uses a lot less memory when listing
+    many documents (see `PyPLN.documents`).
+    '''
+    __slots__ = ('session', 'url', 'size', 'owner', 'corpus', 'uploaded_at',
+                 'blob', 'properties_url')
+
+    def __init__(self, session, *args, **kwargs):
+        self.session = session
+        self.url = kwargs.get('url')
+        self.size = kwargs.get('size')
+        self.owner = kwargs.get('owner')
+        self.corpus = kwargs.get('corpus')
+        self.uploaded_at = kwargs.get('uploaded_at')
+        self.blob = kwargs.get('blob')
+        self.properties_url = kwargs.get('properties')
+
+
+class DocumentSequence(collections.abc.Sequence):
+    '''Read-only sequence of `Document` objects for a list of document URLs
+
+    Documents are only retrieved (using `session`) when they're accessed
+    and then kept, so each URL is requested at most once: indexing gets
+    one document, slicing gets the documents in the slice (up to `workers`
+    at the same time) and iterating gets the documents ahead of the current
+    one in the background, also up to `workers` at the same time. Entries
+    that already are `Document` objects are used as they are.
+    '''
+
+    def __init__(self, urls, session, workers=10):
+        # The list the URLs came from (see `Corpus.lazy_documents`)
+        self.source = urls
+        self.urls = list(urls)
+        self.session = session
+        self.workers = workers
+        self._documents = [url if isinstance(url, BaseDocument) else None
+                           for url in self.urls]
+
+    def __len__(self):
+        return len(self.urls)
+
+    def __repr__(self):
+        hydrated = sum(document is not None for document in self._documents)
+        return '<DocumentSequence: {} documents ({} retrieved)>'.format(
+                len(self), hydrated)
+
+    def _hydrate(self, index):
+        document = Document.from_session(self.urls[index], self.session)
+        self._documents[index] = document
+        return document
+
+    def _hydrate_many(self, indexes):
+        '''Yield the document at each one of `indexes`, retrieving the
+        missing ones concurrently'''
+        missing = [index for index in indexes
+                   if self._documents[index] is None]
+        if not missing:
+            for index in indexes:
+                yield self._documents[index]
+            return
+
+        workers = _pool_workers(self.session, self.workers)
+        results = _run_concurrently(self._hydrate, missing, workers)
+        missing = set(missing)
+        for index in indexes:
+            if index in missing:
+                index, document, exc = next(results)
+                if exc is not None:
+                    raise exc
+                yield document
+            else:
+                yield self._documents[index]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self._hydrate_many(range(*index.indices(len(self)))))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('DocumentSequence index out of range')
+        document = self._documents[index]
+        if document is None:
+            document = self._hydrate(index)
+        return document
+
+    def __iter__(self):
+        return self._hydrate_many(range(len(self)))
+
+
+class Corpus(object):
+    '''Class that represents a Corpus in PyPLN'''
+    DOCUMENTS_PAGE = '/documents/'
+
+    def __init__(self, session, *args, **kwargs):
+        ''' Initializes a Corpus class
+
+        `session` must be `requests.Session` object with authentication data
+        '''
+        self.session = session
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+        splited_url = urlsplit(self.url)
+        self.base_url = "{}://{}".format(splited_url.scheme, splited_url.netloc)
+
+    def __repr__(self):
+        return '<Corpus: {} ({})>'.format(self.name, self.url)
+
+    def __eq__(self, other):
+        return (self.name == other.name) and \
+                (self.description == other.description) and \
+                (self.created_at == other.created_at) and \
+                (self.owner == other.owner) and \
+                (self.url == other.url)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        # Equal corpora have the same URL
+        return hash(self.url)
+
+    def _hydrate(self, document):
+        '''Return `document` as a `Document` (retrieving it if it's a URL)'''
+        if isinstance(document, str):
+            return Document.from_session(document, self.session)
+        return document
+
+    @property
+    def lazy_documents(self):
+        '''A `DocumentSequence` with the documents in this corpus, retrieved
+        on demand using this corpus' session (`documents` is the list of
+        their URLs)'''
+        sequence = getattr(self, '_lazy_documents', None)
+        if sequence is None or sequence.source is not self.documents or \
+                len(sequence) != len(self.documents):
+            sequence = DocumentSequence(self.documents, self.session)
+            self._lazy_documents = sequence
+        return sequence
+
+    @classmethod
+    def from_url(cls, url, credentials, metrics=None):
+        '''Retrieve the corpus at `url` (recording the requests made with
+        its session in `metrics`, if given)'''
+        session = sessions.get(url, credentials, metrics=metrics)
+        result = session.get(url)
+        if result.status_code == 200:
+            return cls(session=session, **_decode_json(session, result))
+        else:
+            raise RuntimeError("Getting corpus details failed with status "
+                               "{}. The response was: '{}'".format(result.status_code,
+                                result.text))
+
+    def add_document(self, document, stream=False, callback=None,
+                     dedup=None):
+        '''
+        Add a document to this corpus
+
+        `document' is passed to `requests.post', so it can be a file-like
+        object, a string (that will be sent as the file content) or a tuple
+        containing a filename followed by any of these two options.
+
+        If `stream=True`, the request body is encoded while it's being sent
+        (see `pypln.api.upload.MultipartEncoder`), so big files are never
+        entirely loaded in memory. `callback`, if given, is called as
+        `callback(bytes_sent, total)` during the upload (and implies
+        `stream=True`).
+
+        If `dedup` (a `pypln.api.dedup.DedupManifest`) is given, the content
+        of `document` is hashed first and, if it was already uploaded,
+        `pypln.api.dedup.DuplicateDocumentError` is raised without sending
+        anything. Otherwise the new document is recorded in `dedup`.
+        '''
+        if dedup is None:
+            return self._add_document(document, stream, callback)
+
+        digest = dedup.claim(document)
+        try:
+            result = self._add_document(document, stream, callback)
+        except Exception:
+            dedup.release(digest)
+            raise
+        dedup.add(digest, result.url)
+        return result
+
+    def _add_document(self, document, stream, callback):
+        documents_url = urljoin(self.base_url, self.DOCUMENTS_PAGE)
+        data = {"corpus": self.url}
+        files = {"blob": document}
+        if stream or callback is not None:
+            body = MultipartEncoder(data, files, callback=callback)
+            result = self.session.post(documents_url, data=body,
+                    headers={'Content-Type': body.content_type})
+        else:
+            result = self.session.post(documents_url, data=data, files=files)
+        if result.status_code == 201:
+            return Document(session=self.session,
+                            **_decode_json(self.session, result))
+        else:
+            raise RuntimeError("Document creation failed with status "
+                               "{}. The response was: '{}'".format(result.status_code,
+                                result.text))
+
+    def add_documents(self, documents, workers=None, stream=False,
+                      dedup=None):
+        '''
+        Adds more than one document using the same API call
+
+        Returns two lists: the first one contains the successfully uploaded
+        documents, and the second one tuples with documents that failed to be
+        uploaded and the exceptions raised.
+
+        If `workers` is given, up to `workers` documents are uploaded at the
+        same time (sharing this corpus' session and its connection pool).
+        Results are still returned in the same order as `documents`. See
+        `add_document` for `stream` and `dedup`. If `dedup` is given, a third
+        list is returned, with tuples containing the documents that were
+        skipped and the URLs of the documents with the same content.
+        '''
+        add_document = self.add_document
+        if stream or dedup is not None:
+            add_document = functools.partial(self.add_document,
+                    stream=stream, dedup=dedup)
+        result, errors, skipped = [], [], []
+        if workers is None:
+            for document in documents:
+                try:
+                    result.append(add_document(document))
+                except DuplicateDocumentError as exc:
+                    skipped.append((document, exc.url))
+                except RuntimeError as exc:
+                    errors.append((document, exc))
+        else:
+            workers = _pool_workers(self.session, workers)
+            for document, uploaded, exc in _run_concurrently(add_document,
+                    documents, workers):
+                if exc is None:
+                    result.append(uploaded)
+                elif isinstance(exc, DuplicateDocumentError):
+                    skipped.append((document, exc.url))
+                elif isinstance(exc, RuntimeError):
+                    errors.append((document, exc))
+                else:
+                    raise exc
+
+        if dedup is not None:
+            return result, errors, skipped
+        return result, errors
+
+    def fetch_property(self, prop, documents, workers=10, processes=None,
+                       transform=None):
+        '''
+        Get the property `prop` of each one of `documents`
+
+        `documents` can contain `Document` objects or document URLs and up
+        to `workers` properties are retrieved at the same time. Yields
+        `(document, value, exception)` tuples as each request completes (one
+        of `value` and `exception` is `None`). If given, `transform` is
+        called with each value and what it returns is yielded instead (e.g.
+        `decode_wordcloud`).
+
+        If `processes` is given, values are decoded and transformed in a pool
+        of `processes` processes. `transform` and the session's JSON decoder
+        must then be picklable (`ValueError` is raised otherwise) and scripts
+        need an `if __name__ == '__main__':` guard.
+        '''
+        workers = _pool_workers(self.session, workers)
+        if processes is not None:
+            import pickle
+
+            loads = getattr(self.session, 'json_loads', None)
+            for name, function in (('transform', transform),
+                                   ('JSON decoder', loads)):
+                try:
+                    pickle.dumps(function)
+                except Exception:
+                    raise ValueError("The {} must be picklable to be used "
+                            "in other processes (such as a function defined "
+                            "at the top level of a module)".format(name))
+            return self._fetch_property_in_processes(prop, documents,
+                    workers, processes, transform, loads)
+
+        def fetch(document):
+            value = self._hydrate(document).get_property(prop)
+            return value if transform is None else transform(value)
+        return _run_concurrently(fetch, documents, workers, ordered=False)
+
+    def _fetch_property_in_processes(self, prop, documents, workers,
+                                     processes, transform, loads):
+        # Importing `multiprocessing` is slow, so it's only done if needed
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        # Decoding big properties (and transforming them) uses the CPU while
+        # holding the GIL, so the threads only download the responses and the
+        # processes decode them (without the session's memory cache). This
+        # process may be running other threads, so the processes are not
+        # forked from it
+        fetch = lambda document: \
+                self._hydrate(document)._fetch_raw_property(prop)
+        if 'forkserver' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('forkserver')
+        else:
+            context = multiprocessing.get_context('spawn')
+
+        def result(future, document):
+            try:
+                return document, future.result(), None
+            except Exception as exc:
+                return document, None, exc
+
+        with ProcessPoolExecutor(max_workers=processes,
+                                 mp_context=context) as executor:
+            pending = {}
+            for document, content, exc in _run_concurrently(fetch,
+                    documents, workers, ordered=False):
+                if exc is not None:
+                    yield document, None, exc
+                    continue
+                # At most `2 * processes` responses wait to be decoded
+                while len(pending) >= 2 * processes:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield result(future, pending.pop(future))
+                future = executor.submit(_decode_property, content, loads,
+                                         transform)
+                pending[future] = document
+            for future in as_completed(pending):
+                yield result(future, pending[future])
+
+    def export_property(self, prop, path, format='jsonl', documents=None,
+                        workers=10):
+        '''
+        Save the property `prop` of each one of `documents` to `path`
+
+        `documents` can contain `Document` objects or document URLs (by
+        default, all the documents in this corpus are used) and up to
+        `workers` properties are retrieved at the same time. Each value is
+        written to the disk as soon as it's received, in the order they're
+        received, so memory use does not depend on the number of documents.
+
+        `format` can be `'jsonl'` (one JSON object with the `url` and `value`
+        of a document per line) or `'columnar'` (the values and an index of
+        where each one starts, which can be read with
+        `pypln.api.export.PropertyFile`). Files are only renamed to `path`
+        when they're complete.
+
+        Returns the number of documents saved and a list of tuples with the
+        documents that failed and the exceptions raised.
+        '''
+        if format not in FORMATS:
+            raise ValueError("`format` must be one of: {}".format(
+                ', '.join(sorted(FORMATS))))
+        if documents is None:
+            documents = self.documents
+
+        def fetch(document):
+            document = self._hydrate(document)
+            return document.url, document.get_property(prop)
+
+        writer = FORMATS[format](path)
+        errors = []
+        workers = _pool_workers(self.session, workers)
+        try:
+            for document, result, exc in _run_concurrently(fetch, documents,
+                    workers, ordered=False):
+                if exc is None:
+                    writer.write(*result)
+                else:
+                    errors.append((document, exc))
+        except BaseException:
+            writer.abort()
+            raise
+        writer.commit()
+        return writer.count, errors
+
+    def term_matrix(self, documents=None, workers=10, update=None,
+                    batch_size=1000):
+        '''
+        Build a term-document matrix from the `freqdist` of `documents`
+
+        `documents` can contain `Document` objects or document URLs (by
+        default, all the documents in this corpus are used) and up to
+        `workers` properties are retrieved at the same time. Returns a
+        `pypln.api.matrix.TermMatrix` (which needs numpy and scipy) and a
+        list of tuples with the documents that failed and the exceptions
+        raised.
+
+        If `update` (a `TermMatrix` returned before) is given, only
+        documents that are not in it are retrieved and they're added to it
+        as new rows.
+        '''
+        from pypln.api.matrix import TermMatrix
+
+        matrix = update if update is not None else \
+                TermMatrix(batch_size=batch_size)
+        if documents is None:
+            documents = self.documents
+        documents = (document for document in documents
+                     if getattr(document, 'url', document) not in matrix)
+
+        def fetch(document):
+            document = self._hydrate(document)
+            return document.url, document.get_property('freqdist')
+
+        errors = []
+        workers = _pool_workers(self.session, workers)
+        for document, result, exc in _run_concurrently(fetch, documents,
+                workers, ordered=False):
+            if exc is None:
+                matrix.add(*result)
+            else:
+                errors.append((document, exc))
+        return matrix, errors
+
+    def wait_until_processed(self, documents=None, required=('text',),
+                             timeout=None, workers=10, initial_delay=1.0,
+                             max_delay=60.0, callback=None, max_failures=5):
+        '''
+        Wait until each one of `documents` has all the `required` properties
+
+        `documents` can contain `Document` objects or document URLs (by
+        default, all the documents in this corpus are used) and up to
+        `workers` of them are polled at the same time. Each document is
+        polled again after a delay that starts at `initial_delay` seconds and
+        doubles up to `max_delay`. `callback(document)`, if given, is called
+        as soon as a document is ready. Documents that fail to be polled
+        `max_failures` times in a row are given up on.
+
+        Stops after `timeout` seconds (by default, waits as long as needed)
+        and returns three lists: the documents that are ready, the ones that
+        are not and tuples with the documents given up on and the last
+        exception raised.
+        '''
+        if documents is None:
+            documents = self.documents
+        required = set(required)
+        deadline = None if timeout is None else time.time() + timeout
+
+        def poll(document):
+            document = self._hydrate(document)
+            return document, required.issubset(document._fetch_properties())
+
+        # Heap of (poll time, order, document, delay, consecutive failures).
+        # Delays get random jitter so polls are spread over time, and ready
+        # documents are returned in the order they got ready
+        schedule = [(0, order, document, initial_delay, 0)
+                    for order, document in enumerate(documents)]
+        ready, failed, in_flight = [], [], {}
+        workers = _pool_workers(self.session, workers)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while schedule or in_flight:
+                now = time.time()
+                if deadline is not None and now >= deadline:
+                    break
+                while schedule and schedule[0][0] <= now and \
+                        len(in_flight) < workers:
+                    poll_at, order, document, delay, failures = \
+                            heapq.heappop(schedule)
+                    future = executor.submit(poll, document)
+                    in_flight[future] = (order, document, delay, failures)
+
+                next_poll = schedule[0][0] if schedule else None
+                if deadline is not None:
+                    next_poll = min(next_poll or deadline, deadline)
+                wait_for = None if next_poll is None else \
+                        max(0, next_poll - now)
+                if not in_flight:
+                    time.sleep(wait_for)
+                    continue
+                if len(in_flight) >= workers:
+                    wait_for = None if deadline is None else \
+                            max(0, deadline - now)
+                done, _ = wait(in_flight, timeout=wait_for,
+                               return_when=FIRST_COMPLETED)
+                for future in done:
+                    order, document, delay, failures = in_flight.pop(future)
+                    try:
+                        polled, is_ready = future.result()
+                    except Exception as exc:
+                        failures += 1
+                        if failures >= max_failures:
+                            failed.append((document, exc))
+                            continue
+                        is_ready = False
+                    else:
+                        document, failures = polled, 0
+                    if is_ready:
+                        # The properties listed before may be outdated
+                        document.invalidate_cache()
+                        ready.append(document)
+                        if callback is not None:
+                            callback(document)
+                    else:
+                        jittered = random.uniform(delay / 2, delay)
+                        heapq.heappush(schedule, (time.time() + jittered,
+                                order, document, min(2 * delay, max_delay),
+                                failures))
+
+            for future in in_flight:
+                future.cancel()
+        pending = [document for order, document in sorted(
+            [(order, document) for order, document, delay, failures in
+             in_flight.values()] +
+            [(order, document) for poll_at, order, document, delay, failures
+             in schedule])]
+        return ready, pending, failed
+
+    def export_wordclouds(self, directory, documents=None, workers=4):
+        '''
+        Save the wordcloud image of each document in `directory`
+
+        `documents` can contain `Document` objects or document URLs (by
+        default, all the documents in this corpus are used). Each image is
+        saved as `wordcloud_<document id>.png` and documents that already
+        have an image in `directory` are skipped. Up to `workers` images are
+        downloaded at the same time.
+
+        Returns two lists: the first one contains the filenames of the
+        downloaded images, and the second one tuples with documents that
+        failed and the exceptions raised.
+        '''
+        if documents is None:
+            documents = self.documents
+
+        def missing_wordclouds():
+            for document in documents:
+                url = getattr(document, 'url', document)
+                filename = os.path.join(directory, 'wordcloud_{}.png'.format(
+                    _document_id(url)))
+                if not os.path.exists(filename):
+                    yield document, filename
+
+        def download(item):
+            document, filename = item
+            self._hydrate(document).download_wordcloud(filename)
+            return filename
+
+        workers = _pool_workers(self.session, workers)
+        result, errors = [], []
+        for (document, filename), downloaded, exc in _run_concurrently(
+                download, missing_wordclouds(), workers):
+            if exc is None:
+                result.append(downloaded)
+            else:
+                errors.append((document, exc))
+        return result, errors
+
+    def mirror(self, path, properties=None, workers=4, revalidate=False):
+        '''
+        Keep a local copy of the properties of the documents in this corpus
+
+        Property `prop` of each document is saved (as returned by the API) as
+        `path/<document id>/<prop>.json`. By default every property is saved,
+        but `properties` can be a list of the ones that should be. Up to
+        `workers` documents are downloaded at the same time. Running it
+        again only downloads new documents and properties; if
+        `revalidate=True`, saved properties are also downloaded again if
+        they changed.
+
+        Returns two lists: the first one contains the URLs of the documents
+        that had something downloaded, and the second one tuples with
+        documents that failed and the exceptions raised.
+        '''
+        os.makedirs(path, exist_ok=True)
+        # What was downloaded is recorded as soon as each document is saved,
+        # so documents that already have every property in `properties` are
+        # skipped without any request (unless revalidating, which uses the
+        # saved `ETag`/`Last-Modified`)
+        manifest = MirrorManifest(path)
+
+        def is_complete(entry):
+            return entry is not None and properties is not None and \
+                    all(prop in entry['properties'] for prop in properties)
+
+        def outdated_documents():
+            for document in self.documents:
+                url = getattr(document, 'url', document)
+                if revalidate or not is_complete(manifest.get(url)):
+                    yield url
+
+        def download(url):
+            saved_entry = manifest.get(url) or {'properties': {}}
+            entry = dict(saved_entry,
+                         properties=dict(saved_entry['properties']))
+            if 'properties_url' not in entry:
+                entry['properties_url'] = Document.from_session(url,
+                        self.session).properties_url
+            document = DocumentRecord(session=self.session, url=url,
+                                      properties=entry['properties_url'])
+            directory = os.path.join(path, _document_id(url))
+            os.makedirs(directory, exist_ok=True)
+
+            changed = False
+            for prop in properties or document.properties:
+                filename = os.path.join(directory, prop + '.json')
+                saved = entry['properties'].get(prop)
+                headers = {}
+                if saved is not None and os.path.exists(filename):
+                    if not revalidate:
+                        continue
+                    if saved['etag'] is not None:
+                        headers['If-None-Match'] = saved['etag']
+                    if saved['last_modified'] is not None:
+                        headers['If-Modified-Since'] = saved['last_modified']
+
+                response = self.session.get(
+                        urljoin(document.properties_url, prop),
+                        headers=headers)
+                if response.status_code == 304:
+                    continue
+                elif response.status_code == 404:
+                    # Not available (yet)
+                    continue
+                elif response.status_code != 200:
+                    raise RuntimeError("Getting property {} failed with "
+                            "status {}. The response was: '{}'".format(prop,
+                                response.status_code, response.text))
+                write_atomically(filename, response.content)
+                entry['properties'][prop] = {
+                        'etag': response.headers.get('ETag'),
+                        'last_modified': response.headers.get('Last-Modified')}
+                changed = True
+            return entry, changed
+
+        workers = _pool_workers(self.session, workers)
+        result, errors = [], []
+        try:
+            for url, downloaded, exc in _run_concurrently(download,
+                    outdated_documents(), workers, ordered=False):
+                if exc is not None:
+                    errors.append((url, exc))
+                    continue
+                entry, changed = downloaded
+                if changed or manifest.get(url) is None:
+                    manifest.set(url, entry)
+                if changed:
+                    result.append(url)
+        finally:
+            manifest.compact()
+        return result, errors
+
+
+class PyPLN(object):
+    """
+    Class to connect to PyPLN's API and execute some actions
+    """
+    CORPORA_PAGE = '/corpora/'
+    DOCUMENTS_PAGE = '/documents/'
+
+    def __init__(self, base_url, credentials, property_cache=None,
+                 memory_cache=None, json_decoder=None, metrics=None):
+        """
+        Initialize the API object, setting the base URL for the REST
+        API, as well as the username and password to be used.
+
+        If `property_cache` (a `pypln.api.cache.PropertyCache`) is given,
+        document properties are stored in it and only downloaded again when
+        they change. If `memory_cache` (a `pypln.api.cache.MemoryCache`) is
+        given, the list of properties of each document and their values are
+        kept in memory (see `Document.invalidate_cache`). If `json_decoder`
+        is given, it's used to decode every response (see
+        `get_json_decoder`), instead of `response.json()`. If `metrics` (a
+        `pypln.api.metrics.Metrics`) is given, every request is recorded in
+        it.
+
+        Connections are shared with every other object using the same host
+        and credentials (see `SessionPool`), but these options only apply to
+        this object and the corpora and documents it returns.
+        """
+        self.base_url = base_url
+        if json_decoder is not None:
+            json_decoder = get_json_decoder(json_decoder)
+        # Corpora and documents share this session, so everything that should
+        # be shared by them is attached to it
+        self.session = sessions.get(base_url, credentials,
+                property_cache=property_cache, memory_cache=memory_cache,
+                json_loads=json_decoder, metrics=metrics)
+
+    def add_corpus(self, name, description):
+        '''Add a corpus to your account'''
+        corpora_url = self.base_url + self.CORPORA_PAGE
+        data = {'name': name, 'description': description}
+        result = self.session.post(corpora_url, data=data)
+        if result.status_code == 201:
+            return Corpus(session=self.session,
+                          **_decode_json(self.session, result))
+        else:
+            raise RuntimeError("Corpus creation failed with status "
+                               "{}. The response was: '{}'".format(result.status_code,
+                                result.text))
+
+    def _get_page(self, url):
+        '''Download one page of a listing and return its parsed content'''
+        response = self.session.get(url)
+        if response.status_code == 200:
+            return _decode_json(self.session, response)
+        else:
+            raise RuntimeError("Failed downloading data with status {}"
+                    ". The response was: '{}'"
+                    .format(response.status_code, response.text))
+
+    def _iter_pages(self, url, full, parallel=None):
+        '''Yield the pages of a listing, following `next` links if `full`
+
+        If `parallel` is given, the URLs of the remaining pages are derived
+        from the first one (using `count`) and up to `parallel` pages are
+        downloaded at the same time. Pages are still yielded in order.'''
+        result = self._get_page(url)
+        yield result
+        if full and parallel and result['next'] is not None:
+            urls = _page_urls(result['next'], result['count'],
+                              len(result['results']))
+            if urls is not None:
+                parallel = _pool_workers(self.session, parallel)
+                for url, page, exc in _run_concurrently(self._get_page, urls,
+                                                        parallel):
+                    if exc is not None:
+                        raise exc
+                    yield page
+                return
+        while full and result['next'] is not None:
+            result = self._get_page(result['next'])
+            yield result
+
+    def _iter_resources(self, url, class_, full, prefetch=0, parallel=None):
+        '''Yield objects for HTTP resources, one page at a time
+
+        If `prefetch` is greater than zero, up to `prefetch` pages are
+        downloaded in background while the current one is being consumed. If
+        `parallel` is given, up to `parallel` pages are downloaded at the
+        same time (see `_iter_pages`).'''
+        pages = self._iter_pages(url, full, parallel)
+        if full and prefetch > 0:
+            pages = _prefetch(pages, prefetch)
+        for page in pages:
+            for resource in page['results']:
+                yield class_(session=self.session, **resource)
+
+    def _retrieve_resources(self, url, class_, full, prefetch=0,
+                            parallel=None):
+        '''Retrieve HTTP resources, return related objects (with pagination)'''
+        return list(self._iter_resources(url, class_, full, prefetch,
+                                         parallel))
+
+    def corpora(self, full=False, prefetch=0, parallel=None):
+        '''Return list of corpora owned by user.
+
+        If `full=True`, it'll download all pages returned by the HTTP server.
+        `prefetch` is the number of pages to download in background and
+        `parallel` the number of pages to download at the same time (see
+        `iter_corpora`).'''
+        url = self.base_url + self.CORPORA_PAGE
+        class_ = Corpus
+        results = self._retrieve_resources(url, class_, full, prefetch,
+                                           parallel)
+        return results
+
+    def documents(self, full=False, prefetch=0, parallel=None,
+                  compact=False):
+        '''Return list of documents owned by user.
+
+        If `full=True`, it'll download all pages returned by the HTTP server.
+        `prefetch` is the number of pages to download in background and
+        `parallel` the number of pages to download at the same time (see
+        `iter_documents`). If `compact=True`, `DocumentRecord` objects are
+        returned instead of `Document` objects.'''
+        url = self.base_url + self.DOCUMENTS_PAGE
+        class_ = DocumentRecord if compact else Document
+        results = self._retrieve_resources(url, class_, full, prefetch,
+                                           parallel)
+        return results
+
+    def iter_corpora(self, full=True, prefetch=0, parallel=None):
+        '''Iterate over the corpora owned by user.
+
+        Pages are only downloaded when needed, so only one page is kept in
+        memory at a time. If `full=False`, only the first page is used.
+
+        If `prefetch` is greater than zero, up to `prefetch` pages are
+        downloaded in background while the current one is consumed. If
+        `parallel` is given, the URLs of all pages are derived from the first
+        one and up to `parallel` of them are downloaded at the same time;
+        corpora are still yielded in the order returned by the server.'''
+        url = self.base_url + self.CORPORA_PAGE
+        return self._iter_resources(url, Corpus, full, prefetch, parallel)
+
+    def iter_documents(self, full=True, prefetch=0, parallel=None,
+                       compact=False):
+        '''Iterate over the documents owned by user.
+
+        Pages are only downloaded when needed, so only one page is kept in
+        memory at a time. If `full=False`, only the first page is used.
+
+        If `prefetch` is greater than zero, up to `prefetch` pages are
+        downloaded in background while the current one is consumed. If
+        `parallel` is given, the URLs of all pages are derived from the first
+        one and up to `parallel` of them are downloaded at the same time;
+        documents are still yielded in the order returned by the server. If
+        `compact=True`, `DocumentRecord` objects are yielded instead of
+        `Document` objects.'''
+        url = self.base_url + self.DOCUMENTS_PAGE
+        class_ = DocumentRecord if compact else Document
+        return self._iter_resources(url, class_, full, prefetch, parallel)
+
+    def document_table(self, full=True, prefetch=0, parallel=None):
+        '''Return a `pypln.api.table.DocumentTable` with the documents owned
+        by user, built directly from the pages of the listing (see
+        `iter_documents` for the arguments).'''
+        url = self.base_url + self.DOCUMENTS_PAGE
+        pages = self._iter_pages(url, full, parallel)
+        if full and prefetch > 0:
+            pages = _prefetch(pages, prefetch)
+        return DocumentTable.from_pages(pages, session=self.session)
@@ -0,0 +1,324 @@
+# coding: utf-8
+#
+# Copyright 2012 NAMD-EMAP-FGV
+#
+# This file is part of PyPLN. You can get more information at: http://pypln.org/.
+#
+# PyPLN is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyPLN is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyPLN.  If not, see <http://www.gnu.org/licenses/>.
+
+'''asyncio version of `pypln.api`, built on top of `aiohttp`
+
+All the objects created from an `AsyncPyPLN` instance share the same
+`aiohttp.ClientSession` (and so the same connection pool), which must be
+created from inside a running event loop:
+
+    async with AsyncPyPLN('http://fgv.pypln.org/', 'my-token') as pypln:
+        documents = await pypln.documents()
+        texts = await asyncio.gather(*[document.get_property('text')
+                                       for document in documents])
+'''
+
+import asyncio
+import base64
+import os
+from urllib.parse import urljoin
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from pypln.api import __version__
+
+
+def get_session_with_credentials(credentials, limit=100, limit_per_host=0,
+                                 metrics=None):
+    '''Create an `aiohttp.ClientSession` authenticated with `credentials`
+
+    `limit` is the total number of simultaneous connections and
+    `limit_per_host` the number of simultaneous connections to the same
+    host (`0` means no limit). If `metrics` (a `pypln.api.metrics.Metrics`)
+    is given, every request is recorded in it.'''
+    headers = {'User-Agent': 'pypln.api/{} aiohttp/{}'.format(__version__,
+        aiohttp.__version__)}
+    if isinstance(credentials, tuple):
+        user_pass = '{}:{}'.format(*credentials).encode('latin1')
+        headers['Authorization'] = 'Basic {}'.format(
+                base64.b64encode(user_pass).decode('ascii'))
+    elif isinstance(credentials, str):
+        headers['Authorization'] = 'Token {}'.format(credentials)
+    else:
+        raise TypeError("`credentials` must be a tuple (for HTTP Basic authentication) or a string (for Token authentication).")
+
+    connector = aiohttp.TCPConnector(limit=limit,
+            limit_per_host=limit_per_host)
+    trace_configs = [] if metrics is None else [metrics.trace_config()]
+    return aiohttp.ClientSession(connector=connector, headers=headers,
+                                 trace_configs=trace_configs)
+
+
+class AsyncDocument(object):
+    '''Class that represents a Document in PyPLN'''
+    def __init__(self, session, *args, **kwargs):
+
+        self.session = session
+        for key, value in kwargs.items():
+            # See `pypln.api.Document.__init__'
+            if key == 'properties':
+                key = 'properties_url'
+            setattr(self, key, value)
+
+    def __repr__(self):
+        return '<AsyncDocument: {} ({})>'.format(self.blob, self.url)
+
+    def __eq__(self, other):
+        return (self.url == other.url) and \
+                (self.size == other.size) and \
+                (self.uploaded_at == other.uploaded_at) and \
+                (self.owner == other.owner) and \
+                (self.corpus == other.corpus)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(self.url)
+
+    @classmethod
+    async def from_url(cls, url, session):
+        '''Retrieve a document using `session` (an `aiohttp.ClientSession`
+        such as `AsyncPyPLN.session`)'''
+        async with session.get(url) as response:
+            if response.status == 200:
+                return cls(session=session, **(await response.json()))
+            else:
+                raise RuntimeError("Getting document details failed with status "
+                                   "{}. The response was: '{}'".format(response.status,
+                                    await response.text()))
+
+    async def get_property(self, prop):
+        url = urljoin(self.properties_url, prop)
+        async with self.session.get(url) as response:
+            if response.status == 200:
+                return (await response.json())['value']
+            else:
+                raise RuntimeError("Getting property {} failed with status "
+                                   "{}. The response was: '{}'".format(prop,
+                                       response.status, await response.text()))
+
+    async def download_wordcloud(self, filename):
+        encoded_png = await self.get_property('wordcloud')
+        with open(filename, 'wb') as fp:
+            fp.write(base64.b64decode(encoded_png))
+
+    @property
+    def properties(self):
+        '''Coroutine returning the list of available properties
+
+        Use it as `await document.properties`.'''
+        return self._get_properties()
+
+    async def _get_properties(self):
+        async with self.session.get(self.properties_url) as response:
+            if response.status == 200:
+                return [prop.split(self.properties_url)[1].replace('/', '')
+                        for prop in (await response.json())['properties']]
+            else:
+                raise RuntimeError("Getting document properties failed with status "
+                                   "{}. The response was: '{}'".format(response.status,
+                                    await response.text()))
+
+
+class AsyncCorpus(object):
+    '''Class that represents a Corpus in PyPLN'''
+    DOCUMENTS_PAGE = '/documents/'
+
+    def __init__(self, session, *args, **kwargs):
+        ''' Initializes an AsyncCorpus class
+
+        `session` must be an `aiohttp.ClientSession` object with
+        authentication data
+        '''
+        self.session = session
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+        splited_url = urlsplit(self.url)
+        self.base_url = "{}://{}".format(splited_url.scheme, splited_url.netloc)
+
+    def __repr__(self):
+        return '<AsyncCorpus: {} ({})>'.format(self.name, self.url)
+
+    def __eq__(self, other):
+        return (self.name == other.name) and \
+                (self.description == other.description) and \
+                (self.created_at == other.created_at) and \
+                (self.owner == other.owner) and \
+                (self.url == other.url)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(self.url)
+
+    @classmethod
+    async def from_url(cls, url, session):
+        '''Retrieve a corpus using `session` (an `aiohttp.ClientSession`
+        such as `AsyncPyPLN.session`)'''
+        async with session.get(url) as response:
+            if response.status == 200:
+                return cls(session=session, **(await response.json()))
+            else:
+                raise RuntimeError("Getting corpus details failed with status "
+                                   "{}. The response was: '{}'".format(response.status,
+                                    await response.text()))
+
+    async def add_document(self, document):
+        '''
+        Add a document to this corpus
+
+        `document' can be a file-like object, a string or bytes (that will be
+        sent as the file content) or a tuple containing a filename followed by
+        any of these options.
+        '''
+        if isinstance(document, tuple):
+            filename, content = document
+        else:
+            # As `requests` does, only the last part of the path is sent
+            # (files opened from a file descriptor have an `int` name)
+            name = getattr(document, 'name', None)
+            filename = os.path.basename(name) if isinstance(name, str) \
+                    else 'blob'
+            content = document
+
+        documents_url = urljoin(self.base_url, self.DOCUMENTS_PAGE)
+        data = aiohttp.FormData()
+        data.add_field('corpus', self.url)
+        data.add_field('blob', content, filename=filename)
+        async with self.session.post(documents_url, data=data) as response:
+            if response.status == 201:
+                return AsyncDocument(session=self.session,
+                        **(await response.json()))
+            else:
+                raise RuntimeError("Document creation failed with status "
+                                   "{}. The response was: '{}'".format(response.status,
+                                    await response.text()))
+
+    async def add_documents(self, documents, workers=None):
+        '''
+        Adds more than one document
+
+        Returns two lists: the first one contains the successfully uploaded
+        documents, and the second one tuples with documents that failed to be
+        uploaded and the exceptions raised. If `workers` is given, at most
+        `workers` documents are uploaded at the same time.
+        '''
+        documents = list(documents)
+        semaphore = asyncio.Semaphore(workers or len(documents) or 1)
+
+        async def add_document(document):
+            async with semaphore:
+                return await self.add_document(document)
+
+        uploads = await asyncio.gather(*[add_document(document)
+            for document in documents], return_exceptions=True)
+        result, errors = [], []
+        for document, uploaded in zip(documents, uploads):
+            if isinstance(uploaded, RuntimeError):
+                errors.append((document, uploaded))
+            elif isinstance(uploaded, BaseException):
+                raise uploaded
+            else:
+                result.append(uploaded)
+
+        return result, errors
+
+
+class AsyncPyPLN(object):
+    """
+    Class to connect to PyPLN's API and execute some actions using asyncio
+    """
+    CORPORA_PAGE = '/corpora/'
+    DOCUMENTS_PAGE = '/documents/'
+
+    def __init__(self, base_url, credentials, limit=100, limit_per_host=0,
+                 metrics=None):
+        """
+        Initialize the API object, setting the base URL for the REST
+        API, as well as the credentials to be used.
+
+        `limit` and `limit_per_host` configure the connection pool shared by
+        every request made through this object and `metrics` records them
+        (see `get_session_with_credentials`).
+        """
+        self.base_url = base_url
+        self.session = get_session_with_credentials(credentials, limit,
+                limit_per_host, metrics)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        '''Close the underlying connection pool'''
+        await self.session.close()
+
+    async def add_corpus(self, name, description):
+        '''Add a corpus to your account'''
+        corpora_url = self.base_url + self.CORPORA_PAGE
+        data = {'name': name, 'description': description}
+        async with self.session.post(corpora_url, data=data) as response:
+            if response.status == 201:
+                return AsyncCorpus(session=self.session,
+                        **(await response.json()))
+            else:
+                raise RuntimeError("Corpus creation failed with status "
+                                   "{}. The response was: '{}'".format(response.status,
+                                    await response.text()))
+
+    async def _get_page(self, url):
+        async with self.session.get(url) as response:
+            if response.status == 200:
+                return await response.json()
+            else:
+                raise RuntimeError("Failed downloading data with status {}"
+                        ". The response was: '{}'"
+                        .format(response.status, await response.text()))
+
+    async def _retrieve_resources(self, url, class_, full):
+        '''Retrieve HTTP resources, return related objects (with pagination)'''
+        objects_to_return = []
+        result = await self._get_page(url)
+        objects_to_return.extend([class_(session=self.session, **resource)
+                                  for resource in result['results']])
+        while full and result['next'] is not None:
+            result = await self._get_page(result['next'])
+            objects_to_return.extend([class_(session=self.session, **resource)
+                                      for resource in result['results']])
+        return objects_to_return
+
+    async def corpora(self, full=False):
+        '''Return list of corpora owned by user.
+
+        If `full=True`, it'll download all pages returned by the HTTP server'''
+        url = self.base_url + self.CORPORA_PAGE
+        return await self._retrieve_resources(url, AsyncCorpus, full)
+
+    async def documents(self, full=False):
+        '''Return list of documents owned by user.
+
+        If `full=True`, it'll download all pages returned by the HTTP server'''
+        url = self.base_url + self.DOCUMENTS_PAGE
+        return await self._retrieve_resources(url, AsyncDocument, full)
@@ -0,0 +1,239 @@
+# coding: utf-8
+#
+# Copyright 2012 NAMD-EMAP-FGV
+#
+# This file is part of PyPLN. You can get more information at: http://pypln.org/.
+#
+# PyPLN is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyPLN is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyPLN.  If not, see <http://www.gnu.org/licenses/>.
+
+'''Caches for the responses of PyPLN's API'''
+
+import collections
+import hashlib
+import json
+import os
+import threading
+import time
+
+from pypln.api.files import AtomicFile
+
+CacheEntry = collections.namedtuple('CacheEntry',
+        ['body', 'etag', 'last_modified', 'stored_at'])
+
+
+class PropertyCache(object):
+    '''Persistent cache of document properties, stored in `directory`
+
+    Entries are keyed by the property URL and the credentials used to get
+    it (so users sharing the directory never get each other's entries) and
+    hold the raw response body plus the `ETag` and `Last-Modified` headers
+    sent by the server, so they can be revalidated with a conditional
+    request. Entries stored less than `max_age` seconds ago are used without
+    asking the server at all. If `max_age` is `None`, entries are always
+    revalidated, except the ones without an `ETag` or `Last-Modified` (which
+    can't be), which are used as they are for `unvalidated_max_age` seconds.
+
+    When the total size of the entries goes over `max_size` bytes, the least
+    recently used ones are removed. Every entry is written to a temporary
+    file and then atomically renamed, so many processes can share the same
+    directory.
+    '''
+    SUFFIX = '.entry'
+
+    def __init__(self, directory, max_size=512 * 1024 * 1024, max_age=None,
+                 unvalidated_max_age=300):
+        self.directory = directory
+        self.max_size = max_size
+        self.max_age = max_age
+        self.unvalidated_max_age = unvalidated_max_age
+        self._written = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url, credentials=None):
+        key = hashlib.sha256('{}\n{}'.format(credentials or '', url)
+                             .encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def get(self, url, credentials=None):
+        '''Return the `CacheEntry` for `url` (retrieved with `credentials`,
+        a string) or `None` if it's not cached'''
+        path = self._path(url, credentials)
+        try:
+            with open(path, 'rb') as fp:
+                header = json.loads(fp.readline().decode('utf-8'))
+                body = fp.read()
+            # The modification time is used to find the least recently used
+            # entries
+            os.utime(path, None)
+        except (OSError, ValueError):
+            return None
+        return CacheEntry(body, header.get('etag'),
+                          header.get('last_modified'), header['stored_at'])
+
+    def is_fresh(self, entry):
+        '''Return whether `entry` can be used without revalidating it'''
+        max_age = self.max_age
+        if max_age is None:
+            if entry.etag is not None or entry.last_modified is not None:
+                return False
+            max_age = self.unvalidated_max_age
+        return time.time() - entry.stored_at < max_age
+
+    def set(self, url, body, etag=None, last_modified=None,
+            credentials=None):
+        '''Store `body` (bytes) as the cached content of `url` (retrieved
+        with `credentials`)'''
+        header = json.dumps({'url': url, 'etag': etag,
+                             'last_modified': last_modified,
+                             'stored_at': time.time()})
+        with AtomicFile(self._path(url, credentials)) as fp:
+            fp.write(header.encode('utf-8') + b'\n')
+            fp.write(body)
+
+        # Listing the whole directory is expensive, so only check its size
+        # after a fraction of `max_size` has been written
+        self._written += len(body)
+        if self._written >= self.max_size // 16:
+            self._written = 0
+            self.evict()
+
+    def delete(self, url, credentials=None):
+        '''Remove `url` from the cache, if it's there'''
+        try:
+            os.remove(self._path(url, credentials))
+        except OSError:
+            pass
+
+    def _entries(self):
+        entries = []
+        for filename in os.listdir(self.directory):
+            if not filename.endswith(self.SUFFIX):
+                continue
+            path = os.path.join(self.directory, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                # Removed by another process
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def size(self):
+        '''Return the total size of the cached entries, in bytes'''
+        return sum(size for mtime, size, path in self._entries())
+
+    def evict(self):
+        '''Remove least recently used entries until the cache fits in
+        `max_size`'''
+        entries = sorted(self._entries())
+        total = sum(size for mtime, size, path in entries)
+        for mtime, size, path in entries:
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        '''Remove all the entries'''
+        for mtime, size, path in self._entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class MemoryCache(object):
+    '''In-memory cache with least recently used eviction and expiration
+
+    At most `max_entries` entries are kept and each one of them expires
+    `ttl` seconds after being stored (never, if `ttl` is `None`). The number
+    of hits, misses and evictions are kept in `hits`, `misses` and
+    `evictions` (see `stats`) to help tuning `max_entries` and `ttl`. It's
+    safe to use the same cache from many threads.
+
+    Cached values are returned as they were stored, so they should not be
+    modified by the caller.
+    '''
+
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = self.misses = self.evictions = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        '''Return the value stored for `key` or `default` if there's no such
+        value (or it has expired)'''
+        with self._lock:
+            try:
+                expires_at, value = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                self.misses += 1
+                return default
+            # Move it to the end, so the first one is the least recently used
+            del self._entries[key]
+            self._entries[key] = (expires_at, value)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        '''Store `value` for `key`'''
+        expires_at = None
+        if self.ttl is not None:
+            expires_at = time.time() + self.ttl
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (expires_at, value)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        '''Remove `key` from the cache, if it's there'''
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_prefix(self, prefix):
+        '''Remove every key starting with `prefix`'''
+        with self._lock:
+            for key in [key for key in self._entries
+                        if key.startswith(prefix)]:
+                del self._entries[key]
+
+    def clear(self):
+        '''Remove all the entries (statistics are kept)'''
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        '''Return a dict with the cache statistics'''
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'entries': len(self._entries),
+                    'max_entries': self.max_entries,
+                    'hits': self.hits,
+                    'misses': self.misses,
+                    'evictions': self.evictions,
+                    'hit_rate': float(self.hits) / lookups if lookups else 0.0}
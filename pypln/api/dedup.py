@@ -0,0 +1,235 @@
+# coding: utf-8
+#
+# Copyright 2012 NAMD-EMAP-FGV
+#
+# This file is part of PyPLN. You can get more information at: http://pypln.org/.
+#
+# PyPLN is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyPLN is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyPLN.  If not, see <http://www.gnu.org/licenses/>.
+
+'''Detection of documents that were already uploaded to a corpus'''
+
+import hashlib
+import json
+import os
+import threading
+
+from pypln.api.files import write_atomically
+from pypln.api.mirror import open_for_appending
+from pypln.api.upload import CHUNK_SIZE, _to_bytes
+
+
+class DuplicateDocumentError(RuntimeError):
+    '''Raised when a document was already uploaded to the corpus
+
+    `url` is the URL of the existing document (or `None` if the same content
+    is being uploaded at the same time).'''
+
+    def __init__(self, document, url):
+        if url is None:
+            message = "Document is already being uploaded"
+        else:
+            message = "Document was already uploaded as {}".format(url)
+        super(DuplicateDocumentError, self).__init__(message)
+        self.document = document
+        self.url = url
+
+
+def _split(document):
+    '''Return the filename (or `None`) and content of `document` (in any of
+    the forms accepted by `Corpus.add_document`)'''
+    if isinstance(document, tuple):
+        return document
+    name = getattr(document, 'name', None)
+    # Files opened from a file descriptor have an `int` name
+    if name is not None and not isinstance(name, int):
+        return os.path.basename(name), document
+    return None, document
+
+
+def content_hash(document):
+    '''Return the SHA-256 hex digest and size of the content of `document`
+
+    Files are read `CHUNK_SIZE` bytes at a time and then rewound to where
+    they were, so they can still be uploaded.'''
+    filename, content = _split(document)
+    digest = hashlib.sha256()
+    if not hasattr(content, 'read'):
+        content = _to_bytes(content)
+        digest.update(content)
+        return digest.hexdigest(), len(content)
+
+    position = content.tell()
+    size = 0
+    try:
+        chunk = content.read(CHUNK_SIZE)
+        while chunk:
+            chunk = _to_bytes(chunk)
+            digest.update(chunk)
+            size += len(chunk)
+            chunk = content.read(CHUNK_SIZE)
+    finally:
+        content.seek(position)
+    return digest.hexdigest(), size
+
+
+def _signature(filename, size):
+    return '{}:{}'.format(filename, size)
+
+
+class DedupManifest(object):
+    '''The contents already uploaded to a corpus, stored in `filename`
+
+    The manifest maps the SHA-256 of the content of each document uploaded
+    with it to the URL of the document created (see `Corpus.add_document`).
+    Each new document is appended as one JSON line to `filename`, so saving
+    it does not depend on the number of documents (incomplete lines are
+    ignored when loading).
+
+    Since the API does not return content hashes, `rebuild` can only
+    identify documents uploaded by other means by their filename and size.
+    Different files may have the same filename and size, so these are not
+    skipped: `claim` appends them (and the URL of the document with the same
+    filename and size) to `likely_duplicates` instead. If
+    `match_signatures=True`, they're treated as duplicates.
+
+    It's safe to use the same manifest in many threads: `claim` makes sure
+    two identical documents being uploaded at the same time are not both
+    sent.
+    '''
+
+    def __init__(self, filename, match_signatures=False):
+        self.filename = filename
+        self.match_signatures = match_signatures
+        self.hashes = {}
+        self.signatures = {}
+        self.likely_duplicates = []
+        self._claimed = set()
+        self._lock = threading.Lock()
+        self._fp = None
+        try:
+            with open(filename, 'rb') as fp:
+                for line in fp:
+                    try:
+                        record = json.loads(line.decode('utf-8'))
+                        if 'hash' in record:
+                            self.hashes[record['hash']] = record['url']
+                        else:
+                            self.signatures[record['signature']] = \
+                                    record['url']
+                    except (ValueError, KeyError, TypeError):
+                        continue
+        except FileNotFoundError:
+            pass
+
+    @classmethod
+    def for_corpus(cls, directory, corpus, match_signatures=False):
+        '''Return the manifest for `corpus` in `directory`'''
+        corpus_id = corpus.url.rstrip('/').split('/')[-1]
+        return cls(os.path.join(directory,
+                                'dedup_{}.jsonl'.format(corpus_id)),
+                   match_signatures)
+
+    def find(self, digest, filename=None, size=None):
+        '''Return the URL of the document with this content (or `None`)
+
+        If `filename` is given and `match_signatures` is `True`, a document
+        with the same filename and `size` is also returned.'''
+        url = self.hashes.get(digest)
+        if url is None and filename is not None and self.match_signatures:
+            url = self.signatures.get(_signature(filename, size))
+        return url
+
+    def claim(self, document):
+        '''Check whether `document` should be uploaded
+
+        Returns the content hash of `document` if it's not in the manifest
+        (nor being uploaded by another thread) and raises
+        `DuplicateDocumentError` otherwise. The hash must be passed to `add`
+        after the upload or to `release` if it fails.'''
+        digest, size = content_hash(document)
+        filename = _split(document)[0]
+        with self._lock:
+            url = self.find(digest, filename, size)
+            if url is not None or digest in self._claimed:
+                raise DuplicateDocumentError(document, url)
+            if filename is not None:
+                likely_url = self.signatures.get(_signature(filename, size))
+                if likely_url is not None:
+                    self.likely_duplicates.append((document, likely_url))
+            self._claimed.add(digest)
+        return digest
+
+    def release(self, digest):
+        with self._lock:
+            self._claimed.discard(digest)
+
+    def add(self, digest, url):
+        '''Record (and save) that the content with hash `digest` was
+        uploaded as the document at `url`'''
+        line = json.dumps({'hash': digest, 'url': url}) + '\n'
+        with self._lock:
+            self._claimed.discard(digest)
+            self.hashes[digest] = url
+            if self._fp is None:
+                self._fp = open_for_appending(self.filename)
+            self._fp.write(line.encode('utf-8'))
+            self._fp.flush()
+
+    def compact(self):
+        '''Rewrite the manifest file with the current entries only'''
+        with self._lock:
+            self._compact()
+
+    def _compact(self):
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+        lines = [json.dumps({'hash': digest, 'url': url}) + '\n'
+                 for digest, url in sorted(self.hashes.items())]
+        lines.extend(json.dumps({'signature': signature, 'url': url}) + '\n'
+                     for signature, url in sorted(self.signatures.items()))
+        write_atomically(self.filename, ''.join(lines).encode('utf-8'))
+
+    def close(self):
+        with self._lock:
+            if self._fp is not None:
+                self._fp.close()
+                self._fp = None
+
+    def rebuild(self, corpus, workers=10):
+        '''Update the manifest with the documents in `corpus`
+
+        Hashes of documents that are not in the corpus anymore are removed
+        and every document in it is registered by its filename and size (see
+        `likely_duplicates`). The manifest file is rewritten.'''
+        from pypln.api import Document, _pool_workers, _run_concurrently
+
+        urls = [getattr(document, 'url', document)
+                for document in corpus.documents]
+        fetch = lambda url: Document.from_session(url, corpus.session)
+        workers = _pool_workers(corpus.session, workers)
+        signatures = {}
+        for url, document, exc in _run_concurrently(fetch, urls, workers):
+            if exc is not None:
+                raise exc
+            filename = os.path.basename(document.blob)
+            signatures[_signature(filename, document.size)] = url
+
+        existing = set(urls)
+        with self._lock:
+            self.hashes = dict((digest, url)
+                               for digest, url in self.hashes.items()
+                               if url in existing)
+            self.signatures = signatures
+            self._compact()
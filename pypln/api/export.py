@@ -0,0 +1,154 @@
+# coding: utf-8
+#
+# Copyright 2012 NAMD-EMAP-FGV
+#
+# This file is part of PyPLN. You can get more information at: http://pypln.org/.
+#
+# PyPLN is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyPLN is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyPLN.  If not, see <http://www.gnu.org/licenses/>.
+
+'''Files with one property of many documents (see `Corpus.export_property`)
+
+Two formats are supported:
+
+- `jsonl`: one JSON object per line, with the `url` of a document and the
+  `value` of the property;
+- `columnar`: the JSON-encoded values stored one after the other in `path`,
+  the offset where each one starts (plus the end of the last one) in
+  `path + '.idx'` (as unsigned 64-bit integers, in the machine's byte order)
+  and the URL of each document in `path + '.keys'` (one per line). These
+  files can be read with `PropertyFile`, which memory-maps them so single
+  values can be read without loading the rest.
+'''
+
+import array
+import json
+import mmap
+import os
+
+from pypln.api.files import AtomicFile
+
+
+class JsonLinesWriter(object):
+    '''Write `(url, value)` pairs to `path` as JSON lines
+
+    Everything is written to a temporary file, which is only renamed to
+    `path` by `commit`.'''
+    SUFFIXES = ('', )
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._files = [AtomicFile(path + suffix) for suffix in self.SUFFIXES]
+
+    def write(self, url, value):
+        self._files[0].write(json.dumps({'url': url, 'value': value})
+                             .encode('utf-8') + b'\n')
+        self.count += 1
+
+    def commit(self):
+        for fp in self._files:
+            fp.commit()
+
+    def abort(self):
+        for fp in self._files:
+            fp.abort()
+
+
+class ColumnarWriter(JsonLinesWriter):
+    '''Write `(url, value)` pairs to `path` in the columnar format'''
+    SUFFIXES = ('', '.idx', '.keys')
+
+    def __init__(self, path):
+        super(ColumnarWriter, self).__init__(path)
+        self._offset = 0
+        self._write_offset()
+
+    def _write_offset(self):
+        self._files[1].write(array.array('Q', [self._offset]).tobytes())
+
+    def write(self, url, value):
+        data, index, keys = self._files
+        encoded = json.dumps(value).encode('utf-8')
+        data.write(encoded)
+        self._offset += len(encoded)
+        self._write_offset()
+        keys.write(url.encode('utf-8') + b'\n')
+        self.count += 1
+
+
+FORMATS = {'jsonl': JsonLinesWriter, 'columnar': ColumnarWriter}
+
+
+def _map(path):
+    '''Memory-map the file at `path` (which can be empty)'''
+    with open(path, 'rb') as fp:
+        if os.fstat(fp.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class PropertyFile(object):
+    '''Read a property exported in the columnar format
+
+    `len(file)` is the number of documents, `file[i]` the value of the
+    i-th document, `file.urls[i]` its URL and `file.get(url)` the value for
+    the document at `url`. Iterating yields `(url, value)` pairs. Only the
+    values that are read are loaded from the disk.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self._data = _map(path)
+        self._index_map = _map(path + '.idx')
+        self._offsets = memoryview(self._index_map).cast('Q')
+        with open(path + '.keys', 'rb') as fp:
+            self.urls = [line.decode('utf-8').rstrip('\n') for line in fp]
+        self._positions = None
+        if len(self._offsets) != len(self.urls) + 1:
+            self.close()
+            raise ValueError('{} is not a valid property file'.format(path))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._offsets.release()
+        for mapped in (self._data, self._index_map):
+            if isinstance(mapped, mmap.mmap):
+                mapped.close()
+
+    def __len__(self):
+        return len(self.urls)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('PropertyFile index out of range')
+        start, end = self._offsets[index], self._offsets[index + 1]
+        return json.loads(self._data[start:end].decode('utf-8'))
+
+    def get(self, url, default=None):
+        if self._positions is None:
+            self._positions = dict((url, index)
+                                   for index, url in enumerate(self.urls))
+        index = self._positions.get(url)
+        return default if index is None else self[index]
+
+    def __iter__(self):
+        for index, url in enumerate(self.urls):
+            yield url, self[index]
@@ -0,0 +1,68 @@
+# coding: utf-8
+#
+# Copyright 2012 NAMD-EMAP-FGV
+#
+# This file is part of PyPLN. You can get more information at: http://pypln.org/.
+#
+# PyPLN is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyPLN is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyPLN.  If not, see <http://www.gnu.org/licenses/>.
+
+'''Helpers to write files safely'''
+
+import os
+import tempfile
+
+
+class AtomicFile(object):
+    '''File that only replaces `filename` when it's complete
+
+    Data is written to a temporary file (with a unique name, in the same
+    directory as `filename`), which `commit` renames to `filename` and
+    `abort` removes. Used as a context manager, it's committed if no
+    exception is raised and aborted otherwise.'''
+
+    def __init__(self, filename):
+        self.filename = filename
+        directory = os.path.dirname(filename) or '.'
+        fd, self.temp_filename = tempfile.mkstemp(dir=directory,
+                prefix=os.path.basename(filename) + '.', suffix='.tmp')
+        self.file = os.fdopen(fd, 'wb')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+
+    def write(self, data):
+        return self.file.write(data)
+
+    def commit(self):
+        self.file.close()
+        os.replace(self.temp_filename, self.filename)
+
+    def abort(self):
+        self.file.close()
+        try:
+            os.remove(self.temp_filename)
+        except OSError:
+            pass
+
+
+def write_atomically(filename, data):
+    '''Write `data` (bytes) to `filename`, which is never left incomplete'''
+    with AtomicFile(filename) as fp:
+        fp.write(data)
@@ -0,0 +1,240 @@
+# coding: utf-8
+#
+# Copyright 2012 NAMD-EMAP-FGV
+#
+# This file is part of PyPLN. You can get more information at: http://pypln.org/.
+#
+# PyPLN is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyPLN is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyPLN.  If not, see <http://www.gnu.org/licenses/>.
+
+'''Local SQLite index of the metadata of documents and corpora'''
+
+import json
+import sqlite3
+import threading
+
+from pypln.api import Corpus, DocumentRecord, _page_urls
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS documents (
+    url TEXT PRIMARY KEY,
+    corpus TEXT,
+    owner TEXT,
+    blob TEXT,
+    size INTEGER,
+    uploaded_at TEXT,
+    properties TEXT
+);
+CREATE INDEX IF NOT EXISTS documents_corpus ON documents (corpus);
+CREATE INDEX IF NOT EXISTS documents_owner ON documents (owner);
+CREATE INDEX IF NOT EXISTS documents_blob ON documents (blob);
+CREATE INDEX IF NOT EXISTS documents_size ON documents (size);
+CREATE INDEX IF NOT EXISTS documents_uploaded_at ON documents (uploaded_at);
+
+CREATE TABLE IF NOT EXISTS corpora (
+    url TEXT PRIMARY KEY,
+    name TEXT,
+    description TEXT,
+    owner TEXT,
+    created_at TEXT,
+    documents TEXT
+);
+CREATE INDEX IF NOT EXISTS corpora_owner ON corpora (owner);
+CREATE INDEX IF NOT EXISTS corpora_name ON corpora (name);
+'''
+
+DOCUMENT_COLUMNS = ('url', 'corpus', 'owner', 'blob', 'size', 'uploaded_at',
+                    'properties')
+CORPUS_COLUMNS = ('url', 'name', 'description', 'owner', 'created_at',
+                  'documents')
+
+
+class MetadataIndex(object):
+    '''Metadata of the documents and corpora of a `PyPLN` account, kept in
+    a SQLite database
+
+    `path` is the database file (by default, the index is only kept in
+    memory). `sync` updates the index from the API listings and queries
+    (`documents`, `count_documents` and `corpora`) only use the local
+    database::
+
+        index = MetadataIndex(pypln, 'pypln.sqlite3')
+        index.sync()
+        index.documents(corpus=corpus.url, uploaded_after='2013-10-22')
+
+    Timestamps are compared as strings, which works since the API always
+    uses the same ISO 8601 format.
+    '''
+
+    def __init__(self, pypln, path=':memory:'):
+        self.pypln = pypln
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.executescript(SCHEMA)
+
+    def close(self):
+        self._connection.close()
+
+    def _execute(self, query, parameters=()):
+        with self._lock:
+            return self._connection.execute(query, parameters).fetchall()
+
+    @property
+    def watermark(self):
+        '''The newest `uploaded_at` in the index (`None` if it's empty)'''
+        return self._execute('SELECT MAX(uploaded_at) FROM documents')[0][0]
+
+    def sync(self, full=False, parallel=None):
+        '''Update the index from the API and return how many documents were
+        added to it
+
+        Only the pages with documents uploaded after `watermark` are
+        downloaded: the order of the listing is detected from its first page
+        and pages are read from the newest to the oldest, stopping at the
+        first one containing an older document. If the order can't be
+        detected (or `full=True`) every page is downloaded (up to `parallel`
+        at the same time) and documents that no longer exist are removed
+        from the index. Corpora are few, so they're always fully synced.
+        '''
+        before = self.count_documents()
+        documents_url = self.pypln.base_url + self.pypln.DOCUMENTS_PAGE
+        watermark = self.watermark
+        if full or watermark is None:
+            self._sync_everything(documents_url, parallel)
+        else:
+            self._sync_newer(documents_url, watermark, parallel)
+        self._sync_corpora()
+        return self.count_documents() - before
+
+    def _store_documents(self, resources, connection):
+        connection.executemany(
+                'INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [tuple(resource.get(column) for column in DOCUMENT_COLUMNS)
+                 for resource in resources])
+
+    def _sync_everything(self, url, parallel):
+        pages = self.pypln._iter_pages(url, True, parallel)
+        with self._lock, self._connection as connection:
+            connection.execute('DELETE FROM documents')
+            for page in pages:
+                self._store_documents(page['results'], connection)
+
+    def _sync_newer(self, url, watermark, parallel):
+        first = self.pypln._get_page(url)
+        results = first['results']
+        newer_pages = [first]
+        if first['next'] is not None and results and \
+                results[0]['uploaded_at'] > results[-1]['uploaded_at']:
+            # Newest first: follow `next` until reaching older documents
+            page = first
+            while page['next'] is not None and page['results'] and \
+                    page['results'][-1]['uploaded_at'] >= watermark:
+                page = self.pypln._get_page(page['next'])
+                newer_pages.append(page)
+        elif first['next'] is not None:
+            urls = None
+            if results and results[0]['uploaded_at'] < \
+                    results[-1]['uploaded_at']:
+                urls = _page_urls(first['next'], first['count'],
+                                  len(results))
+            if urls is None:
+                return self._sync_everything(url, parallel)
+            # Oldest first: new documents are in the last pages
+            for page_url in reversed(urls):
+                page = self.pypln._get_page(page_url)
+                newer_pages.append(page)
+                if not page['results'] or \
+                        page['results'][0]['uploaded_at'] < watermark:
+                    break
+
+        with self._lock, self._connection as connection:
+            for page in newer_pages:
+                self._store_documents(page['results'], connection)
+
+    def _sync_corpora(self):
+        url = self.pypln.base_url + self.pypln.CORPORA_PAGE
+        pages = self.pypln._iter_pages(url, True)
+        with self._lock, self._connection as connection:
+            connection.execute('DELETE FROM corpora')
+            for page in pages:
+                connection.executemany(
+                        'INSERT OR REPLACE INTO corpora VALUES '
+                        '(?, ?, ?, ?, ?, ?)',
+                        [tuple(json.dumps(resource.get(column))
+                               if column == 'documents'
+                               else resource.get(column)
+                               for column in CORPUS_COLUMNS)
+                         for resource in page['results']])
+
+    def _document_filters(self, corpus=None, owner=None, blob=None,
+                          min_size=None, max_size=None, uploaded_after=None,
+                          uploaded_before=None):
+        conditions, parameters = [], []
+        for condition, value in (('corpus = ?', corpus),
+                                 ('owner = ?', owner),
+                                 ('blob GLOB ?', blob),
+                                 ('size >= ?', min_size),
+                                 ('size <= ?', max_size),
+                                 ('uploaded_at > ?', uploaded_after),
+                                 ('uploaded_at < ?', uploaded_before)):
+            if value is not None:
+                conditions.append(condition)
+                parameters.append(getattr(value, 'url', value))
+        where = ' WHERE ' + ' AND '.join(conditions) if conditions else ''
+        return where, parameters
+
+    def documents(self, limit=None, **filters):
+        '''Return `DocumentRecord` objects for the indexed documents, ordered
+        by `uploaded_at`
+
+        The documents can be filtered by `corpus` (a URL or a `Corpus`),
+        `owner`, `blob` (a glob pattern, like `'*.pdf'`), `min_size`,
+        `max_size`, `uploaded_after` and `uploaded_before`.'''
+        where, parameters = self._document_filters(**filters)
+        query = 'SELECT {} FROM documents{} ORDER BY uploaded_at'.format(
+                ', '.join(DOCUMENT_COLUMNS), where)
+        if limit is not None:
+            query += ' LIMIT ?'
+            parameters.append(limit)
+        return [DocumentRecord(session=self.pypln.session,
+                               **dict(zip(DOCUMENT_COLUMNS, row)))
+                for row in self._execute(query, parameters)]
+
+    def count_documents(self, **filters):
+        '''Return how many indexed documents match `filters` (see
+        `documents`)'''
+        where, parameters = self._document_filters(**filters)
+        return self._execute('SELECT COUNT(*) FROM documents' + where,
+                             parameters)[0][0]
+
+    def corpora(self, owner=None, name=None):
+        '''Return `Corpus` objects for the indexed corpora, optionally
+        filtered by `owner` and `name`'''
+        conditions, parameters = [], []
+        for column, value in (('owner', owner), ('name', name)):
+            if value is not None:
+                conditions.append(column + ' = ?')
+                parameters.append(value)
+        where = ' WHERE ' + ' AND '.join(conditions) if conditions else ''
+        rows = self._execute('SELECT {} FROM corpora{} ORDER BY created_at'
+                             .format(', '.join(CORPUS_COLUMNS), where),
+                             parameters)
+        result = []
+        for row in rows:
+            resource = dict(zip(CORPUS_COLUMNS, row))
+            resource['documents'] = json.loads(resource['documents'])
+            result.append(Corpus(session=self.pypln.session, **resource))
+        return result
@@ -0,0 +1,202 @@
+# coding: utf-8
+#
+# Copyright 2012 NAMD-EMAP-FGV
+#
+# This file is part of PyPLN. You can get more information at: http://pypln.org/.
+#
+# PyPLN is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyPLN is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyPLN.  If not, see <http://www.gnu.org/licenses/>.
+
+'''Incremental parsing of the JSON documents returned by PyPLN's API'''
+
+import codecs
+import json
+import re
+
+
+WHITESPACE = ' \t\n\r'
+DELIMITERS = WHITESPACE + ',]}'
+ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n',
+           'r': '\r', 't': '\t'}
+STRING_SPECIAL = re.compile(r'["\\]')
+
+
+class _Reader(object):
+    '''Keeps the part of a JSON document that was received but not parsed'''
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.json_decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.position = 0
+        self.eof = False
+
+    def fill(self):
+        '''Read one more chunk, dropping what was already parsed
+
+        Returns `False` if there's nothing else to read.'''
+        if self.eof:
+            return False
+        try:
+            chunk = next(self.chunks)
+        except StopIteration:
+            self.eof = True
+            text = self.decoder.decode(b'', final=True)
+        else:
+            text = self.decoder.decode(chunk)
+        self.buffer = self.buffer[self.position:] + text
+        self.position = 0
+        return True
+
+    def peek(self):
+        '''Skip whitespace and return the next character (without
+        consuming it)'''
+        while True:
+            while self.position < len(self.buffer):
+                if self.buffer[self.position] not in WHITESPACE:
+                    return self.buffer[self.position]
+                self.position += 1
+            if not self.fill():
+                raise ValueError('Unexpected end of JSON document')
+
+    def expect(self, character):
+        if self.peek() != character:
+            raise ValueError('Expected {!r} at position {} of JSON '
+                    'document'.format(character, self.position))
+        self.position += 1
+
+    def value(self):
+        '''Parse and return the next JSON value'''
+        self.peek()
+        while True:
+            available = len(self.buffer) - self.position
+            try:
+                value, end = self.json_decoder.raw_decode(self.buffer,
+                                                          self.position)
+            except ValueError:
+                # Incomplete value: wait until there's (at least) twice as
+                # much data before trying again, so huge values don't make
+                # parsing quadratic
+                if not self._read_more(2 * available):
+                    raise
+                continue
+            # A number is only complete when followed by a delimiter (`2.` at
+            # the end of the buffer is parsed as `2`, but may be `2.5`)
+            if isinstance(value, (int, float)) and \
+                    (end == len(self.buffer) or
+                     self.buffer[end] not in DELIMITERS) and \
+                    self._read_more(available + 1):
+                continue
+            self.position = end
+            return value
+
+    def string_chunks(self):
+        '''Parse the next JSON value, which must be a string, yielding its
+        content in pieces (escaped UTF-16 surrogate pairs are not joined)'''
+        self.expect('"')
+        while True:
+            if self.position >= len(self.buffer) and not self.fill():
+                raise ValueError('Unterminated string in JSON document')
+            match = STRING_SPECIAL.search(self.buffer, self.position)
+            end = len(self.buffer) if match is None else match.start()
+            if end > self.position:
+                yield self.buffer[self.position:end]
+                self.position = end
+            if match is None:
+                continue
+            elif self.buffer[end] == '"':
+                self.position += 1
+                return
+
+            self._read_more(6)
+            escaped = self.buffer[self.position + 1:self.position + 2]
+            if escaped == 'u':
+                code = self.buffer[self.position + 2:self.position + 6]
+                try:
+                    yield chr(int(code, 16))
+                except ValueError:
+                    raise ValueError('Invalid \\u escape in JSON document')
+                self.position += 6
+            elif escaped in ESCAPES:
+                yield ESCAPES[escaped]
+                self.position += 2
+            else:
+                raise ValueError('Invalid escape in JSON document')
+
+    def _read_more(self, size):
+        '''Read until there are at least `size` unparsed characters or the
+        document ends; returns `False` if nothing could be read'''
+        read = False
+        while len(self.buffer) - self.position < size and self.fill():
+            read = True
+        return read
+
+
+def iter_items(chunks, key='value'):
+    '''Parse a JSON object incrementally, yielding the items of `key`
+
+    `chunks` is an iterable of bytes (such as `response.iter_content()`)
+    containing a JSON object encoded as UTF-8. If `obj[key]` is a list, its
+    items are yielded as soon as they're parsed, so the whole list is never
+    kept in memory; otherwise `obj[key]` is yielded (once). `KeyError` is
+    raised if there's no `key` in the object.
+    '''
+    reader = _find_key(chunks, key)
+    if reader.peek() != '[':
+        yield reader.value()
+        return
+
+    reader.position += 1
+    while True:
+        character = reader.peek()
+        if character == ']':
+            return
+        elif character == ',':
+            reader.position += 1
+        else:
+            yield reader.value()
+
+
+def iter_string(chunks, key='value'):
+    '''Parse a JSON object incrementally, yielding pieces of the string
+    `key`
+
+    Like `iter_items`, but `obj[key]` must be a string (otherwise
+    `ValueError` is raised) and it's yielded in pieces as it's received, so
+    even a huge string is never entirely kept in memory.
+    '''
+    reader = _find_key(chunks, key)
+    if reader.peek() != '"':
+        raise ValueError('{!r} is not a string'.format(key))
+    for piece in reader.string_chunks():
+        yield piece
+
+
+def _find_key(chunks, key):
+    '''Return a `_Reader` for `chunks` positioned at the value of `key`'''
+    reader = _Reader(chunks)
+    reader.expect('{')
+    while True:
+        character = reader.peek()
+        if character == '}':
+            raise KeyError(key)
+        elif character == ',':
+            reader.position += 1
+            continue
+
+        name = reader.value()
+        reader.expect(':')
+        if name == key:
+            return reader
+        reader.value()
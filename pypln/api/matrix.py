@@ -0,0 +1,141 @@
+# coding: utf-8
+#
+# Copyright 2012 NAMD-EMAP-FGV
+#
+# This file is part of PyPLN. You can get more information at: http://pypln.org/.
+#
+# PyPLN is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyPLN is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyPLN.  If not, see <http://www.gnu.org/licenses/>.
+
+'''Term-document matrices built from the `freqdist` of documents
+
+NumPy and SciPy are only needed (and imported) when a matrix is built;
+install them with `pip install pypln.api[matrix]`.
+'''
+
+from array import array
+
+
+def _import_sparse():
+    try:
+        import numpy
+        import scipy.sparse
+    except ImportError:
+        raise ImportError("Term matrices need numpy and scipy (install "
+                          "them with `pip install pypln.api[matrix]`)")
+    return numpy, scipy.sparse
+
+
+class TermMatrix(object):
+    '''Sparse term-document matrix, built one document at a time
+
+    Each row is a document (`urls` has their URLs, in the order they were
+    added) and each column a token (`vocabulary` has the tokens, in the
+    order they were first seen). Tokens are interned in a dict shared by
+    all documents, and counts are kept in compact arrays which are turned
+    into a `scipy.sparse.csr_matrix` every `batch_size` documents, so memory
+    use only grows with the number of non-zero counts.
+
+    Use `Corpus.term_matrix` to create one from the documents of a corpus
+    and to add new documents to it later.
+    '''
+
+    def __init__(self, batch_size=1000):
+        _import_sparse()
+        self.batch_size = batch_size
+        self.urls = []
+        self._url_set = set()
+        self._index = {}
+        self._batches = []
+        self._reset_pending()
+
+    def _reset_pending(self):
+        self._data = array('i')
+        self._indices = array('i')
+        self._indptr = array('i', [0])
+
+    def __len__(self):
+        return len(self.urls)
+
+    def __contains__(self, url):
+        return url in self._url_set
+
+    @property
+    def vocabulary(self):
+        '''The token of each column'''
+        return list(self._index)
+
+    def column(self, token):
+        '''Return the column of `token` (or `None` if it was never seen)'''
+        return self._index.get(token)
+
+    def add(self, url, freqdist):
+        '''Add the document at `url` with its `freqdist` (a list of `[token,
+        count]` pairs, as returned by the API, or a dict) as a new row'''
+        if url in self._url_set:
+            raise ValueError('{} is already in the matrix'.format(url))
+        if isinstance(freqdist, dict):
+            freqdist = freqdist.items()
+        index = self._index
+        setdefault = index.setdefault
+        for token, count in freqdist:
+            self._indices.append(setdefault(token, len(index)))
+            self._data.append(count)
+        self._indptr.append(len(self._indices))
+        self.urls.append(url)
+        self._url_set.add(url)
+        if len(self._indptr) > self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        if len(self._indptr) == 1:
+            return
+        numpy, sparse = _import_sparse()
+        arrays = [numpy.frombuffer(values, dtype=numpy.int32).copy()
+                  for values in (self._data, self._indices, self._indptr)]
+        self._batches.append(sparse.csr_matrix(tuple(arrays),
+                shape=(len(self._indptr) - 1, len(self._index))))
+        self._reset_pending()
+
+    @property
+    def matrix(self):
+        '''The `scipy.sparse.csr_matrix` with one row per document'''
+        numpy, sparse = _import_sparse()
+        self._flush()
+        shape = (len(self.urls), len(self._index))
+        if not self._batches:
+            return sparse.csr_matrix(shape, dtype=numpy.int32)
+        # Batches created before new tokens were seen have fewer columns
+        batches = [sparse.csr_matrix((batch.data, batch.indices,
+                                      batch.indptr),
+                                     shape=(batch.shape[0], shape[1]))
+                   for batch in self._batches]
+        matrix = batches[0] if len(batches) == 1 else \
+                sparse.vstack(batches, format='csr')
+        self._batches = [matrix]
+        return matrix
+
+    def term_counts(self):
+        '''Return a `numpy` array with the count of each token in all the
+        documents (in the order of `vocabulary`)'''
+        return self.matrix.sum(axis=0).A1
+
+    def most_common(self, number=None):
+        '''Return the `number` most common tokens in all the documents and
+        their counts (all of them, by default)'''
+        numpy, sparse = _import_sparse()
+        counts = self.term_counts()
+        order = numpy.argsort(-counts, kind='stable')[:number]
+        vocabulary = self.vocabulary
+        return [(vocabulary[column], int(counts[column]))
+                for column in order]
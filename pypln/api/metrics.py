@@ -0,0 +1,248 @@
+# coding: utf-8
+#
+# Copyright 2012 NAMD-EMAP-FGV
+#
+# This file is part of PyPLN. You can get more information at: http://pypln.org/.
+#
+# PyPLN is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyPLN is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyPLN.  If not, see <http://www.gnu.org/licenses/>.
+
+'''Metrics about the HTTP requests made by `pypln.api`'''
+
+import bisect
+import collections
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+# Upper bounds (in seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0, float('inf'))
+
+RequestMetric = collections.namedtuple('RequestMetric',
+        ['method', 'endpoint', 'url', 'status', 'elapsed', 'bytes_sent',
+         'bytes_received', 'error'])
+
+_ID = re.compile(r'^\d+$')
+
+
+def endpoint_template(url):
+    '''Return the endpoint of `url` with ids and property names replaced
+    by placeholders (e.g. `documents/{id}/properties/{prop}`)'''
+    segments = [segment for segment in urlsplit(url).path.split('/')
+                if segment]
+    template = []
+    for index, segment in enumerate(segments):
+        if _ID.match(segment):
+            segment = '{id}'
+        elif index > 0 and segments[index - 1] == 'properties':
+            segment = '{prop}'
+        template.append(segment)
+    return '/'.join(template)
+
+
+class Histogram(object):
+    '''Counts of observed values in buckets with upper bounds `buckets`'''
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        self.counts[min(index, len(self.counts) - 1)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        '''Estimate the `q` quantile (0 <= q <= 1) as the upper bound of
+        the bucket it falls in'''
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank and count:
+                return bound
+        return self.buckets[-1]
+
+    def as_dict(self):
+        return {'buckets': list(zip(self.buckets, self.counts)),
+                'count': self.count, 'sum': self.sum}
+
+
+class Metrics(object):
+    '''Counters and latency histograms of the requests made with a session
+
+    Requests are grouped by method and endpoint template (see
+    `endpoint_template`). For each group, it counts requests by status
+    code, bytes sent and bytes received, and keeps a `Histogram` of
+    latencies (the time until the response headers were received, as in
+    `requests.Response.elapsed`). Bytes sent are counted from the
+    `Content-Length` header of the requests and bytes received from the
+    bodies of the responses, except for streamed responses (such as the ones
+    used by `Document.iter_property`), which are counted from their
+    `Content-Length` header (or as 0, if it's missing). Requests that fail
+    without a response (e.g. because the connection failed or timed out)
+    are counted with status `None` and the name of the exception raised as
+    their `error`.
+
+    If `callback` is given, it's called with a `RequestMetric` after each
+    request (from the thread that made the request), so metrics can also be
+    exported elsewhere. Use it with `PyPLN(..., metrics=Metrics())`,
+    `Corpus.from_url(..., metrics=...)`, `Document.from_url(...,
+    metrics=...)` or `pypln.api.sessions.configure(metrics=...)` (to record
+    every request made through the shared sessions), or call `install` with
+    a session. For the asyncio client, use `AsyncPyPLN(...,
+    metrics=Metrics())` (see `trace_config`). Sessions without metrics
+    don't pay anything.
+    '''
+
+    def __init__(self, callback=None, buckets=DEFAULT_BUCKETS):
+        self.callback = callback
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = collections.Counter()
+            self.bytes_sent = collections.Counter()
+            self.bytes_received = collections.Counter()
+            self.latencies = {}
+
+    def install(self, session):
+        '''Record the requests made with `session` (a `requests.Session`)'''
+        if self.installed_on(session):
+            return
+        send = session.send
+
+        def instrumented_send(request, **kwargs):
+            return self._send(send, request, **kwargs)
+        instrumented_send.metrics = self
+        instrumented_send.send = send
+        session.send = instrumented_send
+
+    def installed_on(self, session):
+        '''Return whether the requests made with `session` are recorded'''
+        send = session.send
+        while hasattr(send, 'metrics'):
+            if send.metrics is self:
+                return True
+            send = send.send
+        return False
+
+    def uninstall(self, session):
+        send, outer = session.send, None
+        while hasattr(send, 'metrics'):
+            if send.metrics is self:
+                if outer is None:
+                    session.send = send.send
+                else:
+                    outer.send = send.send
+                return
+            send, outer = send.send, send
+
+    def _send(self, send, request, **kwargs):
+        '''Call `send` (`requests.Session.send`) and record the request,
+        even if it fails'''
+        sent = request.headers.get('Content-Length')
+        sent = int(sent) if sent else 0
+        start = time.time()
+        try:
+            response = send(request, **kwargs)
+        except Exception as exc:
+            self.record(request.method, request.url, None,
+                        time.time() - start, sent, 0, type(exc).__name__)
+            raise
+        if kwargs.get('stream'):
+            received = response.headers.get('Content-Length')
+            received = int(received) if received else 0
+        else:
+            received = len(response.content)
+        self.record(request.method, request.url, response.status_code,
+                    response.elapsed.total_seconds(), sent, received)
+        return response
+
+    def trace_config(self):
+        '''Return an `aiohttp.TraceConfig` that records the requests made
+        with the `aiohttp.ClientSession` it's given to
+
+        Latencies are measured until the response headers are received and
+        bytes received are counted from the `Content-Length` headers.'''
+        import aiohttp
+
+        async def on_request_start(session, context, params):
+            context.start = time.time()
+
+        async def on_request_end(session, context, params):
+            sent = params.headers.get('Content-Length')
+            self.record(params.method, str(params.url),
+                        params.response.status, time.time() - context.start,
+                        int(sent) if sent else 0,
+                        params.response.content_length or 0)
+
+        async def on_request_exception(session, context, params):
+            sent = params.headers.get('Content-Length')
+            self.record(params.method, str(params.url), None,
+                        time.time() - context.start,
+                        int(sent) if sent else 0, 0,
+                        type(params.exception).__name__)
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_exception.append(on_request_exception)
+        return trace_config
+
+    def record(self, method, url, status, elapsed, bytes_sent=0,
+               bytes_received=0, error=None):
+        '''Record one request'''
+        metric = RequestMetric(method, endpoint_template(url), url, status,
+                               elapsed, bytes_sent, bytes_received, error)
+        key = (method, metric.endpoint)
+        with self._lock:
+            self.requests[key + (status, )] += 1
+            self.bytes_sent[key] += bytes_sent
+            self.bytes_received[key] += bytes_received
+            histogram = self.latencies.get(key)
+            if histogram is None:
+                histogram = self.latencies[key] = Histogram(self.buckets)
+            histogram.observe(elapsed)
+        if self.callback is not None:
+            self.callback(metric)
+
+    def snapshot(self):
+        '''Return the current metrics as a dict of plain values, with one
+        entry for each `(method, endpoint)`'''
+        with self._lock:
+            result = {}
+            for key, histogram in self.latencies.items():
+                method, endpoint = key
+                statuses = dict((status, count) for (method_, endpoint_,
+                                 status), count in self.requests.items()
+                                if (method_, endpoint_) == key)
+                result['{} {}'.format(method, endpoint)] = {
+                    'requests': sum(statuses.values()),
+                    'statuses': statuses,
+                    'bytes_sent': self.bytes_sent[key],
+                    'bytes_received': self.bytes_received[key],
+                    'latency': histogram.as_dict(),
+                    'p50': histogram.quantile(0.5),
+                    'p99': histogram.quantile(0.99)}
+            return result
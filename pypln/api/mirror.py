@@ -0,0 +1,99 @@
+# coding: utf-8
+#
+# Copyright 2012 NAMD-EMAP-FGV
+#
+# This file is part of PyPLN. You can get more information at: http://pypln.org/.
+#
+# PyPLN is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyPLN is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyPLN.  If not, see <http://www.gnu.org/licenses/>.
+
+'''Bookkeeping for local copies of corpora (see `Corpus.mirror`)'''
+
+import json
+import os
+import threading
+
+from pypln.api.files import write_atomically
+
+
+def open_for_appending(filename):
+    '''Open `filename` (a file of JSON lines) to append lines to it
+
+    If the last line was left incomplete (e.g. by an interrupted process),
+    the new lines start after it.'''
+    fp = open(filename, 'ab+')
+    fp.seek(0, os.SEEK_END)
+    if fp.tell() > 0:
+        fp.seek(-1, os.SEEK_END)
+        if fp.read(1) != b'\n':
+            fp.write(b'\n')
+    return fp
+
+
+class MirrorManifest(object):
+    '''What was already downloaded to a mirror directory
+
+    The manifest maps document URLs to dicts with their `properties_url`
+    and, for each downloaded property, its `etag` and `last_modified`
+    headers. Each update is appended as one JSON line to
+    `<directory>/manifest.jsonl`, so saving it does not depend on the number
+    of documents and an interrupted mirror loses at most the line being
+    written (incomplete lines are ignored when loading). `compact` rewrites
+    the file (atomically) with one line per document.
+    '''
+    FILENAME = 'manifest.jsonl'
+
+    def __init__(self, directory):
+        self.filename = os.path.join(directory, self.FILENAME)
+        self.entries = {}
+        self._lock = threading.Lock()
+        self._fp = None
+        try:
+            with open(self.filename, 'rb') as fp:
+                for line in fp:
+                    try:
+                        record = json.loads(line.decode('utf-8'))
+                        self.entries[record['url']] = record['entry']
+                    except (ValueError, KeyError, TypeError):
+                        continue
+        except FileNotFoundError:
+            pass
+
+    def get(self, url):
+        return self.entries.get(url)
+
+    def set(self, url, entry):
+        '''Store (and save) the `entry` for the document at `url`'''
+        line = json.dumps({'url': url, 'entry': entry}) + '\n'
+        with self._lock:
+            self.entries[url] = entry
+            if self._fp is None:
+                self._fp = open_for_appending(self.filename)
+            self._fp.write(line.encode('utf-8'))
+            self._fp.flush()
+
+    def compact(self):
+        '''Rewrite the manifest file with the current entries only'''
+        with self._lock:
+            if self._fp is not None:
+                self._fp.close()
+                self._fp = None
+            lines = [json.dumps({'url': url, 'entry': entry}) + '\n'
+                     for url, entry in sorted(self.entries.items())]
+            write_atomically(self.filename, ''.join(lines).encode('utf-8'))
+
+    def close(self):
+        with self._lock:
+            if self._fp is not None:
+                self._fp.close()
+                self._fp = None
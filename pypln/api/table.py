@@ -0,0 +1,162 @@
+# coding: utf-8
+#
+# Copyright 2012 NAMD-EMAP-FGV
+#
+# This file is part of PyPLN. You can get more information at: http://pypln.org/.
+#
+# PyPLN is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyPLN is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyPLN.  If not, see <http://www.gnu.org/licenses/>.
+
+'''Columnar storage for big document listings'''
+
+from array import array
+
+
+class StringColumn(object):
+    '''Strings stored one after the other in a single buffer
+
+    Each string costs its UTF-8 encoded size plus 8 bytes (for its offset),
+    instead of a whole Python object.'''
+
+    def __init__(self):
+        self._data = bytearray()
+        self._offsets = array('Q', [0])
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        start, end = self._offsets[index], self._offsets[index + 1]
+        return self._data[start:end].decode('utf-8')
+
+    def append(self, value):
+        self._data.extend(value.encode('utf-8'))
+        self._offsets.append(len(self._data))
+
+    def nbytes(self):
+        return len(self._data) + self._offsets.itemsize * len(self._offsets)
+
+
+class CategoryColumn(object):
+    '''Values with few distinct possibilities (such as owners or corpora),
+    stored as indexes to a list of distinct values'''
+
+    def __init__(self):
+        self.categories = []
+        self._codes = array('l')
+        self._index = {}
+
+    def __len__(self):
+        return len(self._codes)
+
+    def __getitem__(self, index):
+        return self.categories[self._codes[index]]
+
+    def append(self, value):
+        code = self._index.get(value)
+        if code is None:
+            code = self._index[value] = len(self.categories)
+            self.categories.append(value)
+        self._codes.append(code)
+
+    def indexes_of(self, value):
+        '''Return the indexes of the rows with `value`'''
+        code = self._index.get(value)
+        if code is None:
+            return []
+        return [index for index, row_code in enumerate(self._codes)
+                if row_code == code]
+
+    def nbytes(self):
+        return self._codes.itemsize * len(self._codes)
+
+
+class DocumentTable(object):
+    '''Metadata of many documents stored in columns
+
+    Instead of creating one object per document, the values of `url`,
+    `size`, `owner`, `corpus`, `uploaded_at`, `blob` and `properties` are
+    appended to compact columns as the pages of a listing are read (see
+    `PyPLN.document_table`). Rows can be accessed as `DocumentRecord`
+    objects (created on demand) and each column with `column`.
+    '''
+    COLUMNS = ('url', 'size', 'owner', 'corpus', 'uploaded_at', 'blob',
+               'properties_url')
+
+    def __init__(self, session=None):
+        self.session = session
+        self.url = StringColumn()
+        self.size = array('q')
+        self.owner = CategoryColumn()
+        self.corpus = CategoryColumn()
+        self.uploaded_at = StringColumn()
+        self.blob = StringColumn()
+        self.properties_url = StringColumn()
+
+    @classmethod
+    def from_pages(cls, pages, session=None):
+        '''Build a table from the pages of a document listing'''
+        table = cls(session)
+        for page in pages:
+            table.extend(page['results'])
+        return table
+
+    def __len__(self):
+        return len(self.size)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('DocumentTable index out of range')
+        # Imported here since `pypln.api` imports this module
+        from pypln.api import DocumentRecord
+        return DocumentRecord(session=self.session, url=self.url[index],
+                size=self.size[index], owner=self.owner[index],
+                corpus=self.corpus[index],
+                uploaded_at=self.uploaded_at[index], blob=self.blob[index],
+                properties=self.properties_url[index])
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def append(self, resource):
+        '''Add a document (as returned by the API) to the table'''
+        self.url.append(resource['url'])
+        self.size.append(resource['size'])
+        self.owner.append(resource['owner'])
+        self.corpus.append(resource['corpus'])
+        self.uploaded_at.append(resource['uploaded_at'])
+        self.blob.append(resource['blob'])
+        self.properties_url.append(resource['properties'])
+
+    def extend(self, resources):
+        for resource in resources:
+            self.append(resource)
+
+    def column(self, name):
+        '''Return the values of column `name` as a list (or an `array`, for
+        `size`)'''
+        if name not in self.COLUMNS:
+            raise KeyError(name)
+        column = getattr(self, name)
+        if isinstance(column, array):
+            return column
+        return [column[index] for index in range(len(column))]
+
+    def nbytes(self):
+        '''Return (approximately) how many bytes the columns use'''
+        return self.size.itemsize * len(self.size) + sum(
+            getattr(self, name).nbytes() for name in self.COLUMNS
+            if name != 'size')
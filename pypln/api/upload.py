@@ -0,0 +1,153 @@
+# coding: utf-8
+#
+# Copyright 2012 NAMD-EMAP-FGV
+#
+# This file is part of PyPLN. You can get more information at: http://pypln.org/.
+#
+# PyPLN is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyPLN is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyPLN.  If not, see <http://www.gnu.org/licenses/>.
+
+'''Streaming `multipart/form-data` encoding for document uploads'''
+
+import os
+import uuid
+
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _to_bytes(value):
+    if isinstance(value, bytes):
+        return value
+    return value.encode('utf-8')
+
+
+def _remaining_size(fp):
+    '''Return how many bytes can still be read from `fp` (or `None` if it's
+    not possible to know that)'''
+    try:
+        if not isinstance(fp.read(0), bytes):
+            # Text files may be encoded to a different number of bytes
+            return None
+        position = fp.tell()
+        fp.seek(0, os.SEEK_END)
+        size = fp.tell()
+        fp.seek(position)
+    except (AttributeError, OSError, ValueError):
+        return None
+    return size - position
+
+
+class MultipartEncoder(object):
+    '''File-like object that encodes a `multipart/form-data` body on demand
+
+    `fields` is a dict of form fields and `files` a dict of files to be sent.
+    Each file can be a file-like object, a string or bytes (sent as the file
+    content) or a tuple containing a filename followed by one of these.
+    File contents are only read as the body is read, `CHUNK_SIZE` bytes at a
+    time, so the memory used does not depend on the size of the files.
+
+    If given, `callback` is called as `callback(bytes_read, total)` each time
+    a chunk is read (`total` is `None` when the size of a file is unknown).
+
+    It can be used as the `data` argument for `requests` (with the
+    `Content-Type` header set to `content_type`); since it also has a `len`
+    attribute, `requests` will send a `Content-Length` header instead of
+    using chunked encoding whenever possible.
+    '''
+
+    def __init__(self, fields, files, callback=None, boundary=None):
+        self.boundary = boundary or uuid.uuid4().hex
+        self.content_type = 'multipart/form-data; boundary={}'.format(
+                self.boundary)
+        self.callback = callback
+        self.bytes_read = 0
+
+        self._parts = []
+        for name, value in fields.items():
+            self._parts.append(self._header(name) + _to_bytes(value) + b'\r\n')
+        for name, document in files.items():
+            if isinstance(document, tuple):
+                filename, content = document
+            else:
+                filename = os.path.basename(getattr(document, 'name', name))
+                content = document
+            self._parts.append(self._header(name, filename))
+            if hasattr(content, 'read'):
+                self._parts.append(content)
+            else:
+                self._parts.append(_to_bytes(content))
+            self._parts.append(b'\r\n')
+        self._parts.append('--{}--\r\n'.format(self.boundary).encode('ascii'))
+
+        self.len = 0
+        for part in self._parts:
+            if isinstance(part, bytes):
+                size = len(part)
+            else:
+                size = _remaining_size(part)
+            if size is None:
+                self.len = None
+                break
+            self.len += size
+
+        self._current = 0
+        self._buffer = b''
+
+    def _header(self, name, filename=None):
+        disposition = 'form-data; name="{}"'.format(name.replace('"', '%22'))
+        if filename is not None:
+            disposition += '; filename="{}"'.format(
+                    filename.replace('"', '%22'))
+        return _to_bytes('--{}\r\nContent-Disposition: {}\r\n\r\n'.format(
+            self.boundary, disposition))
+
+    def read(self, size=-1):
+        '''Read up to `size` bytes of the body (all of it if `size` < 0)'''
+        if size is None or size < 0:
+            chunks = []
+            chunk = self.read(CHUNK_SIZE)
+            while chunk:
+                chunks.append(chunk)
+                chunk = self.read(CHUNK_SIZE)
+            return b''.join(chunks)
+
+        chunks, missing = [], size
+        while missing > 0 and self._current < len(self._parts):
+            part = self._parts[self._current]
+            if isinstance(part, bytes):
+                if not self._buffer:
+                    self._buffer = part
+                chunk, self._buffer = (self._buffer[:missing],
+                                       self._buffer[missing:])
+                if not self._buffer:
+                    self._current += 1
+            else:
+                chunk = _to_bytes(part.read(missing))
+                if not chunk:
+                    self._current += 1
+            chunks.append(chunk)
+            missing -= len(chunk)
+
+        data = b''.join(chunks)
+        if data:
+            self.bytes_read += len(data)
+            if self.callback is not None:
+                self.callback(self.bytes_read, self.len)
+        return data
+
+    def __iter__(self):
+        chunk = self.read(CHUNK_SIZE)
+        while chunk:
+            yield chunk
+            chunk = self.read(CHUNK_SIZE)
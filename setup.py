@@ -17,7 +17,7 @@
 # You should have received a copy of the GNU General Public License
 # along with PyPLN.  If not, see <http://www.gnu.org/licenses/>.
 
-from setuptools import setup, find_packages
+from setuptools import setup
 
 
 setup(name='pypln.api',
@@ -28,9 +28,11 @@ setup(name='pypln.api',
       url='https://github.com/NAMD/pypln.api',
       description="Pythonic library to access PyPLN HTTP REST API",
       zip_safe=True,
-      packages=find_packages(),
-      namespace_packages=['pypln'],
+      # `pypln` is a native namespace package (it has no `__init__.py`)
+      packages=['pypln.api'],
+      python_requires='>=3.8',
       install_requires=['requests'],
+      extras_require={'async': ['aiohttp'], 'matrix': ['numpy', 'scipy']},
       test_suite='nose.collector',
       license='GPL3',
 )
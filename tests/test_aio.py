@@ -0,0 +1,187 @@
+# coding: utf-8
+#
+# Copyright 2012 NAMD-EMAP-FGV
+#
+# This file is part of PyPLN. You can get more information at: http://pypln.org/.
+#
+# PyPLN is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyPLN is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyPLN.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import tempfile
+import unittest
+
+try:
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+    from pypln.api.aio import AsyncPyPLN, AsyncCorpus, AsyncDocument
+    from pypln.api.metrics import Metrics
+except ImportError:
+    web = None
+
+
+@unittest.skipIf(web is None, "aiohttp is not installed")
+class AsyncPyPLNTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.requests = []
+        self.filenames = []
+        app = web.Application()
+        app.router.add_get('/corpora/', self.list_corpora)
+        app.router.add_post('/documents/', self.add_document)
+        app.router.add_get('/documents/', self.list_documents)
+        app.router.add_get('/documents/{id}/properties/', self.properties)
+        app.router.add_get('/documents/{id}/properties/{prop}',
+                self.get_property)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        self.base_url = str(self.server.make_url('')).rstrip('/')
+        self.pypln = AsyncPyPLN(self.base_url, ('user', 'password'))
+
+    async def asyncTearDown(self):
+        await self.pypln.close()
+        await self.server.close()
+
+    def document(self, id_):
+        return {'owner': 'user',
+                'corpus': self.base_url + '/corpora/1/',
+                'size': 42,
+                'properties': '{}/documents/{}/properties/'.format(
+                    self.base_url, id_),
+                'url': '{}/documents/{}/'.format(self.base_url, id_),
+                'blob': '/test_{}.txt'.format(id_),
+                'uploaded_at': '2013-10-25T17:00:00.000Z'}
+
+    async def list_corpora(self, request):
+        self.requests.append(request)
+        if request.headers.get('Authorization') is None:
+            return web.Response(status=403, text='forbidden')
+        return web.json_response({'count': 1, 'next': None, 'previous': None,
+            'results': [{'created_at': '2013-10-25T17:00:00.000Z',
+                         'description': 'Test Corpus', 'documents': [],
+                         'name': 'test', 'owner': 'user',
+                         'url': self.base_url + '/corpora/1/'}]})
+
+    async def list_documents(self, request):
+        page = int(request.query.get('page', 1))
+        next_url = None
+        if page == 1:
+            next_url = self.base_url + '/documents/?page=2'
+        return web.json_response({'count': 2, 'next': next_url,
+            'previous': None, 'results': [self.document(page)]})
+
+    async def add_document(self, request):
+        data = await request.post()
+        self.filenames.append(data['blob'].filename)
+        if data['blob'].file.read() == b'fail':
+            return web.Response(status=400, text='bad document')
+        return web.json_response(self.document(1), status=201)
+
+    async def properties(self, request):
+        url = str(request.url)
+        return web.json_response({'properties': [url + 'text/',
+                                                 url + 'tokens/']})
+
+    async def get_property(self, request):
+        if request.match_info['prop'] != 'text':
+            return web.Response(status=404, text='not found')
+        return web.json_response({'value': 'text of document {}'.format(
+            request.match_info['id'])})
+
+    async def test_session_sends_credentials_and_user_agent(self):
+        await self.pypln.corpora()
+
+        headers = self.requests[0].headers
+        self.assertTrue(headers['Authorization'].startswith('Basic '))
+        self.assertIn('pypln.api/', headers['User-Agent'])
+
+    async def test_raise_an_error_if_auth_is_not_str_or_tuple(self):
+        with self.assertRaises(TypeError):
+            AsyncPyPLN(self.base_url, 1)
+
+    async def test_list_corpora(self):
+        corpora = await self.pypln.corpora()
+
+        self.assertEqual(len(corpora), 1)
+        self.assertIsInstance(corpora[0], AsyncCorpus)
+        self.assertEqual(corpora[0].name, 'test')
+        self.assertIs(corpora[0].session, self.pypln.session)
+
+    async def test_list_documents_in_all_pages(self):
+        first_page = await self.pypln.documents()
+        documents = await self.pypln.documents(full=True)
+
+        self.assertEqual([document.url for document in first_page],
+                         [self.document(1)['url']])
+        self.assertEqual([document.url for document in documents],
+                         [self.document(1)['url'], self.document(2)['url']])
+
+    async def test_get_properties(self):
+        document = AsyncDocument(session=self.pypln.session,
+                **self.document(3))
+
+        self.assertEqual(await document.properties, ['text', 'tokens'])
+        self.assertEqual(await document.get_property('text'),
+                         'text of document 3')
+
+    async def test_getting_missing_property_raises_runtime_error(self):
+        document = AsyncDocument(session=self.pypln.session,
+                **self.document(3))
+
+        with self.assertRaises(RuntimeError) as context:
+            await document.get_property('pos')
+        self.assertIn("Getting property pos failed with status 404",
+                      str(context.exception))
+
+    async def test_add_documents(self):
+        corpus = (await self.pypln.corpora())[0]
+
+        documents, errors = await corpus.add_documents([b'content', b'fail',
+            ('test.txt', b'other content')], workers=2)
+
+        self.assertEqual(len(documents), 2)
+        self.assertIsInstance(documents[0], AsyncDocument)
+        self.assertEqual(errors[0][0], b'fail')
+        self.assertIsInstance(errors[0][1], RuntimeError)
+
+    async def test_add_document_from_file_sends_only_its_name(self):
+        corpus = (await self.pypln.corpora())[0]
+        directory = tempfile.mkdtemp()
+        filename = os.path.join(directory, 'doc.txt')
+        with open(filename, 'wb') as fp:
+            fp.write(b'content')
+
+        try:
+            with open(filename, 'rb') as fp:
+                await corpus.add_document(fp)
+        finally:
+            os.remove(filename)
+            os.rmdir(directory)
+
+        self.assertEqual(self.filenames, ['doc.txt'])
+
+    async def test_requests_are_recorded_in_metrics(self):
+        metrics = Metrics()
+        async with AsyncPyPLN(self.base_url, ('user', 'password'),
+                              metrics=metrics) as pypln:
+            await pypln.corpora()
+            document = AsyncDocument(session=pypln.session,
+                                     **self.document(3))
+            with self.assertRaises(RuntimeError):
+                await document.get_property('pos')
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot['GET corpora']['statuses'], {200: 1})
+        self.assertEqual(
+            snapshot['GET documents/{id}/properties/{prop}']['statuses'],
+            {404: 1})
@@ -0,0 +1,70 @@
+# coding: utf-8
+#
+# Copyright 2012 NAMD-EMAP-FGV
+#
+# This file is part of PyPLN. You can get more information at: http://pypln.org/.
+#
+# PyPLN is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyPLN is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyPLN.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+
+from benchmarks.__main__ import parse_args
+from benchmarks.import_time import measure
+from benchmarks.scenarios import SCENARIOS, percentile, run_scenario
+from benchmarks.server import StandInServer
+from pypln.api import sessions
+
+
+class BenchmarksTest(unittest.TestCase):
+
+    def tearDown(self):
+        sessions.clear()
+
+    def test_percentile(self):
+        durations = list(range(1, 101))
+
+        self.assertEqual(percentile(durations, 50), 50)
+        self.assertEqual(percentile(durations, 99), 99)
+        self.assertEqual(percentile([3], 90), 3)
+
+    def test_scenarios_run_against_stand_in_server(self):
+        options = parse_args(['--page-size', '3', '--documents', '10',
+                              '--uploads', '4', '--fan-out', '5',
+                              '--wordclouds', '2', '--workers', '2'])
+        with StandInServer(page_size=options.page_size,
+                           documents=options.documents, tokens=20,
+                           wordcloud_size=100) as server:
+            results = [run_scenario(name, server, options)
+                       for name in SCENARIOS]
+
+        self.assertEqual([(result.name, result.operations)
+                          for result in results],
+                         [('upload', 4), ('pagination', 4), ('fan-out', 5),
+                          ('wordcloud', 2)])
+        for result in results:
+            self.assertEqual(len(result.durations), result.operations)
+
+
+class ImportTimeTest(unittest.TestCase):
+
+    # `import pypln.api` used to take more than 200 ms, mostly importing
+    # `pkg_resources` and `requests`
+    BUDGET = 0.15
+
+    def test_import_is_fast(self):
+        elapsed, modules = measure(repeat=3)
+
+        self.assertNotIn('requests', modules)
+        self.assertNotIn('pkg_resources', modules)
+        self.assertLess(elapsed, self.BUDGET)
@@ -0,0 +1,305 @@
+# coding: utf-8
+#
+# Copyright 2012 NAMD-EMAP-FGV
+#
+# This file is part of PyPLN. You can get more information at: http://pypln.org/.
+#
+# PyPLN is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyPLN is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyPLN.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from unittest.mock import patch
+
+import requests
+
+from pypln.api import Document
+from pypln.api.cache import MemoryCache, PropertyCache
+
+
+class PropertyCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.url = 'http://pypln.example.com/documents/1/properties/text'
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_store_and_retrieve_entry(self):
+        cache = PropertyCache(self.directory)
+        cache.set(self.url, b'{"value": "text"}', etag='"abc"',
+                  last_modified='Fri, 25 Oct 2013 17:00:00 GMT')
+
+        entry = PropertyCache(self.directory).get(self.url)
+
+        self.assertEqual(entry.body, b'{"value": "text"}')
+        self.assertEqual(entry.etag, '"abc"')
+        self.assertEqual(entry.last_modified,
+                         'Fri, 25 Oct 2013 17:00:00 GMT')
+
+    def test_missing_entry(self):
+        cache = PropertyCache(self.directory)
+
+        self.assertIsNone(cache.get(self.url))
+
+    def test_entries_are_fresh_only_for_max_age(self):
+        cache = PropertyCache(self.directory, max_age=60)
+        cache.set(self.url, b'{}')
+        entry = cache.get(self.url)
+
+        self.assertTrue(cache.is_fresh(entry))
+        self.assertFalse(cache.is_fresh(entry._replace(
+            stored_at=time.time() - 61)))
+
+    def test_entries_without_validators_are_fresh_without_max_age(self):
+        cache = PropertyCache(self.directory)
+        cache.set(self.url, b'{}')
+        cache.set(self.url + '2', b'{}', etag='"abc"')
+
+        entry = cache.get(self.url)
+        self.assertTrue(cache.is_fresh(entry))
+        self.assertFalse(cache.is_fresh(entry._replace(
+            stored_at=time.time() - 301)))
+        self.assertFalse(cache.is_fresh(cache.get(self.url + '2')))
+
+    def test_entries_are_kept_per_credentials(self):
+        cache = PropertyCache(self.directory)
+        cache.set(self.url, b'{"value": "mine"}', credentials='Token mine')
+
+        self.assertIsNone(cache.get(self.url))
+        self.assertIsNone(cache.get(self.url, 'Token other'))
+        self.assertEqual(cache.get(self.url, 'Token mine').body,
+                         b'{"value": "mine"}')
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = PropertyCache(self.directory)
+        for index in range(3):
+            url = self.url + str(index)
+            cache.set(url, b'x' * 50)
+            os.utime(cache._path(url), (index, index))
+        entry_size = os.path.getsize(cache._path(self.url + '0'))
+        # Headers may differ in a few bytes
+        cache.max_size = 3 * entry_size + 10
+        cache.get(self.url + '0')
+
+        cache.set(self.url + '3', b'x' * 50)
+
+        self.assertIsNotNone(cache.get(self.url + '0'))
+        self.assertIsNone(cache.get(self.url + '1'))
+        self.assertIsNotNone(cache.get(self.url + '2'))
+        self.assertLessEqual(cache.size(), cache.max_size)
+
+    def test_clear(self):
+        cache = PropertyCache(self.directory)
+        cache.set(self.url, b'{}')
+        cache.clear()
+
+        self.assertIsNone(cache.get(self.url))
+        self.assertEqual(os.listdir(self.directory), [])
+
+
+class DocumentWithPropertyCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.example_json = {
+            "owner": "user",
+            "corpus": "http://pypln.example.com/corpora/1/",
+            "size": 238953,
+            "properties": "http://pypln.example.com/documents/1/properties/",
+            "url": "http://pypln.example.com/documents/1/",
+            "blob": "/example.pdf",
+            "uploaded_at": "2013-10-25T17:10:00.000Z"
+        }
+        self.url = self.example_json['properties'] + 'text'
+        self.session = requests.Session()
+        self.session.property_cache = PropertyCache(self.directory)
+        self.document = Document(session=self.session, **self.example_json)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    @patch("requests.Session.get")
+    def test_property_is_stored_in_cache(self, mocked_get):
+        mocked_get.return_value.status_code = 200
+        mocked_get.return_value.content = b'{"value": "text"}'
+        mocked_get.return_value.headers = {'ETag': '"abc"'}
+
+        self.assertEqual(self.document.get_property('text'), 'text')
+
+        mocked_get.assert_called_with(self.url, headers={})
+        entry = self.session.property_cache.get(self.url)
+        self.assertEqual(entry.body, b'{"value": "text"}')
+        self.assertEqual(entry.etag, '"abc"')
+
+    @patch("requests.Session.get")
+    def test_cached_property_is_revalidated(self, mocked_get):
+        self.session.property_cache.set(self.url, b'{"value": "cached"}',
+                etag='"abc"', last_modified='Fri, 25 Oct 2013 17:00:00 GMT')
+        mocked_get.return_value.status_code = 304
+
+        self.assertEqual(self.document.get_property('text'), 'cached')
+
+        mocked_get.assert_called_with(self.url, headers={
+            'If-None-Match': '"abc"',
+            'If-Modified-Since': 'Fri, 25 Oct 2013 17:00:00 GMT'})
+
+    @patch("requests.Session.get")
+    def test_changed_property_replaces_cached_one(self, mocked_get):
+        self.session.property_cache.set(self.url, b'{"value": "cached"}',
+                etag='"abc"')
+        mocked_get.return_value.status_code = 200
+        mocked_get.return_value.content = b'{"value": "new"}'
+        mocked_get.return_value.headers = {'ETag': '"def"'}
+
+        self.assertEqual(self.document.get_property('text'), 'new')
+        self.assertEqual(self.session.property_cache.get(self.url).etag,
+                         '"def"')
+
+    @patch("requests.Session.get")
+    def test_fresh_property_does_not_touch_the_network(self, mocked_get):
+        self.session.property_cache.max_age = 60
+        self.session.property_cache.set(self.url, b'{"value": "cached"}')
+
+        self.assertEqual(self.document.get_property('text'), 'cached')
+        self.assertFalse(mocked_get.called)
+
+    @patch("requests.Session.get")
+    def test_property_without_validators_is_not_downloaded_again(self,
+            mocked_get):
+        mocked_get.return_value.status_code = 200
+        mocked_get.return_value.content = b'{"value": "text"}'
+        mocked_get.return_value.headers = {}
+
+        self.assertEqual(self.document.get_property('text'), 'text')
+        self.assertEqual(self.document.get_property('text'), 'text')
+        self.assertEqual(mocked_get.call_count, 1)
+
+    @patch("requests.Session.get")
+    def test_other_credentials_do_not_use_cached_property(self, mocked_get):
+        mocked_get.return_value.status_code = 200
+        mocked_get.return_value.content = b'{"value": "text"}'
+        mocked_get.return_value.headers = {}
+        self.document.get_property('text')
+
+        other_session = requests.Session()
+        other_session.auth = ('other', 'password')
+        other_session.property_cache = self.session.property_cache
+        document = Document(session=other_session, **self.example_json)
+
+        self.assertEqual(document.get_property('text'), 'text')
+        self.assertEqual(mocked_get.call_count, 2)
+
+    @patch("requests.Session.get")
+    def test_getting_cached_property_returns_an_error(self, mocked_get):
+        mocked_get.return_value.status_code = 403
+
+        with self.assertRaises(RuntimeError):
+            self.document.get_property('text')
+
+
+class MemoryCacheTest(unittest.TestCase):
+
+    def test_store_and_retrieve_values(self):
+        cache = MemoryCache()
+        cache.set('key', [1, 2, 3])
+
+        self.assertEqual(cache.get('key'), [1, 2, 3])
+        self.assertIsNone(cache.get('other key'))
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = MemoryCache(max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_entries_expire(self):
+        cache = MemoryCache(ttl=60)
+        cache.set('key', 'value')
+
+        with patch('time.time', return_value=time.time() + 61):
+            self.assertEqual(cache.get('key', 'expired'), 'expired')
+        self.assertEqual(len(cache), 0)
+
+    def test_invalidate_entries(self):
+        cache = MemoryCache()
+        cache.set('http://example.com/documents/1/properties/text', 1)
+        cache.set('http://example.com/documents/1/properties/tokens', 2)
+        cache.set('http://example.com/documents/2/properties/text', 3)
+
+        cache.invalidate_prefix('http://example.com/documents/1/')
+        self.assertEqual(len(cache), 1)
+        cache.invalidate('http://example.com/documents/2/properties/text')
+        self.assertEqual(len(cache), 0)
+
+
+class DocumentWithMemoryCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.example_json = {
+            "owner": "user",
+            "corpus": "http://pypln.example.com/corpora/1/",
+            "size": 238953,
+            "properties": "http://pypln.example.com/documents/1/properties/",
+            "url": "http://pypln.example.com/documents/1/",
+            "blob": "/example.pdf",
+            "uploaded_at": "2013-10-25T17:10:00.000Z"
+        }
+        self.session = requests.Session()
+        self.session.memory_cache = MemoryCache()
+        self.document = Document(session=self.session, **self.example_json)
+
+    @patch("requests.Session.get")
+    def test_properties_are_memoized(self, mocked_get):
+        mocked_get.return_value.status_code = 200
+        mocked_get.return_value.json.return_value = {'properties': [
+            self.example_json['properties'] + 'text/']}
+
+        self.assertEqual(self.document.properties, ['text'])
+        self.assertEqual(self.document.properties, ['text'])
+        self.assertEqual(mocked_get.call_count, 1)
+
+        self.document.invalidate_cache()
+        self.assertEqual(self.document.properties, ['text'])
+        self.assertEqual(mocked_get.call_count, 2)
+
+    @patch("requests.Session.get")
+    def test_property_values_are_memoized(self, mocked_get):
+        mocked_get.return_value.status_code = 200
+        mocked_get.return_value.json.return_value = {'value': None}
+
+        self.assertIsNone(self.document.get_property('language'))
+        self.assertIsNone(self.document.get_property('language'))
+        self.assertEqual(mocked_get.call_count, 1)
+        self.assertEqual(self.session.memory_cache.stats()['hits'], 1)
+
+    @patch("requests.Session.get")
+    def test_errors_are_not_memoized(self, mocked_get):
+        mocked_get.return_value.status_code = 500
+
+        self.assertRaises(RuntimeError, self.document.get_property, 'text')
+        self.assertRaises(RuntimeError, self.document.get_property, 'text')
+        self.assertEqual(mocked_get.call_count, 2)
@@ -0,0 +1,187 @@
+# coding: utf-8
+#
+# Copyright 2012 NAMD-EMAP-FGV
+#
+# This file is part of PyPLN. You can get more information at: http://pypln.org/.
+#
+# PyPLN is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyPLN is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyPLN.  If not, see <http://www.gnu.org/licenses/>.
+
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from unittest.mock import patch, Mock
+
+import requests
+
+from pypln.api import Corpus
+from pypln.api.dedup import DedupManifest, DuplicateDocumentError, \
+        content_hash
+
+
+class ContentHashTest(unittest.TestCase):
+
+    def test_hash_string(self):
+        self.assertEqual(content_hash(('test.txt', 'açaí')),
+                (hashlib.sha256('açaí'.encode('utf-8')).hexdigest(), 6))
+
+    def test_file_is_rewound(self):
+        fp = io.BytesIO(b'skipped content')
+        fp.seek(8)
+
+        self.assertEqual(content_hash(fp),
+                         (hashlib.sha256(b'content').hexdigest(), 7))
+        self.assertEqual(fp.tell(), 8)
+
+
+class DedupTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.base_url = 'http://pypln.example.com'
+        self.corpus = Corpus(session=requests.Session(),
+                             url=self.base_url + '/corpora/1/',
+                             name='test', description='Test Corpus',
+                             owner='user',
+                             created_at='2013-10-25T17:00:00.000Z',
+                             documents=[])
+        self.manifest = DedupManifest.for_corpus(self.directory, self.corpus)
+        self.uploaded = 0
+
+    def tearDown(self):
+        self.manifest.close()
+        shutil.rmtree(self.directory)
+
+    def post(self, url, data=None, files=None, **kwargs):
+        self.uploaded += 1
+        response = Mock()
+        response.status_code = 201
+        response.json.return_value = {
+            'owner': 'user',
+            'corpus': self.corpus.url,
+            'size': 8,
+            'properties': self.base_url + '/documents/{}/properties/'.format(
+                self.uploaded),
+            'url': self.base_url + '/documents/{}/'.format(self.uploaded),
+            'blob': '/test.txt',
+            'uploaded_at': '2013-10-25T17:10:00.000Z'}
+        return response
+
+    @patch("requests.Session.post")
+    def test_duplicates_are_not_uploaded(self, mocked_post):
+        mocked_post.side_effect = self.post
+
+        document = self.corpus.add_document(('a.txt', b'content.'),
+                                            dedup=self.manifest)
+        with self.assertRaises(DuplicateDocumentError) as context:
+            self.corpus.add_document(('b.txt', b'content.'),
+                                     dedup=self.manifest)
+
+        self.assertEqual(context.exception.url, document.url)
+        self.assertEqual(mocked_post.call_count, 1)
+        # The manifest is saved
+        self.assertEqual(DedupManifest.for_corpus(self.directory,
+                self.corpus).hashes,
+                {hashlib.sha256(b'content.').hexdigest(): document.url})
+
+    @patch("requests.Session.post")
+    def test_add_documents_reports_skipped_documents(self, mocked_post):
+        mocked_post.side_effect = self.post
+        documents = [('a.txt', b'content.'), ('b.txt', b'other'),
+                     ('c.txt', b'content.'), ('d.txt', b'content.')]
+
+        for workers in (None, 4):
+            self.uploaded = 0
+            manifest = DedupManifest(os.path.join(self.directory,
+                    'dedup_{}.jsonl'.format(workers)))
+            result, errors, skipped = self.corpus.add_documents(documents,
+                    workers=workers, dedup=manifest)
+
+            self.assertEqual(len(result), 2)
+            self.assertEqual(errors, [])
+            # Any two of the identical documents may be skipped when they're
+            # uploaded at the same time
+            self.assertEqual([document[1] for document, url in skipped],
+                             [b'content.', b'content.'])
+            self.assertEqual(self.uploaded, 2)
+
+    @patch("requests.Session.post")
+    def test_failed_uploads_are_not_recorded(self, mocked_post):
+        mocked_post.return_value.status_code = 500
+
+        with self.assertRaises(RuntimeError):
+            self.corpus.add_document(('a.txt', b'content.'),
+                                     dedup=self.manifest)
+
+        self.assertEqual(self.manifest.hashes, {})
+        mocked_post.side_effect = self.post
+        self.corpus.add_document(('a.txt', b'content.'), dedup=self.manifest)
+
+    @patch("requests.Session.get")
+    def test_rebuild_from_corpus_listing(self, mocked_get):
+        urls = [self.base_url + '/documents/{}/'.format(number)
+                for number in (1, 2)]
+        self.corpus.documents = urls
+        self.manifest.hashes = {'abc': urls[0], 'def': 'deleted'}
+
+        def get(url):
+            response = Mock()
+            response.status_code = 200
+            response.json.return_value = {
+                'url': url, 'size': 8, 'blob': '/' + url.split('/')[-2] +
+                '.txt', 'properties': url + 'properties/'}
+            return response
+        mocked_get.side_effect = get
+
+        self.manifest.rebuild(self.corpus)
+
+        self.assertEqual(self.manifest.hashes, {'abc': urls[0]})
+        # The same filename and size may be a different file, so it's only
+        # reported
+        fp = io.BytesIO(b'12345678')
+        fp.name = '/tmp/2.txt'
+        digest = self.manifest.claim(fp)
+        self.assertEqual(self.manifest.likely_duplicates, [(fp, urls[1])])
+        self.manifest.release(digest)
+
+        manifest = DedupManifest(self.manifest.filename,
+                                 match_signatures=True)
+        self.assertEqual(manifest.hashes, {'abc': urls[0]})
+        with self.assertRaises(DuplicateDocumentError) as context:
+            manifest.claim(fp)
+        self.assertEqual(context.exception.url, urls[1])
+
+    def test_uploads_are_appended_to_the_manifest(self):
+        self.manifest.add('abc', self.base_url + '/documents/1/')
+        self.manifest.add('def', self.base_url + '/documents/2/')
+        self.manifest.close()
+        with open(self.manifest.filename, 'ab') as fp:
+            fp.write(b'{"hash": "gh')
+
+        manifest = DedupManifest(self.manifest.filename)
+        manifest.add('ghi', self.base_url + '/documents/3/')
+        manifest.close()
+
+        with open(self.manifest.filename, 'rb') as fp:
+            self.assertEqual(len(fp.readlines()), 4)
+        self.assertEqual(DedupManifest(self.manifest.filename).hashes, {
+            'abc': self.base_url + '/documents/1/',
+            'def': self.base_url + '/documents/2/',
+            'ghi': self.base_url + '/documents/3/'})
+        manifest.compact()
+        with open(self.manifest.filename, 'rb') as fp:
+            self.assertEqual(len(fp.readlines()), 3)
@@ -0,0 +1,155 @@
+# coding: utf-8
+#
+# Copyright 2012 NAMD-EMAP-FGV
+#
+# This file is part of PyPLN. You can get more information at: http://pypln.org/.
+#
+# PyPLN is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyPLN is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyPLN.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from unittest.mock import patch, Mock
+
+import requests
+
+from pypln.api import Corpus, Document
+from pypln.api.export import ColumnarWriter, PropertyFile
+
+
+class PropertyFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'tokens')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_read_values_written(self):
+        values = [['açaí', 'é', 'bom'], [], {'a': 1}, None]
+        writer = ColumnarWriter(self.path)
+        for number, value in enumerate(values):
+            writer.write('http://example.com/{}/'.format(number), value)
+        writer.commit()
+
+        with PropertyFile(self.path) as property_file:
+            self.assertEqual(len(property_file), 4)
+            self.assertEqual(property_file[0], values[0])
+            self.assertEqual(property_file[-1], None)
+            self.assertEqual(property_file.get('http://example.com/2/'),
+                             {'a': 1})
+            self.assertEqual(property_file.get('http://example.com/9/', 0), 0)
+            self.assertEqual([value for url, value in property_file], values)
+            with self.assertRaises(IndexError):
+                property_file[4]
+
+    def test_empty_file(self):
+        ColumnarWriter(self.path).commit()
+
+        with PropertyFile(self.path) as property_file:
+            self.assertEqual(list(property_file), [])
+
+    def test_invalid_file(self):
+        writer = ColumnarWriter(self.path)
+        writer.write('http://example.com/1/', 1)
+        writer.commit()
+        with open(self.path + '.keys', 'ab') as fp:
+            fp.write(b'http://example.com/2/\n')
+
+        with self.assertRaises(ValueError):
+            PropertyFile(self.path)
+
+
+class ExportPropertyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'tokens')
+        self.session = requests.Session()
+        self.urls = ['http://pypln.example.com/documents/{}/'.format(number)
+                     for number in range(5)]
+        self.corpus = Corpus(session=self.session,
+                             url='http://pypln.example.com/corpora/1/',
+                             name='test', description='Test Corpus',
+                             owner='user',
+                             created_at='2013-10-25T17:00:00.000Z',
+                             documents=self.urls)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def get(self, url):
+        response = Mock()
+        response.status_code = 200
+        if url.endswith('/tokens'):
+            if '/3/' in url:
+                response.status_code = 404
+            response.json.return_value = {'value': [url, 'açaí']}
+        else:
+            response.json.return_value = {
+                'url': url, 'properties': url + 'properties/', 'size': 1,
+                'owner': 'user', 'corpus': self.corpus.url,
+                'blob': '/test.txt', 'uploaded_at': '2013-10-25T17:00:00Z'}
+        return response
+
+    def expected(self, url):
+        return [url + 'properties/tokens', 'açaí']
+
+    @patch("requests.Session.get")
+    def test_export_jsonl(self, mocked_get):
+        mocked_get.side_effect = self.get
+
+        count, errors = self.corpus.export_property('tokens', self.path)
+
+        self.assertEqual(count, 4)
+        self.assertEqual([document for document, exc in errors],
+                         [self.urls[3]])
+        with open(self.path, 'rb') as fp:
+            lines = [json.loads(line.decode('utf-8')) for line in fp]
+        self.assertEqual(sorted(line['url'] for line in lines),
+                         self.urls[:3] + self.urls[4:])
+        for line in lines:
+            self.assertEqual(line['value'], self.expected(line['url']))
+
+    @patch("requests.Session.get")
+    def test_export_columnar(self, mocked_get):
+        mocked_get.side_effect = self.get
+        documents = [Document.from_session(url, self.session)
+                     for url in self.urls[:2]]
+
+        count, errors = self.corpus.export_property('tokens', self.path,
+                format='columnar', documents=documents, workers=2)
+
+        self.assertEqual((count, errors), (2, []))
+        with PropertyFile(self.path) as property_file:
+            self.assertEqual(sorted(property_file.urls), self.urls[:2])
+            for url, value in property_file:
+                self.assertEqual(value, self.expected(url))
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            self.corpus.export_property('tokens', self.path, format='csv')
+
+    @patch("requests.Session.get")
+    def test_nothing_is_left_if_export_is_interrupted(self, mocked_get):
+        mocked_get.side_effect = KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            self.corpus.export_property('tokens', self.path,
+                                        format='columnar', workers=1)
+        self.assertEqual(os.listdir(self.directory), [])
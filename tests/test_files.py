@@ -0,0 +1,69 @@
+# coding: utf-8
+#
+# Copyright 2012 NAMD-EMAP-FGV
+#
+# This file is part of PyPLN. You can get more information at: http://pypln.org/.
+#
+# PyPLN is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyPLN is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyPLN.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from pypln.api.files import AtomicFile, write_atomically
+
+
+class AtomicFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'test.txt')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_file_is_replaced_only_when_committed(self):
+        write_atomically(self.filename, b'old')
+        fp = AtomicFile(self.filename)
+        fp.write(b'new')
+
+        with open(self.filename, 'rb') as existing:
+            self.assertEqual(existing.read(), b'old')
+        fp.commit()
+        with open(self.filename, 'rb') as existing:
+            self.assertEqual(existing.read(), b'new')
+        self.assertEqual(os.listdir(self.directory), ['test.txt'])
+
+    def test_failed_write_keeps_the_old_file(self):
+        write_atomically(self.filename, b'old')
+
+        with self.assertRaises(ValueError):
+            with AtomicFile(self.filename) as fp:
+                fp.write(b'new')
+                raise ValueError()
+
+        with open(self.filename, 'rb') as existing:
+            self.assertEqual(existing.read(), b'old')
+        self.assertEqual(os.listdir(self.directory), ['test.txt'])
+
+    def test_writers_of_the_same_file_do_not_collide(self):
+        first, second = AtomicFile(self.filename), AtomicFile(self.filename)
+        first.write(b'first')
+        second.write(b'second')
+        first.commit()
+        second.commit()
+
+        with open(self.filename, 'rb') as existing:
+            self.assertEqual(existing.read(), b'second')
@@ -0,0 +1,169 @@
+# coding: utf-8
+#
+# Copyright 2012 NAMD-EMAP-FGV
+#
+# This file is part of PyPLN. You can get more information at: http://pypln.org/.
+#
+# PyPLN is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyPLN is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyPLN.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+
+from unittest.mock import patch, Mock
+
+from pypln.api import PyPLN, Corpus, DocumentRecord, sessions
+from pypln.api.index import MetadataIndex
+
+
+class MetadataIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.base_url = "http://pypln.example.com"
+        self.pypln = PyPLN(self.base_url, ("user", "password"))
+        self.corpus = {'created_at': '2013-10-25T17:00:00.000Z',
+                       'description': 'Test Corpus',
+                       'documents': [],
+                       'name': 'test',
+                       'owner': 'user',
+                       'url': 'http://pypln.example.com/corpora/1/'}
+        self.documents = [self.document(number) for number in range(1, 6)]
+        self.page_size = 2
+        self.requested = []
+
+    def tearDown(self):
+        sessions.clear()
+
+    def document(self, number):
+        return {'owner': 'user' if number % 2 else 'other',
+                'corpus': 'http://pypln.example.com/corpora/{}/'.format(
+                    1 if number < 4 else 2),
+                'size': 100 * number,
+                'properties': 'http://pypln.example.com/documents/{}/'
+                              'properties/'.format(number),
+                'url': 'http://pypln.example.com/documents/{}/'.format(number),
+                'blob': '/test_{}.{}'.format(number,
+                                             'pdf' if number % 2 else 'txt'),
+                'uploaded_at': '2013-10-{:02d}T17:00:00.000Z'.format(number)}
+
+    def get(self, url, descending=False):
+        '''Answer GETs to the listings using `self.documents`'''
+        self.requested.append(url)
+        response = Mock()
+        response.status_code = 200
+        if url.startswith(self.base_url + '/corpora/'):
+            response.json.return_value = {'count': 1, 'next': None,
+                                          'previous': None,
+                                          'results': [self.corpus]}
+            return response
+
+        documents = sorted(self.documents, key=lambda d: d['uploaded_at'],
+                           reverse=descending)
+        page = int(url.split('=')[1]) if '=' in url else 1
+        start = (page - 1) * self.page_size
+        next_url = None
+        if start + self.page_size < len(documents):
+            next_url = self.base_url + '/documents/?page={}'.format(page + 1)
+        response.json.return_value = {
+                'count': len(documents), 'next': next_url, 'previous': None,
+                'results': documents[start:start + self.page_size]}
+        return response
+
+    @patch("requests.Session.get")
+    def test_query_documents(self, mocked_get):
+        mocked_get.side_effect = self.get
+        index = MetadataIndex(self.pypln)
+
+        self.assertEqual(index.sync(), 5)
+
+        def urls(**filters):
+            return [document.url for document in index.documents(**filters)]
+        document_url = 'http://pypln.example.com/documents/{}/'.format
+        self.assertEqual(urls(), [document_url(n) for n in range(1, 6)])
+        self.assertEqual(urls(corpus='http://pypln.example.com/corpora/2/'),
+                         [document_url(4), document_url(5)])
+        self.assertEqual(urls(owner='other', min_size=300),
+                         [document_url(4)])
+        self.assertEqual(urls(blob='*.pdf', uploaded_after='2013-10-02'),
+                         [document_url(3), document_url(5)])
+        self.assertEqual(urls(max_size=200, limit=1), [document_url(1)])
+        self.assertEqual(index.count_documents(owner='user'), 3)
+
+        document = index.documents(limit=1)[0]
+        self.assertIsInstance(document, DocumentRecord)
+        self.assertIs(document.session, self.pypln.session)
+        self.assertEqual(document.properties_url,
+                         self.documents[0]['properties'])
+
+    @patch("requests.Session.get")
+    def test_query_corpora(self, mocked_get):
+        mocked_get.side_effect = self.get
+        index = MetadataIndex(self.pypln)
+        index.sync()
+
+        corpora = index.corpora(owner='user')
+        self.assertEqual(corpora, [Corpus(session=self.pypln.session,
+                                          **self.corpus)])
+        self.assertEqual(index.corpora(name='other'), [])
+
+    @patch("requests.Session.get")
+    def test_sync_only_last_pages_of_ascending_listing(self, mocked_get):
+        mocked_get.side_effect = self.get
+        self.documents = [self.document(number) for number in range(1, 10)]
+        index = MetadataIndex(self.pypln)
+        index.sync()
+        self.documents.append(self.document(10))
+        self.documents.append(self.document(11))
+        del self.requested[:]
+
+        self.assertEqual(index.sync(), 2)
+
+        self.assertEqual(index.watermark, self.documents[-1]['uploaded_at'])
+        self.assertEqual(index.count_documents(), 11)
+        # Pages are read backwards until one has a document older than the
+        # watermark (documents uploaded at the same time may be in the page
+        # before)
+        document_pages = [url for url in self.requested
+                          if '/documents/' in url]
+        self.assertEqual(document_pages,
+                         [self.base_url + '/documents/'] +
+                         [self.base_url + '/documents/?page={}'.format(page)
+                          for page in (6, 5, 4)])
+
+    @patch("requests.Session.get")
+    def test_sync_only_first_pages_of_descending_listing(self, mocked_get):
+        mocked_get.side_effect = lambda url: self.get(url, descending=True)
+        index = MetadataIndex(self.pypln)
+        index.sync()
+        self.documents.append(self.document(6))
+        self.documents.append(self.document(7))
+        del self.requested[:]
+
+        self.assertEqual(index.sync(), 2)
+
+        self.assertEqual(index.count_documents(), 7)
+        document_pages = [url for url in self.requested
+                          if '/documents/' in url]
+        self.assertEqual(document_pages, [self.base_url + '/documents/',
+                                          self.base_url + '/documents/?page=2'])
+
+    @patch("requests.Session.get")
+    def test_full_sync_removes_deleted_documents(self, mocked_get):
+        mocked_get.side_effect = self.get
+        index = MetadataIndex(self.pypln)
+        index.sync()
+        del self.documents[0]
+
+        index.sync()
+        self.assertEqual(index.count_documents(), 5)
+        index.sync(full=True)
+        self.assertEqual(index.count_documents(), 4)
@@ -0,0 +1,113 @@
+# coding: utf-8
+#
+# Copyright 2012 NAMD-EMAP-FGV
+#
+# This file is part of PyPLN. You can get more information at: http://pypln.org/.
+#
+# PyPLN is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyPLN is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyPLN.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import unittest
+
+from unittest.mock import patch
+
+import requests
+
+from pypln.api import Document
+from pypln.api.jsonstream import iter_items
+
+
+def chunked(data, size):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+class IterItemsTest(unittest.TestCase):
+
+    def assertParses(self, obj, expected):
+        for indent in (None, 2):
+            data = json.dumps(obj, indent=indent,
+                              ensure_ascii=False).encode('utf-8')
+            for size in (1, 2, 3, 7, 64, len(data)):
+                self.assertEqual(list(iter_items(chunked(data, size))),
+                                 expected)
+
+    def test_yield_list_items(self):
+        value = [1, 2.5, -3e10, 1.5e-7, "açaí", "\"]}",
+                 {"a": [1, 2]}, [["token", 1]], None, True, 12345678901234]
+        self.assertParses({'value': value}, value)
+
+    def test_skip_other_keys(self):
+        self.assertParses({'other': {'value': [1, 2, "]"]}, 'value': [3],
+                           'z': 4}, [3])
+
+    def test_yield_value_that_is_not_a_list(self):
+        self.assertParses({'value': "long text " * 100},
+                          ["long text " * 100])
+        self.assertParses({'value': -1.25}, [-1.25])
+
+    def test_empty_list(self):
+        self.assertParses({'value': []}, [])
+
+    def test_missing_key(self):
+        with self.assertRaises(KeyError):
+            list(iter_items([b'{"other": 1}']))
+
+    def test_invalid_document(self):
+        with self.assertRaises(ValueError):
+            list(iter_items([b'{"value": [1, 2']))
+        with self.assertRaises(ValueError):
+            list(iter_items([b'[1, 2]']))
+
+    def test_items_are_yielded_before_document_ends(self):
+        def chunks():
+            yield b'{"value": [["first", 1], '
+            raise AssertionError("Should not read before first item")
+
+        self.assertEqual(next(iter_items(chunks())), ["first", 1])
+
+
+class DocumentIterPropertyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.example_json = {
+            "owner": "user",
+            "corpus": "http://pypln.example.com/corpora/1/",
+            "size": 238953,
+            "properties": "http://pypln.example.com/documents/1/properties/",
+            "url": "http://pypln.example.com/documents/1/",
+            "blob": "/example.pdf",
+            "uploaded_at": "2013-10-25T17:10:00.000Z"
+        }
+        self.document = Document(session=requests.Session(),
+                                 **self.example_json)
+
+    @patch("requests.Session.get")
+    def test_iter_property(self, mocked_get):
+        tokens = ["This", "is", "a", "test", "."]
+        data = json.dumps({'value': tokens}).encode('utf-8')
+        mocked_get.return_value.status_code = 200
+        mocked_get.return_value.iter_content.return_value = chunked(data, 4)
+
+        self.assertEqual(list(self.document.iter_property('tokens')), tokens)
+        mocked_get.assert_called_with(self.example_json['properties'] +
+                'tokens', stream=True)
+        self.assertTrue(mocked_get.return_value.close.called)
+
+    @patch("requests.Session.get")
+    def test_iter_property_returns_an_error(self, mocked_get):
+        mocked_get.return_value.status_code = 404
+
+        with self.assertRaises(RuntimeError):
+            self.document.iter_property('tokens')
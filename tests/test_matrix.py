@@ -0,0 +1,115 @@
+# coding: utf-8
+#
+# Copyright 2012 NAMD-EMAP-FGV
+#
+# This file is part of PyPLN. You can get more information at: http://pypln.org/.
+#
+# PyPLN is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyPLN is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyPLN.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+
+from unittest.mock import patch, Mock
+
+import requests
+
+try:
+    import numpy
+    import scipy.sparse
+except ImportError:
+    numpy = None
+
+from pypln.api import Corpus
+from pypln.api.matrix import TermMatrix
+
+
+@unittest.skipIf(numpy is None, "numpy and scipy are not installed")
+class TermMatrixTest(unittest.TestCase):
+
+    def test_add_documents(self):
+        matrix = TermMatrix(batch_size=2)
+        matrix.add('doc1', [['a', 2], ['b', 1]])
+        matrix.add('doc2', {'b': 3})
+        matrix.add('doc3', [['c', 5], ['a', 1]])
+        matrix.add('doc4', [])
+
+        self.assertEqual(matrix.vocabulary, ['a', 'b', 'c'])
+        self.assertEqual(matrix.urls, ['doc1', 'doc2', 'doc3', 'doc4'])
+        self.assertTrue(scipy.sparse.issparse(matrix.matrix))
+        self.assertEqual(matrix.matrix.toarray().tolist(),
+                         [[2, 1, 0], [0, 3, 0], [1, 0, 5], [0, 0, 0]])
+        self.assertEqual(matrix.term_counts().tolist(), [3, 4, 5])
+        self.assertEqual(matrix.most_common(2), [('c', 5), ('b', 4)])
+        self.assertEqual(matrix.column('b'), 1)
+        self.assertIn('doc2', matrix)
+
+        # New documents can be added after the matrix was built
+        matrix.add('doc5', [['d', 1]])
+        self.assertEqual(matrix.matrix.shape, (5, 4))
+        self.assertEqual(matrix.matrix[4].toarray().tolist(), [[0, 0, 0, 1]])
+        with self.assertRaises(ValueError):
+            matrix.add('doc5', [])
+
+    def test_empty_matrix(self):
+        self.assertEqual(TermMatrix().matrix.shape, (0, 0))
+
+
+@unittest.skipIf(numpy is None, "numpy and scipy are not installed")
+class CorpusTermMatrixTest(unittest.TestCase):
+
+    def setUp(self):
+        self.urls = ['http://pypln.example.com/documents/{}/'.format(number)
+                     for number in range(4)]
+        self.corpus = Corpus(session=requests.Session(),
+                             url='http://pypln.example.com/corpora/1/',
+                             name='test', description='Test Corpus',
+                             owner='user',
+                             created_at='2013-10-25T17:00:00.000Z',
+                             documents=self.urls[:3])
+        self.requested = []
+
+    def get(self, url):
+        self.requested.append(url)
+        response = Mock()
+        response.status_code = 200
+        if url.endswith('/freqdist'):
+            number = int(url.split('/')[-3])
+            response.json.return_value = {'value': [['token', number],
+                                                    [str(number), 1]]}
+        else:
+            response.json.return_value = {
+                'url': url, 'properties': url + 'properties/', 'size': 1,
+                'owner': 'user', 'corpus': self.corpus.url,
+                'blob': '/test.txt', 'uploaded_at': '2013-10-25T17:00:00Z'}
+        return response
+
+    @patch("requests.Session.get")
+    def test_term_matrix_and_update(self, mocked_get):
+        mocked_get.side_effect = self.get
+
+        matrix, errors = self.corpus.term_matrix(workers=2)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(matrix.urls), self.urls[:3])
+        self.assertEqual(dict(matrix.most_common()),
+                         {'token': 3, '0': 1, '1': 1, '2': 1})
+
+        self.corpus.documents = self.urls
+        del self.requested[:]
+        same_matrix, errors = self.corpus.term_matrix(update=matrix)
+
+        self.assertIs(same_matrix, matrix)
+        self.assertEqual(self.requested,
+                         [self.urls[3], self.urls[3] + 'properties/freqdist'])
+        self.assertEqual(matrix.matrix.shape, (4, 5))
+        self.assertEqual(dict(matrix.most_common(1)), {'token': 6})
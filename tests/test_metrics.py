@@ -0,0 +1,184 @@
+# coding: utf-8
+#
+# Copyright 2012 NAMD-EMAP-FGV
+#
+# This file is part of PyPLN. You can get more information at: http://pypln.org/.
+#
+# PyPLN is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyPLN is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyPLN.  If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import requests
+
+from benchmarks.server import StandInServer
+from pypln.api import PyPLN, Corpus, Document, sessions
+from pypln.api.metrics import Histogram, Metrics, endpoint_template
+
+
+class EndpointTemplateTest(unittest.TestCase):
+
+    def test_ids_and_properties_are_replaced(self):
+        base_url = 'http://pypln.example.com'
+        self.assertEqual(endpoint_template(base_url + '/documents/?page=2'),
+                         'documents')
+        self.assertEqual(endpoint_template(base_url + '/corpora/12/'),
+                         'corpora/{id}')
+        self.assertEqual(endpoint_template(base_url +
+                                           '/documents/1/properties/'),
+                         'documents/{id}/properties')
+        self.assertEqual(endpoint_template(base_url +
+                                           '/documents/1/properties/tokens'),
+                         'documents/{id}/properties/{prop}')
+
+
+class HistogramTest(unittest.TestCase):
+
+    def test_quantiles(self):
+        histogram = Histogram(buckets=(1, 2, 4, float('inf')))
+        for value in (0.5, 1.5, 1.5, 3, 100):
+            histogram.observe(value)
+
+        self.assertEqual(histogram.counts, [1, 2, 1, 1])
+        self.assertEqual(histogram.count, 5)
+        self.assertEqual(histogram.sum, 106.5)
+        self.assertEqual(histogram.quantile(0.5), 2)
+        self.assertEqual(histogram.quantile(0.99), float('inf'))
+        self.assertIsNone(Histogram().quantile(0.5))
+
+
+class MetricsTest(unittest.TestCase):
+
+    def tearDown(self):
+        sessions.clear()
+
+    def test_record_and_snapshot(self):
+        events = []
+        metrics = Metrics(callback=events.append)
+        url = 'http://pypln.example.com/documents/{}/properties/tokens'
+        metrics.record('GET', url.format(1), 200, 0.02, 0, 100)
+        metrics.record('GET', url.format(2), 404, 0.2, 0, 10)
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(list(snapshot),
+                         ['GET documents/{id}/properties/{prop}'])
+        values = snapshot['GET documents/{id}/properties/{prop}']
+        self.assertEqual(values['requests'], 2)
+        self.assertEqual(values['statuses'], {200: 1, 404: 1})
+        self.assertEqual(values['bytes_received'], 110)
+        self.assertEqual(values['latency']['count'], 2)
+        self.assertEqual([event.status for event in events], [200, 404])
+        self.assertEqual(events[0].endpoint,
+                         'documents/{id}/properties/{prop}')
+
+        metrics.reset()
+        self.assertEqual(metrics.snapshot(), {})
+
+    def test_requests_made_by_the_client_are_recorded(self):
+        metrics = Metrics()
+        with StandInServer(page_size=2, documents=3, tokens=10) as server:
+            pypln = PyPLN(server.url, ('user', 'password'), metrics=metrics)
+            documents = pypln.documents(full=True)
+            documents[0].get_property('tokens')
+            pypln.corpora()[0].add_document(('test.txt', b'content.'))
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(sorted(snapshot),
+                         ['GET corpora', 'GET documents',
+                          'GET documents/{id}/properties/{prop}',
+                          'POST documents'])
+        self.assertEqual(snapshot['GET documents']['requests'], 2)
+        self.assertEqual(snapshot['POST documents']['statuses'], {201: 1})
+        self.assertGreater(snapshot['POST documents']['bytes_sent'], 8)
+        self.assertGreater(snapshot['GET documents']['bytes_received'], 0)
+
+    def test_install_only_once(self):
+        metrics = Metrics()
+        pypln = PyPLN('http://pypln.example.com', ('user', 'password'),
+                      metrics=metrics)
+        send = pypln.session.send
+        metrics.install(pypln.session)
+
+        self.assertIs(pypln.session.send, send)
+        self.assertTrue(metrics.installed_on(pypln.session))
+        metrics.uninstall(pypln.session)
+        self.assertFalse(metrics.installed_on(pypln.session))
+
+    def test_failed_requests_are_recorded(self):
+        events = []
+        metrics = Metrics(callback=events.append)
+        with StandInServer() as server:
+            url = server.url
+        pypln = PyPLN(url, ('user', 'password'), metrics=metrics)
+
+        with self.assertRaises(requests.ConnectionError):
+            pypln.corpora()
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot['GET corpora']['statuses'], {None: 1})
+        self.assertEqual([(event.status, event.error) for event in events],
+                         [(None, 'ConnectionError')])
+
+    def test_other_clients_are_not_recorded(self):
+        metrics = Metrics()
+        with StandInServer(page_size=2, documents=3) as server:
+            PyPLN(server.url, ('user', 'password'), metrics=metrics)
+            PyPLN(server.url, ('user', 'password')).corpora()
+
+        self.assertEqual(metrics.snapshot(), {})
+
+    def test_shared_sessions_and_from_url_are_recorded(self):
+        metrics, document_metrics = Metrics(), Metrics()
+        sessions.configure(metrics=metrics)
+        try:
+            with StandInServer(page_size=2, documents=3) as server:
+                corpus = Corpus.from_url(server.url + '/corpora/1/',
+                                         ('user', 'password'))
+                Document.from_url(corpus.documents[0], ('user', 'password'),
+                                  metrics=document_metrics)
+        finally:
+            sessions.configure()
+
+        self.assertEqual(sorted(metrics.snapshot()),
+                         ['GET corpora/{id}', 'GET documents/{id}'])
+        self.assertEqual(sorted(document_metrics.snapshot()),
+                         ['GET documents/{id}'])
+
+    def test_bytes_received_without_content_length(self):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                # Without `Content-Length`, the body ends when the connection
+                # is closed
+                self.send_response(200)
+                self.end_headers()
+                self.wfile.write(b'{"count": 0}')
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(('127.0.0.1', 0), Handler)
+        thread = threading.Thread(target=server.handle_request)
+        thread.start()
+        metrics = Metrics()
+        url = 'http://127.0.0.1:{}'.format(server.server_address[1])
+        try:
+            pypln = PyPLN(url, ('user', 'password'), metrics=metrics)
+            pypln.session.get(url + '/documents/')
+        finally:
+            thread.join()
+            server.server_close()
+
+        self.assertEqual(
+            metrics.snapshot()['GET documents']['bytes_received'], 12)
@@ -0,0 +1,197 @@
+# coding: utf-8
+#
+# Copyright 2012 NAMD-EMAP-FGV
+#
+# This file is part of PyPLN. You can get more information at: http://pypln.org/.
+#
+# PyPLN is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyPLN is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyPLN.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from unittest.mock import patch, Mock
+
+import requests
+
+from pypln.api import Corpus
+from pypln.api.mirror import MirrorManifest
+
+
+class MirrorManifestTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_entries_are_saved_as_they_are_set(self):
+        manifest = MirrorManifest(self.directory)
+        manifest.set('http://example.com/1/', {'properties': {}})
+        manifest.set('http://example.com/1/', {'properties': {'a': 1}})
+
+        self.assertEqual(MirrorManifest(self.directory).entries,
+                         {'http://example.com/1/': {'properties': {'a': 1}}})
+        manifest.close()
+
+    def test_incomplete_lines_are_ignored(self):
+        filename = os.path.join(self.directory, MirrorManifest.FILENAME)
+        with open(filename, 'wb') as fp:
+            fp.write(b'{"url": "http://example.com/1/", "entry": {}}\n'
+                     b'{"url": "http://example.com/2/", "en')
+
+        manifest = MirrorManifest(self.directory)
+        self.assertEqual(list(manifest.entries), ['http://example.com/1/'])
+        manifest.set('http://example.com/3/', {})
+        manifest.close()
+
+        self.assertEqual(sorted(MirrorManifest(self.directory).entries),
+                         ['http://example.com/1/', 'http://example.com/3/'])
+
+    def test_compact(self):
+        manifest = MirrorManifest(self.directory)
+        for number in range(3):
+            manifest.set('http://example.com/1/', {'version': number})
+        manifest.compact()
+
+        with open(manifest.filename) as fp:
+            self.assertEqual(json.loads(fp.read()),
+                             {'url': 'http://example.com/1/',
+                              'entry': {'version': 2}})
+
+
+class CorpusMirrorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.base_url = 'http://pypln.example.com'
+        self.document_urls = [self.base_url + '/documents/{}/'.format(number)
+                              for number in (1, 2)]
+        self.corpus = Corpus(session=requests.Session(),
+                             url=self.base_url + '/corpora/1/',
+                             name='test', description='Test Corpus',
+                             owner='user',
+                             created_at='2013-10-25T17:00:00.000Z',
+                             documents=self.document_urls)
+        # Property values by URL (missing ones are not processed yet)
+        self.values = {}
+        for url in self.document_urls:
+            for prop in ('tokens', 'language'):
+                self.values[url + 'properties/' + prop] = prop + ' of ' + url
+        self.requested = []
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def get(self, url, headers=None):
+        self.requested.append(url)
+        response = Mock()
+        response.headers = {}
+        if url in self.document_urls:
+            response.status_code = 200
+            response.json.return_value = {'url': url,
+                                          'properties': url + 'properties/'}
+        elif url.endswith('/properties/'):
+            response.status_code = 200
+            response.json.return_value = {'properties': [
+                url + prop + '/' for prop in ('tokens', 'language')
+                if url + prop in self.values]}
+        elif url in self.values:
+            etag = '"{}"'.format(hash(self.values[url]))
+            if headers and headers.get('If-None-Match') == etag:
+                response.status_code = 304
+            else:
+                response.status_code = 200
+                response.content = json.dumps(
+                        {'value': self.values[url]}).encode('utf-8')
+                response.headers = {'ETag': etag}
+        else:
+            response.status_code = 404
+        return response
+
+    def read(self, url, prop):
+        filename = os.path.join(self.directory, url.split('/')[-2],
+                                prop + '.json')
+        with open(filename) as fp:
+            return json.load(fp)['value']
+
+    @patch("requests.Session.get")
+    def test_mirror_every_property(self, mocked_get):
+        mocked_get.side_effect = self.get
+
+        result, errors = self.corpus.mirror(self.directory, workers=2)
+
+        self.assertEqual(sorted(result), self.document_urls)
+        self.assertEqual(errors, [])
+        for url in self.document_urls:
+            for prop in ('tokens', 'language'):
+                self.assertEqual(self.read(url, prop), prop + ' of ' + url)
+
+    @patch("requests.Session.get")
+    def test_mirror_again_only_downloads_what_is_new(self, mocked_get):
+        mocked_get.side_effect = self.get
+        url = self.document_urls[1]
+        del self.values[url + 'properties/language']
+        self.corpus.mirror(self.directory, properties=['tokens', 'language'])
+
+        self.values[url + 'properties/language'] = 'processed'
+        del self.requested[:]
+        result, errors = self.corpus.mirror(self.directory,
+                                            properties=['tokens', 'language'])
+
+        self.assertEqual(result, [url])
+        self.assertEqual(self.requested, [url + 'properties/language'])
+        self.assertEqual(self.read(url, 'language'), 'processed')
+
+        # Nothing else to do
+        del self.requested[:]
+        self.assertEqual(self.corpus.mirror(self.directory,
+                properties=['tokens', 'language']), ([], []))
+        self.assertEqual(self.requested, [])
+
+    @patch("requests.Session.get")
+    def test_revalidate_downloads_only_changed_properties(self, mocked_get):
+        mocked_get.side_effect = self.get
+        self.corpus.mirror(self.directory, properties=['tokens'])
+        url = self.document_urls[0]
+        self.values[url + 'properties/tokens'] = 'changed'
+
+        result, errors = self.corpus.mirror(self.directory,
+                                            properties=['tokens'],
+                                            revalidate=True)
+
+        self.assertEqual(result, [url])
+        self.assertEqual(self.read(url, 'tokens'), 'changed')
+
+    @patch("requests.Session.get")
+    def test_errors_do_not_stop_the_mirror(self, mocked_get):
+        def get(url, headers=None):
+            if url == self.document_urls[0]:
+                response = Mock()
+                response.status_code = 500
+                return response
+            return self.get(url, headers)
+        mocked_get.side_effect = get
+
+        result, errors = self.corpus.mirror(self.directory,
+                                            properties=['tokens'])
+
+        self.assertEqual(result, [self.document_urls[1]])
+        self.assertEqual([url for url, exc in errors],
+                         [self.document_urls[0]])
+        self.assertNotIn(self.document_urls[0],
+                         MirrorManifest(self.directory).entries)
@@ -18,16 +18,22 @@
 # along with PyPLN.  If not, see <http://www.gnu.org/licenses/>.
 
 import base64
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
 import unittest
 
-try:
-    from unittest.mock import call, patch, Mock, mock_open
-except ImportError:
-    from mock import call, patch, Mock, mock_open
+from unittest.mock import call, patch, Mock
 
 import requests
 
-from pypln.api import PyPLN, Corpus, Document, __version__
+from pypln.api import PyPLN, Corpus, Document, DocumentRecord, \
+        SessionPool, sessions, decode_wordcloud, get_json_decoder, \
+        __version__
+from pypln.api.cache import MemoryCache
 
 
 class PyPLNTest(unittest.TestCase):
@@ -65,6 +71,9 @@ class PyPLNTest(unittest.TestCase):
                  'uploaded_at': '2013-10-25T17:00:01.000Z',
                  }
 
+    def tearDown(self):
+        sessions.clear()
+
     def test_basic_auth_is_correctly_set(self):
         credentials = (self.user, self.password)
         pypln = PyPLN(self.base_url, credentials)
@@ -114,10 +123,10 @@ class PyPLNTest(unittest.TestCase):
     def test_list_corpora(self, mocked_get):
         mocked_get.return_value.status_code = 200
         mocked_get.return_value.json.return_value = \
-                {u'count': 1,
-                 u'next': None,
-                 u'previous': None,
-                 u'results': [self.example_corpus]}
+                {'count': 1,
+                 'next': None,
+                 'previous': None,
+                 'results': [self.example_corpus]}
 
         pypln = PyPLN(self.base_url, (self.user, self.password))
         result = pypln.corpora()
@@ -142,10 +151,10 @@ class PyPLNTest(unittest.TestCase):
     def test_list_documents(self, mocked_get):
         mocked_get.return_value.status_code = 200
         mocked_get.return_value.json.return_value = \
-                {u'count': 2,
-                 u'next': None,
-                 u'previous': None,
-                 u'results': [self.example_document_1,
+                {'count': 2,
+                 'next': None,
+                 'previous': None,
+                 'results': [self.example_document_1,
                               self.example_document_2]}
 
         pypln = PyPLN(self.base_url, (self.user, self.password))
@@ -182,9 +191,327 @@ class PyPLNTest(unittest.TestCase):
 
         self.assertRaises(RuntimeError, pypln.documents)
 
-    #TODO: test list documents in more than one page
+    def _pages(self, *pages):
+        """Build one response mock for each list of results in `pages`,
+        linking them with `next`"""
+        responses = []
+        for index, results in enumerate(pages):
+            response = Mock()
+            response.status_code = 200
+            next_url = None
+            if index + 1 < len(pages):
+                next_url = self.base_url + "/documents/?page={}".format(
+                        index + 2)
+            response.json.return_value = {'count': sum(map(len, pages)),
+                                          'next': next_url,
+                                          'previous': None,
+                                          'results': results}
+            responses.append(response)
+        return responses
+
+    @patch("requests.Session.get")
+    def test_list_documents_in_more_than_one_page(self, mocked_get):
+        mocked_get.side_effect = self._pages([self.example_document_1],
+                                             [self.example_document_2])
+
+        pypln = PyPLN(self.base_url, (self.user, self.password))
+        result = pypln.documents(full=True)
+
+        self.assertEqual([document.url for document in result],
+                         [self.example_document_1['url'],
+                          self.example_document_2['url']])
+        mocked_get.assert_has_calls([call(self.base_url + "/documents/"),
+            call(self.base_url + "/documents/?page=2")])
+
+    @patch("requests.Session.get")
+    def test_list_only_first_page_of_corpora_by_default(self, mocked_get):
+        mocked_get.side_effect = self._pages([self.example_corpus],
+                                             [self.example_corpus])
+
+        pypln = PyPLN(self.base_url, (self.user, self.password))
+        result = pypln.corpora()
+
+        self.assertEqual(len(result), 1)
+        self.assertEqual(mocked_get.call_count, 1)
+
+    @patch("requests.Session.get")
+    def test_iter_documents_downloads_pages_lazily(self, mocked_get):
+        mocked_get.side_effect = self._pages([self.example_document_1],
+                                             [self.example_document_2])
+
+        pypln = PyPLN(self.base_url, (self.user, self.password))
+        documents = pypln.iter_documents()
+        self.assertEqual(mocked_get.call_count, 0)
+
+        first = next(documents)
+        self.assertEqual(first.url, self.example_document_1['url'])
+        self.assertIs(first.session, pypln.session)
+        self.assertEqual(mocked_get.call_count, 1)
+
+        self.assertEqual([document.url for document in documents],
+                         [self.example_document_2['url']])
+        self.assertEqual(mocked_get.call_count, 2)
+
+    @patch("requests.Session.get")
+    def test_list_compact_documents(self, mocked_get):
+        mocked_get.side_effect = self._pages([self.example_document_1],
+                                             [self.example_document_2])
+
+        pypln = PyPLN(self.base_url, (self.user, self.password))
+        result = pypln.documents(full=True, compact=True)
+
+        self.assertEqual([type(document) for document in result],
+                         [DocumentRecord, DocumentRecord])
+        self.assertEqual(result[1].properties_url,
+                         self.example_document_2['properties'])
+        self.assertIs(result[0].session, pypln.session)
+        self.assertFalse(hasattr(result[0], '__dict__'))
+
+    @patch("requests.Session.get")
+    def test_document_table(self, mocked_get):
+        mocked_get.side_effect = self._pages([self.example_document_1],
+                                             [self.example_document_2])
+
+        pypln = PyPLN(self.base_url, (self.user, self.password))
+        table = pypln.document_table()
+
+        self.assertEqual(len(table), 2)
+        self.assertEqual(table.column('url'),
+                         [self.example_document_1['url'],
+                          self.example_document_2['url']])
+        self.assertEqual(table[1], Document(session=pypln.session,
+                                            **self.example_document_2))
+
+    @patch("requests.Session.get")
+    def test_iter_corpora_fails_if_a_page_fails(self, mocked_get):
+        responses = self._pages([self.example_corpus], [self.example_corpus])
+        responses[1].status_code = 500
+        mocked_get.side_effect = responses
+
+        pypln = PyPLN(self.base_url, (self.user, self.password))
+        corpora = pypln.iter_corpora()
+
+        self.assertIsInstance(next(corpora), Corpus)
+        self.assertRaises(RuntimeError, next, corpora)
+
+    @patch("requests.Session.get")
+    def test_list_documents_prefetching_pages(self, mocked_get):
+        mocked_get.side_effect = self._pages([self.example_document_1],
+                                             [self.example_document_2],
+                                             [self.example_document_1])
+
+        pypln = PyPLN(self.base_url, (self.user, self.password))
+        result = pypln.documents(full=True, prefetch=2)
+
+        self.assertEqual([document.url for document in result],
+                         [self.example_document_1['url'],
+                          self.example_document_2['url'],
+                          self.example_document_1['url']])
+        self.assertEqual(mocked_get.call_count, 3)
+
+    @patch("requests.Session.get")
+    def test_prefetching_raises_errors_from_background_pages(self,
+            mocked_get):
+        responses = self._pages([self.example_corpus], [self.example_corpus])
+        responses[1].status_code = 500
+        mocked_get.side_effect = responses
+
+        pypln = PyPLN(self.base_url, (self.user, self.password))
+
+        with self.assertRaises(RuntimeError):
+            pypln.corpora(full=True, prefetch=1)
+
+    def _page_server(self, pages, next_urls):
+        """Return a function that answers GETs to the URLs in `next_urls`
+        (and to the first page) with the corresponding page of results"""
+        urls = [self.base_url + "/documents/"] + next_urls
+        def get(url):
+            index = urls.index(url)
+            response = Mock()
+            response.status_code = 200
+            next_url = next_urls[index] if index < len(next_urls) else None
+            response.json.return_value = {'count': sum(map(len, pages)),
+                                          'next': next_url,
+                                          'previous': None,
+                                          'results': pages[index]}
+            return response
+        return get
+
+    @patch("requests.Session.get")
+    def test_list_documents_downloading_pages_in_parallel(self, mocked_get):
+        pages = [[self.example_document_1, self.example_document_2]] * 4 + \
+                [[self.example_document_1]]
+        next_urls = [self.base_url + "/documents/?format=json&page={}".format(
+            page) for page in range(2, 6)]
+        mocked_get.side_effect = self._page_server(pages, next_urls)
+
+        pypln = PyPLN(self.base_url, (self.user, self.password))
+        result = pypln.documents(full=True, parallel=3)
+
+        self.assertEqual([document.url for document in result],
+                         [document['url'] for page in pages
+                          for document in page])
+        self.assertEqual(mocked_get.call_count, 5)
+
+    @patch("requests.Session.get")
+    def test_iter_documents_in_parallel_with_limit_offset_pagination(self,
+            mocked_get):
+        pages = [[self.example_document_1, self.example_document_2],
+                 [self.example_document_2, self.example_document_1],
+                 [self.example_document_2]]
+        next_urls = [self.base_url + "/documents/?limit=2&offset=2",
+                     self.base_url + "/documents/?limit=2&offset=4"]
+        mocked_get.side_effect = self._page_server(pages, next_urls)
+
+        pypln = PyPLN(self.base_url, (self.user, self.password))
+        result = list(pypln.iter_documents(parallel=2))
+
+        self.assertEqual([document.url for document in result],
+                         [document['url'] for page in pages
+                          for document in page])
+
+    @patch("requests.Session.get")
+    def test_parallel_listing_falls_back_to_next_links(self, mocked_get):
+        responses = self._pages([self.example_document_1],
+                                [self.example_document_2])
+        responses[0].json.return_value['next'] = \
+                self.base_url + "/documents/?cursor=abc"
+        mocked_get.side_effect = responses
+
+        pypln = PyPLN(self.base_url, (self.user, self.password))
+        result = pypln.documents(full=True, parallel=4)
+
+        self.assertEqual(len(result), 2)
+        mocked_get.assert_called_with(self.base_url + "/documents/?cursor=abc")
+
+
+class SessionPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.auth = ("user", "password")
+        self.base_url = "http://pypln.example.com"
+        self.pool = SessionPool()
+
+    def tearDown(self):
+        sessions.clear()
+
+    def test_same_host_and_credentials_share_a_session(self):
+        session = self.pool.get(self.base_url + "/corpora/1/", self.auth)
+
+        self.assertIs(self.pool.get(self.base_url + "/documents/1/",
+                                    ("user", "password")), session)
+        self.assertIsNot(self.pool.get(self.base_url, "token"), session)
+        self.assertIsNot(self.pool.get("https://pypln.example.com",
+                                       self.auth), session)
+        self.assertEqual(session.auth, self.auth)
+
+    def test_raise_an_error_if_auth_is_not_str_or_tuple(self):
+        with self.assertRaises(TypeError):
+            self.pool.get(self.base_url, ["user", "password"])
+
+    def test_configure_connection_pool(self):
+        self.pool.configure(pool_maxsize=50, pool_block=True,
+                            keep_alive=False)
+        session = self.pool.get(self.base_url, self.auth)
+
+        adapter = session.get_adapter(self.base_url)
+        self.assertEqual(adapter._pool_maxsize, 50)
+        self.assertTrue(adapter._pool_block)
+        self.assertEqual(session.headers['Connection'], 'close')
+
+    @patch("requests.Session.get")
+    def test_pypln_and_from_url_reuse_sessions(self, mocked_get):
+        mocked_get.return_value.status_code = 200
+        mocked_get.return_value.json.return_value = {
+            'created_at': '2013-10-25T17:00:00.000Z',
+            'description': 'Test Corpus', 'documents': [], 'name': 'test',
+            'owner': 'user', 'url': self.base_url + '/corpora/1/'}
+
+        pypln = PyPLN(self.base_url, self.auth)
+        corpus = Corpus.from_url(self.base_url + '/corpora/1/', self.auth)
+        other_corpus = Corpus.from_url(self.base_url + '/corpora/1/',
+                                       self.auth)
+
+        self.assertIs(corpus.session, pypln.session)
+        self.assertIs(other_corpus.session, pypln.session)
+
+    def test_client_options_are_not_shared(self):
+        memory_cache = MemoryCache()
+        pypln = PyPLN(self.base_url, self.auth, memory_cache=memory_cache)
+        other_pypln = PyPLN(self.base_url, self.auth)
+
+        self.assertIs(pypln.session.memory_cache, memory_cache)
+        self.assertIsNone(other_pypln.session.memory_cache)
+        self.assertIs(other_pypln.session, sessions.get(self.base_url,
+                                                        self.auth))
+        # Only the connections are shared
+        self.assertIsNot(pypln.session, other_pypln.session)
+        self.assertIs(pypln.session.get_adapter(self.base_url),
+                      other_pypln.session.get_adapter(self.base_url))
+
+    @patch("requests.Session.get")
+    def test_client_without_cache_makes_requests(self, mocked_get):
+        mocked_get.return_value.status_code = 200
+        mocked_get.return_value.json.return_value = {'value': 'old'}
+        document_json = {
+            'owner': 'user', 'corpus': self.base_url + '/corpora/1/',
+            'size': 42, 'url': self.base_url + '/documents/1/',
+            'properties': self.base_url + '/documents/1/properties/',
+            'blob': '/test.txt', 'uploaded_at': '2013-10-25T17:00:00.000Z'}
+        pypln = PyPLN(self.base_url, self.auth, memory_cache=MemoryCache())
+        Document(session=pypln.session, **document_json).get_property('text')
+
+        mocked_get.return_value.json.return_value = {'value': 'new'}
+        other_pypln = PyPLN(self.base_url, self.auth)
+        document = Document(session=other_pypln.session, **document_json)
+
+        self.assertEqual(document.get_property('text'), 'new')
+        self.assertEqual(mocked_get.call_count, 2)
+
+    def test_clear_closes_sessions(self):
+        session = self.pool.get(self.base_url, self.auth)
+        self.pool.clear()
+
+        self.assertIsNot(self.pool.get(self.base_url, self.auth), session)
+
+
+class JsonDecoderTest(unittest.TestCase):
+
+    def tearDown(self):
+        sessions.clear()
 
-    #TODO: test list corpora in more than one page
+    def test_get_installed_decoder(self):
+        loads = get_json_decoder('json')
+        self.assertIs(loads, json.loads)
+
+    def test_fall_back_to_standard_library(self):
+        loads = get_json_decoder('this_json_module_does_not_exist')
+        self.assertIs(loads, json.loads)
+
+    def test_automatic_decoder_decodes_bytes(self):
+        loads = get_json_decoder()
+        self.assertEqual(loads(b'{"value": ["a\\u00e7a\\u00ed", 1]}'),
+                         {'value': ['a\u00e7a\u00ed', 1]})
+
+    def test_custom_decoder(self):
+        loads = lambda data: {'value': data}
+        self.assertIs(get_json_decoder(loads), loads)
+
+    @patch("requests.Session.get")
+    def test_decoder_is_used_for_responses(self, mocked_get):
+        mocked_get.return_value.status_code = 200
+        mocked_get.return_value.content = json.dumps({'count': 0,
+            'next': None, 'previous': None, 'results': []}).encode('utf-8')
+        decoded = []
+        def loads(data):
+            decoded.append(data)
+            return json.loads(data.decode('utf-8'))
+
+        pypln = PyPLN("http://pypln.example.com", "token", json_decoder=loads)
+        self.assertEqual(pypln.documents(), [])
+
+        self.assertEqual(decoded, [mocked_get.return_value.content])
+        self.assertFalse(mocked_get.return_value.json.called)
 
 
 class CorpusTest(unittest.TestCase):
@@ -379,6 +706,371 @@ class CorpusTest(unittest.TestCase):
         self.assertEqual(result[1][0][0], expected[1][0][0])
         self.assertIsInstance(expected[1][0][1], RuntimeError)
 
+    @patch("pypln.api.Corpus.add_document")
+    def test_add_documents_concurrently_keeps_input_order(self,
+            mocked_add_document):
+        def add_document(document):
+            if document == "content_3":
+                raise RuntimeError("Document creation failed")
+            return "document from {}".format(document)
+        mocked_add_document.side_effect = add_document
+
+        corpus = Corpus(session=self.session, **self.example_json)
+        contents = ["content_{}".format(i) for i in range(20)]
+        documents, errors = corpus.add_documents(contents, workers=4)
+
+        self.assertEqual(documents, ["document from {}".format(content)
+            for content in contents if content != "content_3"])
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0][0], "content_3")
+        self.assertIsInstance(errors[0][1], RuntimeError)
+
+    @patch("pypln.api.Corpus.add_document")
+    def test_add_documents_concurrently_does_not_hide_other_errors(self,
+            mocked_add_document):
+        mocked_add_document.side_effect = ValueError
+
+        corpus = Corpus(session=self.session, **self.example_json)
+        with self.assertRaises(ValueError):
+            corpus.add_documents(["content_1"], workers=2)
+
+    @patch("requests.Session.post")
+    def test_add_documents_concurrently_respects_connection_pool(self,
+            mocked_post):
+        running, most_running = [], []
+        lock = threading.Lock()
+
+        def post(*args, **kwargs):
+            with lock:
+                running.append(None)
+                most_running.append(len(running))
+            time.sleep(0.01)
+            with lock:
+                running.pop()
+            response = Mock()
+            response.status_code = 201
+            response.json.return_value = self.example_document
+            return response
+        mocked_post.side_effect = post
+        sessions.configure(pool_maxsize=4)
+        try:
+            session = sessions.get(self.example_json['url'], self.auth)
+            corpus = Corpus(session=session, **self.example_json)
+            corpus.add_documents([b'content'] * 16, workers=64)
+        finally:
+            sessions.configure()
+            sessions.clear()
+
+        self.assertEqual(session.get_adapter(corpus.url)._pool_maxsize, 4)
+        self.assertLessEqual(max(most_running), 4)
+        self.assertEqual(mocked_post.call_count, 16)
+
+    @patch("requests.Session.get")
+    def test_fetch_property_of_many_documents(self, mocked_get):
+        def get(url):
+            response = Mock()
+            if url.startswith("http://pypln.example.com/documents/3/"):
+                response.status_code = 404
+            else:
+                response.status_code = 200
+                response.json.return_value = {'value': url}
+            return response
+        mocked_get.side_effect = get
+
+        corpus = Corpus(session=self.session, **self.example_json)
+        documents = []
+        for index in range(1, 6):
+            document_json = self.example_document.copy()
+            document_json['properties'] = \
+                "http://pypln.example.com/documents/{}/properties/".format(
+                        index)
+            documents.append(Document(session=self.session, **document_json))
+
+        results = list(corpus.fetch_property('text', documents, workers=2))
+
+        self.assertEqual(len(results), 5)
+        values = dict((document.properties_url, value)
+                      for document, value, exc in results if exc is None)
+        self.assertEqual(values, dict((document.properties_url,
+            document.properties_url + 'text') for document in documents
+            if document is not documents[2]))
+        errors = [(document, exc) for document, value, exc in results
+                  if exc is not None]
+        self.assertEqual(len(errors), 1)
+        self.assertIs(errors[0][0], documents[2])
+        self.assertIsInstance(errors[0][1], RuntimeError)
+
+    def _wordcloud_documents(self, mocked_get, count):
+        """Return `count` documents whose wordclouds are their ids"""
+        def get(url):
+            response = Mock()
+            document_id = url.split('/')[4]
+            if document_id == '3':
+                response.status_code = 404
+            else:
+                response.status_code = 200
+                encoded = base64.b64encode(document_id.encode('ascii'))
+                response.content = b'{"value": "' + encoded + b'"}'
+            return response
+        mocked_get.side_effect = get
+
+        documents = []
+        for index in range(1, count + 1):
+            document_json = self.example_document.copy()
+            document_json['properties'] = \
+                "http://pypln.example.com/documents/{}/properties/".format(
+                        index)
+            documents.append(Document(session=self.session, **document_json))
+        return documents
+
+    @patch("requests.Session.get")
+    def test_fetch_property_decoding_in_processes(self, mocked_get):
+        documents = self._wordcloud_documents(mocked_get, 12)
+        corpus = Corpus(session=self.session, **self.example_json)
+
+        results = list(corpus.fetch_property('wordcloud', documents,
+                workers=3, processes=2, transform=decode_wordcloud))
+
+        self.assertEqual(len(results), 12)
+        values = dict((document.properties_url, value)
+                      for document, value, exc in results if exc is None)
+        self.assertEqual(values, dict((document.properties_url,
+            document.properties_url.split('/')[4].encode('ascii'))
+            for document in documents if document is not documents[2]))
+        errors = [(document, exc) for document, value, exc in results
+                  if exc is not None]
+        self.assertEqual(len(errors), 1)
+        self.assertIs(errors[0][0], documents[2])
+        self.assertIsInstance(errors[0][1], RuntimeError)
+
+    @patch("requests.Session.get")
+    def test_fetch_property_reports_errors_from_processes(self, mocked_get):
+        documents = self._wordcloud_documents(mocked_get, 2)
+        corpus = Corpus(session=self.session, **self.example_json)
+
+        results = list(corpus.fetch_property('wordcloud', documents,
+                processes=1, transform=int))
+
+        self.assertEqual([type(exc) for document, value, exc in results],
+                         [ValueError, ValueError])
+
+    def test_fetch_property_in_processes_needs_picklable_functions(self):
+        corpus = Corpus(session=self.session, **self.example_json)
+
+        with self.assertRaises(ValueError):
+            corpus.fetch_property('wordcloud', [], processes=1,
+                                  transform=lambda value: value)
+        self.session.json_loads = lambda content: json.loads(content)
+        with self.assertRaises(ValueError):
+            corpus.fetch_property('wordcloud', [], processes=1)
+
+    @patch("requests.Session.get")
+    def test_export_wordclouds(self, mocked_get):
+        def get(url, **kwargs):
+            response = Mock()
+            document_id = url.split('/')[4]
+            response.status_code = 200
+            if document_id == '3':
+                response.status_code = 404
+            elif url.endswith('wordcloud'):
+                encoded = base64.b64encode(document_id.encode('ascii'))
+                response.iter_content.return_value = [
+                    b'{"value": "' + encoded + b'"}']
+            else:
+                document_json = self.example_document.copy()
+                document_json['url'] = url
+                document_json['properties'] = url + 'properties/'
+                response.json.return_value = document_json
+            return response
+        mocked_get.side_effect = get
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with open(os.path.join(directory, 'wordcloud_1.png'), 'wb') as fp:
+            fp.write(b'already here')
+        corpus_json = self.example_json.copy()
+        corpus_json['documents'] = [
+            "http://pypln.example.com/documents/{}/".format(document_id)
+            for document_id in range(1, 4)]
+        corpus = Corpus(session=self.session, **corpus_json)
+        document_4 = self.example_document.copy()
+        document_4['url'] = "http://pypln.example.com/documents/4/"
+        document_4['properties'] = document_4['url'] + 'properties/'
+
+        result, errors = corpus.export_wordclouds(directory)
+        result_4, errors_4 = corpus.export_wordclouds(directory,
+                [Document(session=self.session, **document_4)])
+
+        self.assertEqual(result, [os.path.join(directory, 'wordcloud_2.png')])
+        self.assertEqual(errors[0][0], "http://pypln.example.com/documents/3/")
+        self.assertIsInstance(errors[0][1], RuntimeError)
+        self.assertEqual((result_4, errors_4),
+                ([os.path.join(directory, 'wordcloud_4.png')], []))
+        for document_id, content in [(1, b'already here'), (2, b'2'),
+                                     (4, b'4')]:
+            filename = 'wordcloud_{}.png'.format(document_id)
+            with open(os.path.join(directory, filename), 'rb') as fp:
+                self.assertEqual(fp.read(), content)
+
+
+    def _document_server(self, numbers):
+        """Return document URLs for `numbers` and a fake `get` answering
+        with their details"""
+        urls = ['http://pypln.example.com/documents/{}/'.format(number)
+                for number in numbers]
+
+        def get(url):
+            response = Mock()
+            if url not in urls:
+                response.status_code = 404
+                return response
+            response.status_code = 200
+            response.json.return_value = dict(self.example_document,
+                    url=url, properties=url + 'properties/')
+            return response
+        return urls, get
+
+    @patch("requests.Session.get")
+    def test_lazy_documents_fetch_only_what_is_touched(self, mocked_get):
+        urls, mocked_get.side_effect = self._document_server(range(10))
+        corpus = Corpus(session=self.session,
+                        **dict(self.example_json, documents=urls))
+
+        documents = corpus.lazy_documents
+        self.assertEqual(len(documents), 10)
+        self.assertEqual(mocked_get.call_count, 0)
+
+        self.assertEqual(documents[-1].url, urls[9])
+        self.assertIs(documents[9].session, self.session)
+        self.assertEqual([document.url for document in documents[2:5]],
+                         urls[2:5])
+        self.assertEqual(sorted(call[0][0] for call in
+                                mocked_get.call_args_list),
+                         sorted([urls[9]] + urls[2:5]))
+
+        # Hydrated documents are kept
+        self.assertEqual([document.url for document in documents], urls)
+        self.assertEqual(mocked_get.call_count, 10)
+        self.assertIs(corpus.lazy_documents, documents)
+        self.assertIs(documents[3], documents[3])
+
+    @patch("requests.Session.get")
+    def test_lazy_documents_follow_changes_in_documents(self, mocked_get):
+        urls, mocked_get.side_effect = self._document_server(range(3))
+        corpus = Corpus(session=self.session,
+                        **dict(self.example_json, documents=urls[:2]))
+        self.assertEqual(len(corpus.lazy_documents), 2)
+
+        corpus.documents = urls
+        self.assertEqual(len(corpus.lazy_documents), 3)
+
+    @patch("requests.Session.get")
+    def test_lazy_documents_raise_errors(self, mocked_get):
+        urls, mocked_get.side_effect = self._document_server([1, 2])
+        urls = urls + ['http://pypln.example.com/documents/3/']
+        corpus = Corpus(session=self.session,
+                        **dict(self.example_json, documents=urls))
+
+        with self.assertRaises(RuntimeError):
+            corpus.lazy_documents[2]
+        with self.assertRaises(RuntimeError):
+            list(corpus.lazy_documents)
+        with self.assertRaises(IndexError):
+            corpus.lazy_documents[3]
+        self.assertEqual(corpus.lazy_documents[0].url, urls[0])
+
+    def _documents_processed_after(self, polls):
+        """Return `Document` objects and a fake `get` that lists their
+        properties only after they were polled `polls[i]` times"""
+        documents, counts = [], {}
+        for number, count in enumerate(polls):
+            document_json = self.example_document.copy()
+            document_json['url'] = \
+                    'http://pypln.example.com/documents/{}/'.format(number)
+            document_json['properties'] = document_json['url'] + 'properties/'
+            documents.append(Document(session=self.session, **document_json))
+            counts[document_json['properties']] = count
+
+        def get(url):
+            counts[url] -= 1
+            properties = ['text', 'tokens'] if counts[url] <= 0 else []
+            response = Mock()
+            response.status_code = 200
+            response.json.return_value = {'properties': [url + prop + '/'
+                                                         for prop in properties]}
+            return response
+        return documents, get
+
+    @patch("requests.Session.get")
+    def test_wait_until_processed(self, mocked_get):
+        documents, mocked_get.side_effect = \
+                self._documents_processed_after([3, 1, 2])
+        corpus = Corpus(session=self.session, **self.example_json)
+        notified = []
+
+        ready, pending, failed = corpus.wait_until_processed(documents,
+                required=['text', 'tokens'], initial_delay=0.01,
+                callback=notified.append)
+
+        self.assertEqual(ready, [documents[1], documents[2], documents[0]])
+        self.assertEqual(notified, ready)
+        self.assertEqual(pending, [])
+        self.assertEqual(failed, [])
+        # Each document stops being polled as soon as it's ready
+        self.assertEqual(mocked_get.call_count, 6)
+
+    @patch("requests.Session.get")
+    def test_wait_until_processed_with_timeout(self, mocked_get):
+        documents, mocked_get.side_effect = \
+                self._documents_processed_after([1, 1000, 1000])
+        corpus = Corpus(session=self.session, **self.example_json)
+
+        ready, pending, failed = corpus.wait_until_processed(documents,
+                timeout=0.2, workers=2, initial_delay=0.01, max_delay=0.05)
+
+        self.assertEqual(ready, [documents[0]])
+        self.assertEqual(pending, documents[1:])
+
+    @patch("requests.Session.get")
+    def test_wait_until_processed_backs_off(self, mocked_get):
+        documents, mocked_get.side_effect = \
+                self._documents_processed_after([1000])
+        corpus = Corpus(session=self.session, **self.example_json)
+
+        corpus.wait_until_processed(documents, timeout=0.3,
+                                    initial_delay=0.02)
+
+        # Delays of at least 0.01, 0.02, 0.04, 0.08 and 0.16 seconds
+        self.assertLessEqual(mocked_get.call_count, 6)
+        self.assertGreaterEqual(mocked_get.call_count, 3)
+
+    @patch("requests.Session.get")
+    def test_wait_until_processed_gives_up_on_failing_documents(self,
+            mocked_get):
+        documents, get = self._documents_processed_after([1])
+        deleted_url = 'http://pypln.example.com/documents/404/'
+
+        def get_or_fail(url):
+            if url == deleted_url:
+                response = Mock()
+                response.status_code = 404
+                response.text = 'Not found.'
+                return response
+            return get(url)
+        mocked_get.side_effect = get_or_fail
+        corpus = Corpus(session=self.session, **self.example_json)
+
+        ready, pending, failed = corpus.wait_until_processed(
+                [deleted_url] + documents, initial_delay=0.01,
+                max_failures=3)
+
+        self.assertEqual(ready, documents)
+        self.assertEqual(pending, [])
+        self.assertEqual([document for document, exc in failed],
+                         [deleted_url])
+        self.assertIsInstance(failed[0][1], RuntimeError)
+        self.assertEqual(mocked_get.call_count, 4)
+
 
 class DocumentTest(unittest.TestCase):
 
@@ -397,6 +1089,10 @@ class DocumentTest(unittest.TestCase):
         self.auth = (self.user, self.password)
         self.session = requests.Session()
         self.session.auth = self.auth
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
 
     def test_instantiate_document_from_json(self):
         document = Document(session=self.session, **self.example_json)
@@ -559,26 +1255,65 @@ class DocumentTest(unittest.TestCase):
 
     @patch("requests.Session.get")
     def test_download_wordcloud(self, mocked_get):
-        png = "This is not really a png.\n".encode('ascii')
-        encoded_png = base64.b64encode(png)
+        png = b"\x89PNG\r\n\x1a\nThis is not really a png.\n" * 100
+        encoded_png = base64.encodebytes(png)
+        body = json.dumps({'value': encoded_png.decode('ascii')})
 
         mocked_get.return_value.status_code = 200
-        mocked_get.return_value.json.return_value = {'value': encoded_png}
+        mocked_get.return_value.iter_content.return_value = [
+            body[start:start + 7].encode('ascii')
+            for start in range(0, len(body), 7)]
 
         document = Document(session=self.session, **self.example_json)
+        filename = os.path.join(self.directory, 'test.png')
+        document.download_wordcloud(filename)
 
-        import sys
-        if sys.version < '3':
-            builtins_module = '__builtin__'
-        else:
-            builtins_module = 'builtins'
+        with open(filename, 'rb') as fp:
+            self.assertEqual(fp.read(), png)
+        self.assertEqual(os.listdir(self.directory), ['test.png'])
+        mocked_get.assert_called_with(self.example_json['properties'] +
+                'wordcloud', stream=True)
 
-        m = mock_open()
-        with patch('{}.open'.format(builtins_module), m, create=True):
-            document.download_wordcloud('test.png')
+    @patch("requests.Session.get")
+    def test_downloading_wordcloud_returns_an_error(self, mocked_get):
+        mocked_get.return_value.status_code = 404
 
-        m.assert_called_once_with('test.png', 'w')
-        handle = m()
-        handle.write.assert_called_once_with(png.decode('ascii'))
-        mocked_get.assert_called_with(self.example_json['properties'] +
-                'wordcloud')
+        document = Document(session=self.session, **self.example_json)
+        filename = os.path.join(self.directory, 'test.png')
+
+        with self.assertRaises(RuntimeError):
+            document.download_wordcloud(filename)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    @patch("requests.Session.get")
+    def test_invalid_wordcloud_is_not_saved(self, mocked_get):
+        mocked_get.return_value.status_code = 200
+        mocked_get.return_value.iter_content.return_value = [
+                b'{"value": "abc"}']
+
+        document = Document(session=self.session, **self.example_json)
+        filename = os.path.join(self.directory, 'test.png')
+
+        with self.assertRaises(ValueError):
+            document.download_wordcloud(filename)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    @patch("requests.Session.get")
+    def test_get_many_properties(self, mocked_get):
+        def get(url):
+            response = Mock()
+            if url.endswith('pos'):
+                response.status_code = 404
+            else:
+                response.status_code = 200
+                response.json.return_value = {'value': url.split('/')[-1]}
+            return response
+        mocked_get.side_effect = get
+
+        document = Document(session=self.session, **self.example_json)
+        values, errors = document.get_properties(['text', 'tokens', 'pos'])
+
+        self.assertEqual(values, {'text': 'text', 'tokens': 'tokens'})
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0][0], 'pos')
+        self.assertIsInstance(errors[0][1], RuntimeError)
@@ -0,0 +1,103 @@
+# coding: utf-8
+#
+# Copyright 2012 NAMD-EMAP-FGV
+#
+# This file is part of PyPLN. You can get more information at: http://pypln.org/.
+#
+# PyPLN is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyPLN is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyPLN.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+
+import requests
+
+from pypln.api import Document, DocumentRecord
+from pypln.api.table import DocumentTable
+
+
+class DocumentRecordTest(unittest.TestCase):
+
+    def setUp(self):
+        self.example_json = {
+            "owner": "user",
+            "corpus": "http://pypln.example.com/corpora/1/",
+            "size": 238953,
+            "properties": "http://pypln.example.com/documents/1/properties/",
+            "url": "http://pypln.example.com/documents/1/",
+            "blob": "/example.pdf",
+            "uploaded_at": "2013-10-25T17:10:00.000Z"
+        }
+        self.session = requests.Session()
+
+    def test_record_has_no_dict(self):
+        record = DocumentRecord(session=self.session, **self.example_json)
+
+        self.assertFalse(hasattr(record, '__dict__'))
+        with self.assertRaises(AttributeError):
+            record.other = 1
+
+    def test_record_behaves_like_a_document(self):
+        record = DocumentRecord(session=self.session, **self.example_json)
+        document = Document(session=self.session, **self.example_json)
+
+        self.assertEqual(record, document)
+        self.assertEqual(hash(record), hash(document))
+        self.assertEqual(record.properties_url,
+                         self.example_json['properties'])
+        self.assertIn('DocumentRecord', repr(record))
+
+
+class DocumentTableTest(unittest.TestCase):
+
+    def setUp(self):
+        self.session = requests.Session()
+        self.resources = []
+        for number in range(5):
+            self.resources.append({
+                "owner": "user{}".format(number % 2),
+                "corpus": "http://pypln.example.com/corpora/1/",
+                "size": 1000 * number,
+                "properties": "http://pypln.example.com/documents/{}/"
+                              "properties/".format(number),
+                "url": "http://pypln.example.com/documents/{}/".format(number),
+                "blob": "/documento_{}_ç.txt".format(number),
+                "uploaded_at": "2013-10-25T17:10:0{}.000Z".format(number),
+            })
+        pages = [{'results': self.resources[:3]},
+                 {'results': self.resources[3:]}]
+        self.table = DocumentTable.from_pages(pages, session=self.session)
+
+    def test_rows_are_records(self):
+        self.assertEqual(len(self.table), 5)
+        for resource, row in zip(self.resources, self.table):
+            self.assertIsInstance(row, DocumentRecord)
+            self.assertEqual(row, Document(session=self.session, **resource))
+            self.assertIs(row.session, self.session)
+        self.assertEqual(self.table[-1].url, self.resources[-1]['url'])
+        with self.assertRaises(IndexError):
+            self.table[5]
+
+    def test_columns(self):
+        self.assertEqual(list(self.table.column('size')),
+                         [0, 1000, 2000, 3000, 4000])
+        self.assertEqual(self.table.column('blob'),
+                         [resource['blob'] for resource in self.resources])
+        with self.assertRaises(KeyError):
+            self.table.column('other')
+
+    def test_repeated_values_are_stored_once(self):
+        self.assertEqual(self.table.owner.categories, ['user0', 'user1'])
+        self.assertEqual(self.table.corpus.categories,
+                         ["http://pypln.example.com/corpora/1/"])
+        self.assertEqual(self.table.owner.indexes_of('user1'), [1, 3])
+        self.assertEqual(self.table.owner.indexes_of('other'), [])
@@ -0,0 +1,158 @@
+# coding: utf-8
+#
+# Copyright 2012 NAMD-EMAP-FGV
+#
+# This file is part of PyPLN. You can get more information at: http://pypln.org/.
+#
+# PyPLN is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyPLN is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyPLN.  If not, see <http://www.gnu.org/licenses/>.
+
+import io
+import os
+import unittest
+
+from unittest.mock import patch
+
+import requests
+
+from pypln.api import Corpus, Document
+from pypln.api.upload import MultipartEncoder
+
+
+class MultipartEncoderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.pdf_filename = os.path.join(os.path.dirname(__file__), 'data',
+                                         'python-wikipedia-en.pdf')
+        self.expected = (
+            b'--boundary\r\n'
+            b'Content-Disposition: form-data; name="corpus"\r\n\r\n'
+            b'http://pypln.example.com/corpora/1/\r\n'
+            b'--boundary\r\n'
+            b'Content-Disposition: form-data; name="blob"; '
+            b'filename="test.txt"\r\n\r\n'
+            b'content.\r\n'
+            b'--boundary--\r\n')
+
+    def encoder(self, document, **kwargs):
+        return MultipartEncoder(
+                {'corpus': 'http://pypln.example.com/corpora/1/'},
+                {'blob': document}, boundary='boundary', **kwargs)
+
+    def test_encode_string(self):
+        encoder = self.encoder(('test.txt', 'content.'))
+
+        self.assertEqual(encoder.read(), self.expected)
+        self.assertEqual(encoder.len, len(self.expected))
+        self.assertEqual(encoder.content_type,
+                         'multipart/form-data; boundary=boundary')
+
+    def test_encode_file_in_small_chunks(self):
+        fp = io.BytesIO(b'content.')
+        fp.name = '/tmp/test.txt'
+        encoder = self.encoder(fp)
+
+        chunks = []
+        chunk = encoder.read(5)
+        while chunk:
+            self.assertLessEqual(len(chunk), 5)
+            chunks.append(chunk)
+            chunk = encoder.read(5)
+
+        self.assertEqual(b''.join(chunks), self.expected)
+        self.assertEqual(encoder.len, len(self.expected))
+
+    def test_file_is_read_lazily(self):
+        with open(self.pdf_filename, 'rb') as fp:
+            encoder = self.encoder(fp)
+            self.assertEqual(fp.tell(), 0)
+
+            encoder.read(1024)
+            self.assertLessEqual(fp.tell(), 1024)
+
+            body = encoder.read()
+        self.assertEqual(len(body) + 1024, encoder.len)
+        self.assertEqual(encoder.len, len(self.expected
+            .replace(b'content.', b'')
+            .replace(b'test.txt', b'python-wikipedia-en.pdf')) +
+            os.path.getsize(self.pdf_filename))
+
+    def test_length_of_text_files_is_unknown(self):
+        encoder = self.encoder(('test.txt', io.StringIO('content.')))
+
+        self.assertIsNone(encoder.len)
+        self.assertEqual(b''.join(encoder), self.expected)
+
+    def test_callback_receives_progress(self):
+        progress = []
+        encoder = self.encoder(('test.txt', 'content.'),
+                callback=lambda sent, total: progress.append((sent, total)))
+
+        encoder.read(10)
+        encoder.read()
+
+        total = len(self.expected)
+        self.assertEqual(progress, [(10, total), (total, total)])
+
+
+class StreamingUploadTest(unittest.TestCase):
+
+    def setUp(self):
+        self.example_json = {'created_at': '2013-10-25T17:00:00.000Z',
+                             'description': 'Test Corpus',
+                             'documents': [],
+                             'name': 'test',
+                             'owner': 'user',
+                             'url': 'http://pypln.example.com/corpora/1/'}
+        self.example_document = {
+            "owner": "user",
+            "corpus": "http://pypln.example.com/corpora/1/",
+            "size": 8,
+            "properties": "http://pypln.example.com/documents/1/properties/",
+            "url": "http://pypln.example.com/documents/1/",
+            "blob": "/test.txt",
+            "uploaded_at": "2013-10-25T17:10:00.000Z"
+        }
+        self.session = requests.Session()
+
+    @patch("requests.Session.post")
+    def test_add_document_streaming_the_body(self, mocked_post):
+        mocked_post.return_value.status_code = 201
+        mocked_post.return_value.json.return_value = self.example_document
+        progress = []
+
+        corpus = Corpus(session=self.session, **self.example_json)
+        result = corpus.add_document(('test.txt', b'content.'),
+                callback=lambda sent, total: progress.append(sent))
+
+        self.assertIsInstance(result, Document)
+        args, kwargs = mocked_post.call_args
+        self.assertEqual(args, ("http://pypln.example.com/documents/",))
+        body = kwargs['data']
+        self.assertIsInstance(body, MultipartEncoder)
+        self.assertEqual(kwargs['headers'],
+                         {'Content-Type': body.content_type})
+        self.assertIn(b'content.', body.read())
+        self.assertEqual(progress, [body.len])
+
+    @patch("requests.Session.post")
+    def test_add_documents_streaming_the_body(self, mocked_post):
+        mocked_post.return_value.status_code = 201
+        mocked_post.return_value.json.return_value = self.example_document
+
+        corpus = Corpus(session=self.session, **self.example_json)
+        documents, errors = corpus.add_documents([b'content.'], stream=True)
+
+        self.assertEqual(len(documents), 1)
+        self.assertIsInstance(mocked_post.call_args[1]['data'],
+                              MultipartEncoder)